@@ -0,0 +1 @@
+"""Benchmarks for the Telegram AI Bot."""
@@ -0,0 +1,79 @@
+"""Benchmark per-request clients against the shared pooled client.
+
+Starts a local stub of the Mistral chat completions endpoint and measures the
+average latency of a request made with a fresh ``httpx.AsyncClient`` (the old
+behaviour of the generators) versus the process-wide pooled client.
+
+Usage: python -m benchmarks.bench_clients [requests]
+"""
+
+import asyncio
+import statistics
+import sys
+import time
+
+import httpx
+from aiohttp import web
+
+from telegram_ai_bot import config
+from telegram_ai_bot.clients import close_clients, get_api_client
+
+COMPLETION = {"choices": [{"message": {"role": "assistant", "content": "ok"}}]}
+
+
+async def start_stub_server():
+    """Start a stub chat completions server on a free local port."""
+    async def completions(request):
+        await request.read()
+        return web.json_response(COMPLETION)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+async def measure(send, requests: int):
+    """Return per-request latencies in milliseconds."""
+    latencies = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        await send()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def main(requests: int = 500):
+    """Run the benchmark and print a summary."""
+    runner, base_url = await start_stub_server()
+    url = f"{base_url}/v1/chat/completions"
+    payload = {"model": "stub", "messages": [{"role": "user", "content": "hi"}]}
+
+    async def fresh_client():
+        async with httpx.AsyncClient(timeout=config.API_TIMEOUT) as client:
+            response = await client.post(url, json=payload)
+            response.raise_for_status()
+
+    async def pooled_client():
+        response = await get_api_client().post(url, json=payload)
+        response.raise_for_status()
+
+    try:
+        for name, send in (("fresh client", fresh_client), ("pooled client", pooled_client)):
+            latencies = await measure(send, requests)
+            print(
+                f"{name:>14}: mean {statistics.mean(latencies):.2f} ms, "
+                f"p50 {statistics.median(latencies):.2f} ms, "
+                f"p95 {statistics.quantiles(latencies, n=20)[-1]:.2f} ms"
+            )
+    finally:
+        await close_clients()
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
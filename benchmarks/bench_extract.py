@@ -0,0 +1,114 @@
+"""Benchmark of paragraph extraction backends over a corpus of HTML pages.
+
+Compares the original ``BeautifulSoup(html, "html.parser").find_all("p")``
+approach with every installed extractor backend, and measures how long
+the event loop stalls while pages are extracted in a thread pool versus
+the process pool.
+
+Pass a directory of saved ``.html`` pages, or omit it to use a synthetic
+corpus of news-like pages.
+
+Usage: python -m benchmarks.bench_extract [corpus_dir] [limit]
+"""
+
+import asyncio
+import pathlib
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List
+
+from bs4 import BeautifulSoup
+
+from telegram_ai_bot.extractors import available_backends, extract_paragraphs
+
+SCRIPT = "<script>window.analytics = {" + "'key': 'value', " * 500 + "};</script>"
+NAV = "<nav><ul>" + "".join(f"<li><a href='/s/{i}'>Section {i}</a></li>" for i in range(200)) + "</ul></nav>"
+
+
+def synthetic_corpus() -> List[bytes]:
+    """Return pages with heavy heads, navigation and long articles."""
+    pages = []
+    for index in range(40):
+        words = "Нейронные сети обучаются на больших данных " if index % 2 else "Neural networks learn from data "
+        paragraphs = "".join(
+            f"<p class='text'>{words * (5 + n % 7)}<a href='#'>link</a></p><div class='ad'></div>"
+            for n in range(50 + index * 10)
+        )
+        html = (
+            f"<!doctype html><html><head><title>Page {index}</title>{SCRIPT * (1 + index % 4)}"
+            f"<style>{'.c{color:red}' * 400}</style></head><body>{NAV}"
+            f"<article>{paragraphs}</article></body></html>"
+        )
+        pages.append(html.encode("utf-8"))
+    return pages
+
+
+def load_corpus(directory: str) -> List[bytes]:
+    """Return every ``.html`` file of a directory."""
+    return [path.read_bytes() for path in sorted(pathlib.Path(directory).glob("*.html"))]
+
+
+def soup_baseline(data: bytes, encoding: str, limit: int) -> str:
+    """Extract paragraphs the way the bot originally did."""
+    soup = BeautifulSoup(data.decode(encoding, "replace"), "html.parser")
+    return " ".join(p.get_text() for p in soup.find_all("p"))[:limit]
+
+
+def bench_backend(pages: List[bytes], limit: int, backend: str) -> float:
+    """Return milliseconds per page for a backend."""
+    started = time.perf_counter()
+    for page in pages:
+        if backend == "bs4 full soup":
+            soup_baseline(page, "utf-8", limit)
+        else:
+            extract_paragraphs(page, "utf-8", limit, backend)
+    return (time.perf_counter() - started) * 1000 / len(pages)
+
+
+async def loop_stall(pages: List[bytes], limit: int, backend: str, executor) -> tuple:
+    """Return (seconds, worst event loop lag) to extract all pages concurrently."""
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    running = True
+
+    async def probe():
+        nonlocal worst
+        while running:
+            started = time.perf_counter()
+            await asyncio.sleep(0.001)
+            worst = max(worst, time.perf_counter() - started - 0.001)
+
+    probe_task = asyncio.create_task(probe())
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(
+            loop.run_in_executor(executor, extract_paragraphs, page, "utf-8", limit, backend)
+            for page in pages
+        )
+    )
+    elapsed = time.perf_counter() - started
+    running = False
+    await probe_task
+    return elapsed, worst
+
+
+async def main(corpus_dir: str = None, limit: int = 550):
+    """Run every backend and both executors and print the results."""
+    pages = load_corpus(corpus_dir) if corpus_dir else synthetic_corpus()
+    size = sum(map(len, pages)) / len(pages) / 1024
+    print(f"{len(pages)} pages, {size:.0f} KB on average, {limit} characters each")
+    for backend in ["bs4 full soup"] + available_backends():
+        print(f"{backend:14} {bench_backend(pages, limit, backend):8.2f} ms/page")
+    backend = available_backends()[0]
+    with ThreadPoolExecutor(4) as threads, ProcessPoolExecutor(2) as processes:
+        await asyncio.gather(*(asyncio.get_running_loop().run_in_executor(processes, abs, 1) for _ in range(2)))
+        for name, executor in (("threads", threads), ("processes", processes)):
+            elapsed, worst = await loop_stall(pages * 5, limit, "stdlib", executor)
+            print(f"{'stdlib in ' + name:24}: {elapsed:6.2f}s, worst loop lag {worst * 1000:6.1f} ms")
+            elapsed, worst = await loop_stall(pages * 5, limit, backend, executor)
+            print(f"{backend + ' in ' + name:24}: {elapsed:6.2f}s, worst loop lag {worst * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else None, *map(int, sys.argv[2:3])))
@@ -0,0 +1,93 @@
+"""Benchmark of the bot's import time, based on ``python -X importtime``.
+
+Imports a module in fresh interpreters and reports the best wall-clock time
+and the cumulative import time of the heaviest dependencies. Heavy provider
+SDKs should not appear: they are imported on first use or by the warmup
+that runs after polling starts.
+
+With ``--max-ms`` the run fails when the import takes longer, so it can
+guard against regressions in CI.
+
+Usage: python -m benchmarks.bench_import_time [--module run] [--runs 5] [--max-ms 0]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, Tuple
+
+TRACKED = (
+    "aiogram",
+    "sqlalchemy",
+    "httpx",
+    "aiohttp",
+    "g4f",
+    "mistralai",
+    "duckduckgo_search",
+    "bs4",
+    "lxml",
+    "selectolax",
+    "numpy",
+)
+
+
+def import_once(module: str) -> Tuple[float, Dict[str, float]]:
+    """Import ``module`` in a new interpreter.
+
+    Returns the total import time and the cumulative time of each tracked
+    top-level package, in milliseconds.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    total = 0.0
+    packages: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        micros = int(cumulative)
+        stripped = name.strip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 0:
+            total += micros / 1000
+        if stripped in TRACKED and stripped not in packages:
+            packages[stripped] = micros / 1000
+    return total, packages
+
+
+def main(module: str, runs: int, max_ms: float) -> int:
+    """Print the best of ``runs`` imports and return the exit status."""
+    best_total = None
+    best_packages: Dict[str, float] = {}
+    for _ in range(runs):
+        total, packages = import_once(module)
+        if best_total is None or total < best_total:
+            best_total, best_packages = total, packages
+    print(f"import {module}: {best_total:.0f} ms (best of {runs})")
+    for name in TRACKED:
+        if name in best_packages:
+            print(f"  {name:<18} {best_packages[name]:8.1f} ms")
+    missing = [name for name in TRACKED if name not in best_packages]
+    print(f"  not imported: {', '.join(missing) or 'none'}")
+    if max_ms and best_total > max_ms:
+        print(f"Import time {best_total:.0f} ms exceeds {max_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="run")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=0, help="fail above this time")
+    args = parser.parse_args()
+    sys.exit(main(args.module, args.runs, args.max_ms))
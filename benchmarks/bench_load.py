@@ -0,0 +1,398 @@
+"""Load test of the full bot against a fake Bot API and fake AI servers.
+
+Starts a local fake Telegram Bot API and a fake Mistral-compatible server
+that streams answers with configurable latency and chunk sizes, then feeds
+thousands of simulated users through the real dispatcher, routers,
+middlewares, job queue and providers. Image generation and DuckDuckGo have
+no configurable endpoint, so the benchmark points the image provider and
+the search function at the fake server as well.
+
+For every flow it reports throughput, p50/p99 latency from the prompt to
+the finished job, and requests shed by admission control; the mailing flow
+reports delivered messages per second. Peak RSS is printed at the end.
+
+Usage: python -m benchmarks.bench_load [--flows text,image,search,mailing]
+       [--users 200] [--concurrency 50] [--first-token-ms 200] [--chunk-ms 10]
+       [--chunk-chars 20] [--answer-chars 400] [--image-ms 200] [--api-delay-ms 10]
+"""
+
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="bench_load_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'db.sqlite3')}"
+os.environ.setdefault("GROUP", "-1001")
+os.environ.setdefault("AITOKEN", "benchmark")
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import itertools  # noqa: E402
+import json  # noqa: E402
+import resource  # noqa: E402
+import time  # noqa: E402
+from collections import Counter  # noqa: E402
+from functools import partial  # noqa: E402
+from typing import Dict, List, Optional  # noqa: E402
+
+from aiogram import Bot  # noqa: E402
+from aiogram.client.default import DefaultBotProperties  # noqa: E402
+from aiogram.client.session.aiohttp import AiohttpSession  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.types import Update  # noqa: E402
+from aiohttp import web  # noqa: E402
+
+from run import create_dispatcher  # noqa: E402
+from telegram_ai_bot import broadcast, config, search  # noqa: E402
+from telegram_ai_bot.clients import close_clients, get_api_client  # noqa: E402
+from telegram_ai_bot.database.models import async_main, engine  # noqa: E402
+from telegram_ai_bot.database.requests import user_buffer  # noqa: E402
+from telegram_ai_bot.jobs import job_queue  # noqa: E402
+from telegram_ai_bot.providers import get_router  # noqa: E402
+from telegram_ai_bot.user import ERROR_TEXT  # noqa: E402
+
+TOKEN = "42:BENCHMARK"
+ADMIN_ID = 667393044
+# 1x1 transparent PNG
+PIXEL = (
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+FLOWS = {
+    "text": ("Text Generation", "Explain topic {n} in simple words"),
+    "image": ("Image Generation", "A red fox number {n} in the snow"),
+    "search": ("Web Search (beta)", "latest news about topic {n}"),
+}
+
+
+async def start_server(app: web.Application):
+    """Serve an application on a free local port and return runner and URL."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+class FakeBotAPI:
+    """Bot API answering every method after ``delay`` and counting calls."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.calls: Counter = Counter()
+        self.errors = 0
+        self._message_ids = itertools.count(1)
+
+    def app(self) -> web.Application:
+        """Return the aiohttp application."""
+        app = web.Application(client_max_size=16 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    def message(self, params: dict) -> dict:
+        """Return a message sent to the chat in ``params``."""
+        return {
+            "message_id": next(self._message_ids),
+            "date": 0,
+            "chat": {"id": int(params.get("chat_id") or 1), "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Answer a Bot API method."""
+        method = request.match_info["method"]
+        params = {key: value for key, value in (await request.post()).items()}
+        self.calls[method] += 1
+        if method == "getMe":
+            result = {"id": 42, "is_bot": True, "first_name": "Bench"}
+        elif method == "getChatMember":
+            user = {"id": int(params["user_id"]), "is_bot": False, "first_name": "Load"}
+            result = {"status": "member", "user": user}
+        else:
+            await asyncio.sleep(self.delay)
+            if params.get("text") == ERROR_TEXT:
+                self.errors += 1
+            if method in ("sendMessage", "sendPhoto", "editMessageText"):
+                result = self.message(params)
+            elif method == "copyMessage":
+                result = {"message_id": next(self._message_ids)}
+            else:
+                result = True
+        return web.json_response({"ok": True, "result": result})
+
+
+def fake_ai_server(
+    first_token: float, chunk_delay: float, chunk_chars: int, answer_chars: int, image_delay: float
+) -> web.Application:
+    """Return a fake Mistral chat API, image API and web pages."""
+    answer = ("The quick brown fox jumps over the lazy dog. " * (answer_chars // 40 + 1))[
+        :answer_chars
+    ]
+
+    async def chat(request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        chunks = [answer[i:i + chunk_chars] for i in range(0, len(answer), chunk_chars)]
+        if not body.get("stream"):
+            await asyncio.sleep(first_token + chunk_delay * len(chunks))
+            return web.json_response(
+                {
+                    "id": "bench",
+                    "object": "chat.completion",
+                    "model": body["model"],
+                    "created": 0,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": answer},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+                }
+            )
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await asyncio.sleep(first_token)
+        for chunk in chunks:
+            event = {
+                "id": "bench",
+                "object": "chat.completion.chunk",
+                "model": body["model"],
+                "created": 0,
+                "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}],
+            }
+            await response.write(f"data: {json.dumps(event)}\n\n".encode())
+            await asyncio.sleep(chunk_delay)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+    async def images(request: web.Request) -> web.Response:
+        await asyncio.sleep(image_delay)
+        return web.json_response({"data": [{"b64_json": PIXEL}]})
+
+    async def page(request: web.Request) -> web.Response:
+        paragraphs = "".join(f"<p>{answer}</p>" for _ in range(5))
+        return web.Response(text=f"<html><body>{paragraphs}</body></html>", content_type="text/html")
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", chat)
+    app.router.add_post("/v1/images/generations", images)
+    app.router.add_get("/page/{n}", page)
+    return app
+
+
+def use_fake_services(ai_url: str):
+    """Point the bot's AI, image and search backends at the fake server."""
+    config.MISTRAL_SERVER_URL = ai_url
+
+    async def generate_with_fake_flux(model: str, prompt: str) -> str:
+        response = await get_api_client().post(
+            f"{ai_url}/v1/images/generations", json={"model": model, "prompt": prompt}
+        )
+        response.raise_for_status()
+        return response.json()["data"][0]["b64_json"]
+
+    router = get_router("image")
+    router.backends.clear()
+    router.register("fake:flux", partial(generate_with_fake_flux, "flux"), 15.0)
+
+    def fake_ddgs_text(query: str, region: str, max_results: int) -> List[dict]:
+        return [
+            {"href": f"{ai_url}/page/{n}", "title": query, "body": query}
+            for n in range(max_results)
+        ]
+
+    search._ddgs_text = fake_ddgs_text
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Return the nearest-rank percentile of ``values``."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LoadTest:
+    """Drive simulated users through the dispatcher and time their jobs."""
+
+    def __init__(self, bot: Bot, api: FakeBotAPI, concurrency: int):
+        self.bot = bot
+        self.api = api
+        self.dp = create_dispatcher()
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self._update_ids = itertools.count(1)
+        self._done: Dict[int, asyncio.Event] = {}
+        submit = job_queue.submit
+
+        def tracked_submit(user_id, feature, run, *args):
+            event = self._done.setdefault(user_id, asyncio.Event())
+
+            async def tracked():
+                try:
+                    await run()
+                finally:
+                    event.set()
+
+            return submit(user_id, feature, tracked, *args)
+
+        job_queue.submit = tracked_submit
+
+    async def send(self, user_id: int, text: str):
+        """Feed a private text message from ``user_id``."""
+        update = Update.model_validate(
+            {
+                "update_id": next(self._update_ids),
+                "message": {
+                    "message_id": 1,
+                    "date": 0,
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": {"id": user_id, "is_bot": False, "first_name": "Load"},
+                    "text": text,
+                },
+            },
+            context={"bot": self.bot},
+        )
+        await self.dp.feed_update(self.bot, update)
+
+    async def user(self, user_id: int, button: str, prompt: str) -> Optional[float]:
+        """Open a feature and send a prompt; return the latency or None if shed."""
+        async with self.semaphore:
+            await self.send(user_id, button)
+            event = self._done[user_id] = asyncio.Event()
+            started = time.perf_counter()
+            await self.send(user_id, prompt)
+            if not event.is_set() and not job_queue.pending(user_id):
+                return None
+            await event.wait()
+            return time.perf_counter() - started
+
+    async def run_flow(self, flow: str, users: int, first_user: int) -> dict:
+        """Run ``users`` users through a generation flow."""
+        button, prompt = FLOWS[flow]
+        errors = self.api.errors
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(
+                self.user(first_user + n, button, prompt.format(n=n))
+                for n in range(users)
+            )
+        )
+        elapsed = time.perf_counter() - started
+        latencies = [result for result in results if result is not None]
+        return {
+            "flow": flow,
+            "users": users,
+            "completed": len(latencies),
+            "shed": users - len(latencies),
+            "errors": self.api.errors - errors,
+            "seconds": elapsed,
+            "throughput": len(latencies) / elapsed,
+            "p50": percentile(latencies, 0.5) if latencies else 0.0,
+            "p99": percentile(latencies, 0.99) if latencies else 0.0,
+        }
+
+    async def run_mailing(self, users: int, first_user: int) -> dict:
+        """Register ``users`` users with /start and mail them all."""
+        async def start(user_id: int):
+            async with self.semaphore:
+                await self.send(user_id, "/start")
+
+        await asyncio.gather(*(start(first_user + n) for n in range(users)))
+        await user_buffer.flush()
+        copies = self.api.calls["copyMessage"]
+        await self.send(ADMIN_ID, "/mailing")
+        started = time.perf_counter()
+        await self.send(ADMIN_ID, "Hello from the load test")
+        await asyncio.gather(*list(broadcast._tasks))
+        elapsed = time.perf_counter() - started
+        sent = self.api.calls["copyMessage"] - copies
+        return {
+            "flow": "mailing",
+            "users": users,
+            "completed": sent,
+            "shed": 0,
+            "errors": 0,
+            "seconds": elapsed,
+            "throughput": sent / elapsed,
+            "p50": 0.0,
+            "p99": 0.0,
+        }
+
+
+def report(results: List[dict], api: FakeBotAPI):
+    """Print one line per flow, Bot API calls and peak memory."""
+    print(
+        f"{'flow':8} {'users':>6} {'done':>6} {'shed':>5} {'errors':>6} "
+        f"{'seconds':>8} {'per sec':>8} {'p50 s':>7} {'p99 s':>7}"
+    )
+    for r in results:
+        print(
+            f"{r['flow']:8} {r['users']:6d} {r['completed']:6d} {r['shed']:5d} {r['errors']:6d} "
+            f"{r['seconds']:8.2f} {r['throughput']:8.1f} {r['p50']:7.2f} {r['p99']:7.2f}"
+        )
+    calls = ", ".join(f"{method} {count}" for method, count in api.calls.most_common())
+    print(f"Bot API calls: {calls}")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"Peak RSS: {peak:.0f} MB")
+
+
+async def main(args: argparse.Namespace):
+    """Start the fake servers, run the selected flows and print the report."""
+    config.BROADCAST_RATE = args.mailing_rate
+    config.BROADCAST_CONCURRENCY = args.concurrency
+    api = FakeBotAPI(args.api_delay_ms / 1000)
+    api_runner, api_url = await start_server(api.app())
+    ai_runner, ai_url = await start_server(
+        fake_ai_server(
+            args.first_token_ms / 1000,
+            args.chunk_ms / 1000,
+            args.chunk_chars,
+            args.answer_chars,
+            args.image_ms / 1000,
+        )
+    )
+    use_fake_services(ai_url)
+    await async_main()
+    await search.start_process_pool()
+    bot = Bot(
+        TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)),
+        default=DefaultBotProperties(parse_mode="Markdown"),
+    )
+    test = LoadTest(bot, api, args.concurrency)
+    results = []
+    try:
+        for index, flow in enumerate(args.flows.split(",")):
+            first_user = 1_000_000 * (index + 1)
+            if flow == "mailing":
+                results.append(await test.run_mailing(args.users, first_user))
+            else:
+                results.append(await test.run_flow(flow, args.users, first_user))
+    finally:
+        await job_queue.close(drain_timeout=0)
+        await user_buffer.flush()
+        await close_clients()
+        search.shutdown_executor()
+        await bot.session.close()
+        await ai_runner.cleanup()
+        await api_runner.cleanup()
+        await engine.dispose()
+    report(results, api)
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flows", default="text,image,search,mailing")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="users in flight")
+    parser.add_argument("--first-token-ms", type=float, default=200)
+    parser.add_argument("--chunk-ms", type=float, default=10)
+    parser.add_argument("--chunk-chars", type=int, default=20)
+    parser.add_argument("--answer-chars", type=int, default=400)
+    parser.add_argument("--image-ms", type=float, default=200)
+    parser.add_argument("--api-delay-ms", type=float, default=10)
+    parser.add_argument("--mailing-rate", type=float, default=1000, help="messages per second")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,48 @@
+"""Micro-benchmark of trim_history against ConversationBuffer.
+
+Simulates a long conversation where each turn appends a message and trims
+the history, as the text generation handler does.
+
+Usage: python -m benchmarks.bench_trim_history [turns] [max_messages]
+"""
+
+import asyncio
+import sys
+import time
+
+from telegram_ai_bot.utils.trim_history import ConversationBuffer, trim_history
+
+MESSAGE = {"role": "user", "content": "Расскажи про нейронные сети " * 20}
+
+
+async def bench_trim_history(turns: int, max_messages: int) -> float:
+    """Return seconds spent appending and trimming with trim_history."""
+    history = []
+    started = time.perf_counter()
+    for _ in range(turns):
+        history.append(dict(MESSAGE))
+        history = await trim_history(history, max_length=16384, max_messages=max_messages)
+    return time.perf_counter() - started
+
+
+def bench_buffer(turns: int, max_messages: int) -> float:
+    """Return seconds spent appending to a ConversationBuffer."""
+    buffer = ConversationBuffer(max_tokens=4096, max_messages=max_messages)
+    started = time.perf_counter()
+    for _ in range(turns):
+        buffer.append(MESSAGE)
+        buffer.messages()
+    return time.perf_counter() - started
+
+
+def main(turns: int = 20000, max_messages: int = 50):
+    """Run both variants and print per-turn cost."""
+    legacy = asyncio.run(bench_trim_history(turns, max_messages))
+    buffered = bench_buffer(turns, max_messages)
+    print(f"trim_history:       {legacy / turns * 1e6:.1f} us/turn")
+    print(f"ConversationBuffer: {buffered / turns * 1e6:.1f} us/turn")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    main(*args)
@@ -0,0 +1,78 @@
+"""Benchmark of loading all users against keyset-streaming their tg_ids.
+
+Builds a synthetic SQLite database with one user per row and compares the
+time and peak Python memory of ``get_users``-style ORM loading with
+``iter_tg_ids``.
+
+Usage: python -m benchmarks.bench_users [rows] [chunk_size]
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from telegram_ai_bot.database.models import Base, User
+from telegram_ai_bot.database.requests import iter_tg_ids
+
+
+async def create_database(path: str, rows: int):
+    """Create the schema and insert ``rows`` synthetic users."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+    with sqlite3.connect(path) as conn:
+        conn.executemany(
+            "INSERT INTO users (tg_id, is_active) VALUES (?, 1)",
+            ((100_000_000 + i,) for i in range(rows)),
+        )
+
+
+async def load_all(session_factory: async_sessionmaker) -> int:
+    """Load every user as an ORM object, like the old get_users."""
+    async with session_factory() as session:
+        users = list(await session.scalars(select(User)))
+    return sum(1 for _ in users)
+
+
+async def stream(session_factory: async_sessionmaker, chunk_size: int) -> int:
+    """Walk every tg_id with iter_tg_ids."""
+    count = 0
+    async for _ in iter_tg_ids(chunk_size, session_factory=session_factory):
+        count += 1
+    return count
+
+
+async def measure(name: str, coro) -> None:
+    """Print wall time and peak traced memory of a coroutine."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    count = await coro
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<12} {count} users in {elapsed:.2f}s, peak {peak / 2**20:.1f} MiB")
+
+
+async def main(rows: int = 1_000_000, chunk_size: int = 5000):
+    """Build the database and run both variants."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "users.sqlite3")
+        await create_database(path, rows)
+        engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        session_factory = async_sessionmaker(engine)
+        await measure("get_users", load_all(session_factory))
+        await measure("iter_tg_ids", stream(session_factory, chunk_size))
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    asyncio.run(main(*args))
@@ -0,0 +1,150 @@
+"""Load test of webhook delivery against long polling.
+
+Starts a fake Telegram Bot API that serves synthetic updates through
+getUpdates and answers sendMessage after a simulated delay, then measures
+how many updates per second an echo bot handles when updates are fetched
+by polling versus replayed at the local webhook endpoint.
+
+Usage: python -m benchmarks.bench_webhook [updates] [concurrency] [api_delay_ms]
+"""
+
+import asyncio
+import sys
+import time
+
+import aiohttp
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.types import Message
+from aiohttp import web
+
+from telegram_ai_bot import config
+from telegram_ai_bot.middleware.dedup_middleware import UpdateDeduplicationMiddleware
+from telegram_ai_bot.webhook import create_app
+
+TOKEN = "42:BENCHMARK"
+USER = {"id": 1, "is_bot": False, "first_name": "Load"}
+CHAT = {"id": 1, "type": "private"}
+
+
+def make_update(update_id: int) -> dict:
+    """Return a synthetic text message update."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": CHAT,
+            "from": USER,
+            "text": f"message {update_id}",
+        },
+    }
+
+
+async def start_server(app: web.Application):
+    """Serve an application on a free local port and return runner and URL."""
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def fake_bot_api(updates: list, api_delay: float) -> web.Application:
+    """Return a fake Bot API serving ``updates`` and echoing sendMessage."""
+    async def method(request):
+        name = request.match_info["method"]
+        params = dict(await request.post())
+        if name == "getMe":
+            return web.json_response({"ok": True, "result": {**USER, "is_bot": True}})
+        if name == "getUpdates":
+            offset = int(params.get("offset") or 0)
+            limit = int(params.get("limit") or 100)
+            batch = [update for update in updates if update["update_id"] >= offset][:limit]
+            if not batch:
+                await asyncio.sleep(0.05)
+            return web.json_response({"ok": True, "result": batch})
+        await asyncio.sleep(api_delay)
+        result = {"message_id": 1, "date": 0, "chat": CHAT, "text": params.get("text", "")}
+        return web.json_response({"ok": True, "result": result})
+
+    app = web.Application()
+    app.router.add_post("/bot{token}/{method}", method)
+    return app
+
+
+def echo_dispatcher(total: int, done: asyncio.Event) -> Dispatcher:
+    """Return a dispatcher that echoes messages and sets ``done`` after ``total``."""
+    router = Router()
+    handled = 0
+
+    @router.message()
+    async def echo(message: Message):
+        nonlocal handled
+        await message.answer(message.text, parse_mode=None)
+        handled += 1
+        if handled == total:
+            done.set()
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(UpdateDeduplicationMiddleware())
+    dp.include_router(router)
+    return dp
+
+
+async def bench_polling(api_url: str, total: int) -> float:
+    """Return seconds to handle ``total`` updates fetched by long polling."""
+    done = asyncio.Event()
+    dp = echo_dispatcher(total, done)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+    started = time.perf_counter()
+    polling = asyncio.create_task(dp.start_polling(bot, handle_signals=False, polling_timeout=1))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await dp.stop_polling()
+    await polling
+    return elapsed
+
+
+async def bench_webhook(api_url: str, total: int, concurrency: int) -> float:
+    """Return seconds to handle ``total`` updates posted to the webhook."""
+    done = asyncio.Event()
+    dp = echo_dispatcher(total, done)
+    bot = Bot(TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)))
+    runner, webhook_url = await start_server(create_app(dp, bot))
+    url = webhook_url + config.WEBHOOK_PATH
+    queue = iter(range(1, total + 1))
+    headers = {"X-Telegram-Bot-Api-Secret-Token": config.WEBHOOK_SECRET or ""}
+
+    async def sender(session: aiohttp.ClientSession):
+        for update_id in queue:
+            async with session.post(url, json=make_update(update_id), headers=headers) as response:
+                response.raise_for_status()
+
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as session:
+        await asyncio.gather(*(sender(session) for _ in range(concurrency)))
+    await done.wait()
+    elapsed = time.perf_counter() - started
+    await runner.cleanup()
+    return elapsed
+
+
+async def main(total: int = 2000, concurrency: int = 50, api_delay_ms: float = 20):
+    """Run both delivery modes and print throughput."""
+    updates = [make_update(update_id) for update_id in range(1, total + 1)]
+    api_runner, api_url = await start_server(fake_bot_api(updates, api_delay_ms / 1000))
+    try:
+        polling = await bench_polling(api_url, total)
+        webhook = await bench_webhook(api_url, total, concurrency)
+    finally:
+        await api_runner.cleanup()
+    print(f"polling: {total / polling:8.0f} updates/s")
+    print(f"webhook: {total / webhook:8.0f} updates/s ({concurrency} concurrent senders)")
+
+
+if __name__ == "__main__":
+    args = [float(arg) for arg in sys.argv[1:4]]
+    asyncio.run(main(*(int(arg) for arg in args[:2]), *args[2:]))
@@ -2,39 +2,101 @@
 
 import asyncio
 import logging
-import os
+from typing import List, Optional, Sequence
+
 from dotenv import load_dotenv
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 
-from src.telegram_ai_bot.admin import admin_router
-from src.telegram_ai_bot.database.models import async_main
-from src.telegram_ai_bot.user import user_router
-from src.telegram_ai_bot.utils.description import set_default_description
+from telegram_ai_bot import config
+from telegram_ai_bot.admin import admin_router
+from telegram_ai_bot.bots import get_bot_settings
+from telegram_ai_bot.broadcast import resume_broadcasts
+from telegram_ai_bot.clients import close_clients, start_sdk_preload
+from telegram_ai_bot.database.models import async_main
+from telegram_ai_bot.database.requests import user_buffer
+from telegram_ai_bot.fsm_storage import create_storage
+from telegram_ai_bot.jobs import job_queue
+from telegram_ai_bot.metrics import metrics_server
+from telegram_ai_bot.middleware.bot_settings_middleware import BotSettingsMiddleware
+from telegram_ai_bot.middleware.dedup_middleware import UpdateDeduplicationMiddleware
+from telegram_ai_bot.middleware.metrics_middleware import MetricsMiddleware
+from telegram_ai_bot.search import shutdown_executor, start_process_pool
+from telegram_ai_bot.user import history_store, user_router
+from telegram_ai_bot.utils.description import set_default_description
+from telegram_ai_bot.webhook import run_webhook
 
 
-async def on_startup():
-    """Initialize database on bot startup."""
-    await async_main()
+async def on_startup(
+    bot: Bot, bots: Optional[Sequence[Bot]] = None, primary: bool = True
+):
+    """Initialize database and workers, prune idle histories and resume mailings.
 
+    With several webhook workers only the primary one resumes mailings.
+    Rows created before multi-bot support are assigned to the first bot.
+    The provider SDKs are imported in the background while polling starts.
+    """
+    bots = bots or [bot]
+    if config.SDK_PRELOAD:
+        start_sdk_preload()
+    await async_main(bots[0].id)
+    await start_process_pool()
+    if primary:
+        await history_store.prune()
+        for each in bots:
+            await set_default_description(each)
+        await resume_broadcasts(bots)
 
-async def main():
-    """Start the Telegram bot."""
+
+async def on_shutdown(dispatcher: Dispatcher):
+    """Finish jobs, flush pending writes and release connections and threads."""
+    await job_queue.close()
+    await user_buffer.flush()
+    await dispatcher.storage.close()
+    await close_clients()
+    shutdown_executor()
+
+
+def create_bots() -> List[Bot]:
+    """Create a client for every configured bot."""
     load_dotenv()
-    bot = Bot(
-        token=os.getenv("TOKEN"),
-        default=DefaultBotProperties(parse_mode="Markdown"),
-    )
-    dp = Dispatcher()
+    return [
+        Bot(token=settings.token, default=DefaultBotProperties(parse_mode="Markdown"))
+        for settings in get_bot_settings()
+    ]
+
+
+def create_dispatcher() -> Dispatcher:
+    """Create the dispatcher with all routers and lifecycle hooks."""
+    dp = Dispatcher(storage=create_storage())
+    dp.update.outer_middleware(MetricsMiddleware())
+    dp.update.outer_middleware(UpdateDeduplicationMiddleware())
+    dp.update.outer_middleware(BotSettingsMiddleware())
     dp.include_routers(user_router, admin_router)
     dp.startup.register(on_startup)
-    await set_default_description(bot)
-    await dp.start_polling(bot)
+    dp.shutdown.register(on_shutdown)
+    return dp
+
+
+async def main():
+    """Start the Telegram bots with long polling in one event loop."""
+    bots = create_bots()
+    dp = create_dispatcher()
+    for bot in bots:
+        await bot.delete_webhook()
+    if config.METRICS_PORT:
+        async with metrics_server(config.METRICS_PORT):
+            await dp.start_polling(*bots)
+    else:
+        await dp.start_polling(*bots)
 
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        logging.info("Bot stopped")
+    if config.BOT_MODE == "webhook":
+        run_webhook(create_dispatcher, create_bots)
+    else:
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            logging.info("Bot stopped")
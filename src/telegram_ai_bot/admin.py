@@ -5,17 +5,19 @@ from aiogram.filters import Command, Filter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message
 
-from telegram_ai_bot.database.requests import get_users
+from telegram_ai_bot.bots import current_bot
+from telegram_ai_bot.broadcast import start_broadcast
+from telegram_ai_bot.database.requests import create_broadcast
 from telegram_ai_bot.states import Mailing
 
 admin_router = Router(name="admin")
 
 
 class AdminFilter(Filter):
-    """Filter to check if the user is an admin."""
+    """Filter to check if the user is an admin of the bot."""
 
     async def __call__(self, message: Message) -> bool:
-        return message.from_user.id in [667393044]
+        return message.from_user.id in current_bot().admins
 
 
 @admin_router.message(AdminFilter(), Command("mailing"))
@@ -27,13 +29,13 @@ async def start_mailing(message: Message, state: FSMContext):
 
 @admin_router.message(Mailing.message)
 async def send_mailing_message(message: Message, state: FSMContext):
-    """Send the mailing message to all users and clear the state."""
+    """Start a background mailing of the message to all users and clear the state."""
     await state.clear()
-    await message.answer("Mailing started")
-    users = await get_users()
-    for user in users:
-        try:
-            await message.send_copy(chat_id=user.tg_id)
-        except Exception as e:
-            print(f"Error sending message to {user.tg_id}: {e}")
-    await message.answer("Mailing completed")
\ No newline at end of file
+    broadcast_id = await create_broadcast(
+        bot_id=message.bot.id,
+        admin_chat_id=message.chat.id,
+        from_chat_id=message.chat.id,
+        message_id=message.message_id,
+    )
+    start_broadcast(message.bot, broadcast_id)
+    await message.answer("Mailing started")
\ No newline at end of file
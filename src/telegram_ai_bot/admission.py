@@ -0,0 +1,196 @@
+"""Admission control for AI requests: per-user rate limits and global queues."""
+
+import asyncio
+import logging
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Hashable, Optional
+
+from telegram_ai_bot import config
+from telegram_ai_bot.metrics import Counter, Gauge, registry
+from telegram_ai_bot.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+rejected_requests = registry.register(
+    Counter(
+        "bot_admission_rejected_total",
+        "AI requests refused by admission control.",
+        ["feature", "reason"],
+    )
+)
+
+
+class RateLimited(Exception):
+    """The user sent requests faster than allowed."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """The feature's wait queue is full and the request was shed."""
+
+
+class FeatureGate:
+    """FIFO concurrency limit with a bounded wait queue."""
+
+    def __init__(self, limit: int, max_queue: int):
+        self.limit = limit
+        self.max_queue = max_queue
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def queued(self) -> int:
+        """Return the number of requests waiting for a slot."""
+        return len(self._waiters)
+
+    @property
+    def full(self) -> bool:
+        """Return True if a new request would have to be shed."""
+        return self.active >= self.limit and self.queued >= self.max_queue
+
+    async def acquire(self, on_queued: Optional[Callable[[int], Awaitable]] = None):
+        """Take a slot, waiting in line if all are busy."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue:
+            raise Overloaded()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            if on_queued is not None:
+                await on_queued(len(self._waiters))
+            await waiter
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        """Free a slot, handing it to the next waiter if there is one."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class AdmissionController:
+    """Decide whether, and when, an AI request may start.
+
+    Each user has a token bucket refilled every ``user_interval`` seconds.
+    Each feature has a global concurrency limit; requests beyond it wait in
+    a FIFO queue of at most ``max_queue`` entries and are shed beyond that.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        user_interval: Optional[float] = None,
+        user_burst: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        max_users: Optional[int] = None,
+    ):
+        self.limits = limits or config.ADMISSION_CONCURRENCY
+        self.user_interval = (
+            config.ADMISSION_USER_INTERVAL if user_interval is None else user_interval
+        )
+        self.user_burst = user_burst or config.ADMISSION_USER_BURST
+        self.max_queue = config.ADMISSION_MAX_QUEUE if max_queue is None else max_queue
+        self.max_users = max_users or config.ADMISSION_MAX_USERS
+        self.gates: Dict[str, FeatureGate] = {}
+        self._buckets: "OrderedDict[Hashable, TokenBucket]" = OrderedDict()
+
+    def gate(self, feature: str) -> FeatureGate:
+        """Return the concurrency gate of a feature."""
+        gate = self.gates.get(feature)
+        if gate is None:
+            limit = self.limits.get(feature, config.ADMISSION_DEFAULT_CONCURRENCY)
+            gate = self.gates[feature] = FeatureGate(limit, self.max_queue)
+        return gate
+
+    def _bucket(self, user_id: Hashable, interval: float, burst: int) -> TokenBucket:
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = TokenBucket(1 / interval, burst)
+            self._buckets[user_id] = bucket
+            while len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(user_id)
+        return bucket
+
+    def check(
+        self,
+        user_id: Hashable,
+        feature: str,
+        user_interval: Optional[float] = None,
+        user_burst: Optional[int] = None,
+    ):
+        """Charge the user's rate limit unless the feature is overloaded.
+
+        ``user_interval`` and ``user_burst`` override the controller's rate
+        for this user. Raises Overloaded if the feature's queue is full and
+        RateLimited if the user is over their rate.
+        """
+        if self.gate(feature).full:
+            logger.warning(f"Shedding {feature} request of {user_id}: queue is full")
+            rejected_requests.inc(feature=feature, reason="overloaded")
+            raise Overloaded()
+        interval = self.user_interval if user_interval is None else user_interval
+        if interval > 0:
+            burst = user_burst or self.user_burst
+            delay = self._bucket(user_id, interval, burst).try_acquire()
+            if delay:
+                rejected_requests.inc(feature=feature, reason="rate_limited")
+                raise RateLimited(delay)
+
+    @asynccontextmanager
+    async def slot(
+        self, feature: str, on_queued: Optional[Callable[[int], Awaitable]] = None
+    ) -> AsyncIterator[None]:
+        """Hold a concurrency slot of ``feature`` while the block runs.
+
+        ``on_queued`` is awaited with the queue position when the request
+        has to wait.
+        """
+        gate = self.gate(feature)
+        await gate.acquire(on_queued)
+        try:
+            yield
+        finally:
+            gate.release()
+
+    @asynccontextmanager
+    async def admit(
+        self,
+        user_id: int,
+        feature: str,
+        on_queued: Optional[Callable[[int], Awaitable]] = None,
+    ) -> AsyncIterator[None]:
+        """Check the user's request and hold a slot of ``feature`` for it."""
+        self.check(user_id, feature)
+        async with self.slot(feature, on_queued):
+            yield
+
+
+admission = AdmissionController()
+
+
+def _collect_admission_metrics():
+    active = Gauge("bot_admission_active", "AI requests holding a slot.", ["feature"])
+    queued = Gauge("bot_admission_queued", "AI requests waiting for a slot.", ["feature"])
+    for feature, gate in admission.gates.items():
+        active.set(gate.active, feature=feature)
+        queued.set(gate.queued, feature=feature)
+    return [active, queued]
+
+
+registry.add_collector(_collect_admission_metrics)
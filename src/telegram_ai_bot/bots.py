@@ -0,0 +1,137 @@
+"""Settings of the bots served by one process.
+
+``BOTS_CONFIG`` names a JSON file listing the bots::
+
+    {"bots": [
+        {"name": "main", "token": "123:ABC", "admins": [667393044], "group": "@channel",
+         "providers": {"text": "mistral:mistral-small-latest"},
+         "user_interval": 5, "user_burst": 2}
+    ]}
+
+Only ``token`` is required. Without the file a single bot is configured from
+``TOKEN``, ``GROUP`` and ``ADMINS``. The settings of the bot handling the
+current update live in a context variable set by ``BotSettingsMiddleware``.
+"""
+
+import json
+import os
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from telegram_ai_bot import config
+
+DEFAULT_ADMINS = [667393044]
+CAPABILITIES = ("text", "code", "vision", "image")
+FIELDS = (
+    "token", "name", "admins", "group", "providers", "user_interval", "user_burst"
+)
+
+
+class BotSettings:
+    """Token and per-bot overrides of one bot."""
+
+    def __init__(
+        self,
+        token: str,
+        name: Optional[str] = None,
+        admins: Optional[List[int]] = None,
+        group: Optional[str] = None,
+        providers: Optional[Dict[str, str]] = None,
+        user_interval: Optional[float] = None,
+        user_burst: Optional[int] = None,
+    ):
+        self.token = token
+        # Telegram tokens start with the bot id, as aiogram's Bot.id assumes
+        prefix = token.split(":", 1)[0]
+        self.id = int(prefix) if prefix.isdigit() else 0
+        self.name = name or str(self.id)
+        self.admins = list(DEFAULT_ADMINS if admins is None else admins)
+        self.group = group
+        self.providers = dict(providers or {})
+        self.user_interval = user_interval
+        self.user_burst = user_burst
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "BotSettings":
+        """Build settings from one entry of the bots file."""
+        unknown = set(data) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown bot settings: {', '.join(sorted(unknown))}")
+        unknown = set(data.get("providers") or {}) - set(CAPABILITIES)
+        if unknown:
+            raise ValueError(f"Unknown capabilities: {', '.join(sorted(unknown))}")
+        return cls(**data)
+
+
+def _env_admins() -> Optional[List[int]]:
+    value = os.getenv("ADMINS")
+    if not value:
+        return None
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def load_bot_settings(path: Optional[str] = None) -> List[BotSettings]:
+    """Read the bots file, or describe the single bot of the environment."""
+    path = path or config.BOTS_CONFIG
+    if not path:
+        return [
+            BotSettings(
+                os.getenv("TOKEN", ""),
+                name="default",
+                admins=_env_admins(),
+                group=os.getenv("GROUP"),
+            )
+        ]
+    with open(path, encoding="utf-8") as file:
+        entries = json.load(file)["bots"]
+    if not entries:
+        raise ValueError(f"No bots configured in {path}")
+    settings = [BotSettings.from_dict(entry) for entry in entries]
+    names = [bot.name for bot in settings]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Bot names must be unique in {path}")
+    return settings
+
+
+_bots: Dict[int, BotSettings] = {}
+_current: ContextVar[Optional[BotSettings]] = ContextVar("bot_settings", default=None)
+
+
+def get_bot_settings() -> List[BotSettings]:
+    """Return the settings of every configured bot, loading them on first use."""
+    if not _bots:
+        set_bot_settings(load_bot_settings())
+    return list(_bots.values())
+
+
+def set_bot_settings(settings: List[BotSettings]):
+    """Replace the configured bots."""
+    _bots.clear()
+    _bots.update((bot.id, bot) for bot in settings)
+
+
+def settings_for(bot_id: int) -> BotSettings:
+    """Return the settings of a bot by its Telegram id.
+
+    Bots missing from the configuration get the first bot's settings.
+    """
+    return _bots.get(bot_id) or get_bot_settings()[0]
+
+
+def current_bot() -> BotSettings:
+    """Return the settings of the bot handling the current update.
+
+    Outside of an update the first configured bot is used.
+    """
+    settings = _current.get()
+    return settings if settings is not None else get_bot_settings()[0]
+
+
+def use_bot(settings: BotSettings):
+    """Make ``settings`` current and return a token for ``reset_bot``."""
+    return _current.set(settings)
+
+
+def reset_bot(token):
+    """Restore the settings that were current before ``use_bot``."""
+    _current.reset(token)
@@ -0,0 +1,145 @@
+"""Rate-limited, resumable broadcast engine for admin mailings."""
+
+import asyncio
+import logging
+import time
+from typing import Optional, Sequence, Set
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramRetryAfter,
+)
+
+from telegram_ai_bot import config
+from telegram_ai_bot.database.requests import (
+    deactivate_users,
+    get_active_users_after,
+    get_broadcast,
+    get_running_broadcasts,
+    update_broadcast,
+)
+from telegram_ai_bot.utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+SENT, FAILED, BLOCKED = "sent", "failed", "blocked"
+
+_tasks: Set[asyncio.Task] = set()
+
+
+class Broadcaster:
+    """Copy a message to every active user within Telegram's global rate limit.
+
+    Sends run concurrently up to ``concurrency`` at a time and draw from a
+    shared token bucket. A ``RetryAfter`` pauses the whole bucket before the
+    message is retried. Users who blocked the bot are marked inactive.
+    Progress is saved after every batch so a restarted bot resumes where it
+    stopped, and the admin receives periodic throughput reports.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        rate: Optional[float] = None,
+        concurrency: Optional[int] = None,
+        batch_size: Optional[int] = None,
+    ):
+        self.bot = bot
+        rate = rate or config.BROADCAST_RATE
+        self.bucket = TokenBucket(rate, capacity=rate)
+        self.semaphore = asyncio.Semaphore(concurrency or config.BROADCAST_CONCURRENCY)
+        self.batch_size = batch_size or config.BROADCAST_BATCH_SIZE
+
+    async def run(self, broadcast_id: int) -> dict:
+        """Run or resume a mailing and return its final counters."""
+        broadcast = await get_broadcast(broadcast_id)
+        counters = {SENT: broadcast.sent, FAILED: broadcast.failed, BLOCKED: broadcast.blocked}
+        last_user_id = broadcast.last_user_id
+        started = time.monotonic()
+        sent_at_start = counters[SENT]
+        next_report = started + config.BROADCAST_PROGRESS_INTERVAL
+        while True:
+            users = await get_active_users_after(
+                broadcast.bot_id, last_user_id, self.batch_size
+            )
+            if not users:
+                break
+            results = await asyncio.gather(
+                *(
+                    self._send(tg_id, broadcast.from_chat_id, broadcast.message_id)
+                    for _, tg_id in users
+                )
+            )
+            blocked = [tg_id for (_, tg_id), result in zip(users, results) if result == BLOCKED]
+            for result in results:
+                counters[result] += 1
+            await deactivate_users(broadcast.bot_id, blocked)
+            last_user_id = users[-1].user_id
+            await update_broadcast(broadcast_id, last_user_id=last_user_id, **counters)
+            if time.monotonic() >= next_report:
+                next_report = time.monotonic() + config.BROADCAST_PROGRESS_INTERVAL
+                rate = (counters[SENT] - sent_at_start) / (time.monotonic() - started)
+                await self._report(broadcast.admin_chat_id, "Mailing in progress", counters, rate)
+        await update_broadcast(broadcast_id, status="done")
+        elapsed = max(time.monotonic() - started, 1e-9)
+        rate = (counters[SENT] - sent_at_start) / elapsed
+        await self._report(broadcast.admin_chat_id, "Mailing completed", counters, rate)
+        return counters
+
+    async def _send(self, tg_id: int, from_chat_id: int, message_id: int) -> str:
+        async with self.semaphore:
+            for _ in range(config.BROADCAST_MAX_RETRIES):
+                await self.bucket.acquire()
+                try:
+                    await self.bot.copy_message(
+                        chat_id=tg_id, from_chat_id=from_chat_id, message_id=message_id
+                    )
+                    return SENT
+                except TelegramRetryAfter as e:
+                    self.bucket.pause(e.retry_after)
+                except TelegramForbiddenError:
+                    return BLOCKED
+                except TelegramBadRequest as e:
+                    if "chat not found" in e.message:
+                        return BLOCKED
+                    logger.warning(f"Error sending message to {tg_id}: {e}")
+                    return FAILED
+                except Exception as e:
+                    logger.warning(f"Error sending message to {tg_id}: {e}")
+                    return FAILED
+            return FAILED
+
+    async def _report(self, chat_id: int, title: str, counters: dict, rate: float):
+        try:
+            await self.bot.send_message(
+                chat_id=chat_id,
+                text=(
+                    f"{title}\nSent: {counters[SENT]}, failed: {counters[FAILED]}, "
+                    f"blocked: {counters[BLOCKED]}\nThroughput: {rate:.1f} msg/s"
+                ),
+                parse_mode=None,
+            )
+        except Exception as e:
+            logger.warning(f"Unable to report mailing progress: {e}")
+
+
+def start_broadcast(bot: Bot, broadcast_id: int) -> asyncio.Task:
+    """Run a mailing in the background."""
+    task = asyncio.create_task(Broadcaster(bot).run(broadcast_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def resume_broadcasts(bots: Sequence[Bot]):
+    """Resume mailings interrupted by a restart with the bots that started them."""
+    bots_by_id = {bot.id: bot for bot in bots}
+    for broadcast_id, bot_id in await get_running_broadcasts():
+        bot = bots_by_id.get(bot_id)
+        if bot is None:
+            logger.warning(f"Mailing {broadcast_id} belongs to unserved bot {bot_id}")
+            continue
+        logger.info(f"Resuming mailing {broadcast_id}")
+        start_broadcast(bot, broadcast_id)
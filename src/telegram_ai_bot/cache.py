@@ -0,0 +1,209 @@
+"""TTL caches with size-bounded LRU eviction and in-memory or SQLite storage."""
+
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from telegram_ai_bot import config
+from telegram_ai_bot.database.models import CacheEntry, async_session
+from telegram_ai_bot.metrics import Counter, registry
+
+logger = logging.getLogger(__name__)
+
+_caches: Dict[str, Any] = {}
+
+
+def normalize_text(text: str) -> str:
+    """Normalize user text for use as a cache key."""
+    return " ".join(text.lower().split())
+
+
+class CacheStats:
+    """Hit and miss counters of a cache."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Return the share of lookups served from the cache."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MemoryCache:
+    """In-process cache with per-entry TTL and LRU eviction."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return a cached value or None if it is missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.stats.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return entry[1]
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entries if full.
+
+        ``ttl`` overrides the cache's default lifetime for this entry.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        """Remove an entry if present."""
+        self._entries.pop(key, None)
+
+    async def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+
+
+class SQLiteCache:
+    """Cache stored in the bot database so entries survive restarts.
+
+    Values must be JSON-serializable.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float, session_factory=async_session):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.session_factory = session_factory
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Return a cached value or None if it is missing or expired."""
+        now = time.time()
+        async with self.session_factory() as session:
+            row = (
+                await session.execute(
+                    select(CacheEntry.value, CacheEntry.expires_at).where(
+                        CacheEntry.namespace == self.name, CacheEntry.key == key
+                    )
+                )
+            ).first()
+            if row is None or row.expires_at <= now:
+                self.stats.misses += 1
+                return None
+            await session.execute(
+                update(CacheEntry)
+                .where(CacheEntry.namespace == self.name, CacheEntry.key == key)
+                .values(accessed_at=now)
+            )
+            await session.commit()
+            self.stats.hits += 1
+            return json.loads(row.value)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting expired and least recently used entries.
+
+        ``ttl`` overrides the cache's default lifetime for this entry.
+        """
+        now = time.time()
+        values = {
+            "value": json.dumps(value),
+            "expires_at": now + (self.ttl if ttl is None else ttl),
+            "accessed_at": now,
+        }
+        async with self.session_factory() as session:
+            await session.execute(
+                insert(CacheEntry)
+                .values(namespace=self.name, key=key, **values)
+                .on_conflict_do_update(index_elements=["namespace", "key"], set_=values)
+            )
+            await session.execute(
+                delete(CacheEntry).where(
+                    CacheEntry.namespace == self.name, CacheEntry.expires_at <= now
+                )
+            )
+            count = await session.scalar(
+                select(func.count()).where(CacheEntry.namespace == self.name)
+            )
+            if count > self.maxsize:
+                oldest = (
+                    select(CacheEntry.key)
+                    .where(CacheEntry.namespace == self.name)
+                    .order_by(CacheEntry.accessed_at)
+                    .limit(count - self.maxsize)
+                )
+                await session.execute(
+                    delete(CacheEntry).where(
+                        CacheEntry.namespace == self.name, CacheEntry.key.in_(oldest)
+                    )
+                )
+            await session.commit()
+
+    async def delete(self, key: str):
+        """Remove an entry if present."""
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(CacheEntry).where(
+                    CacheEntry.namespace == self.name, CacheEntry.key == key
+                )
+            )
+            await session.commit()
+
+    async def clear(self):
+        """Remove all entries."""
+        async with self.session_factory() as session:
+            await session.execute(delete(CacheEntry).where(CacheEntry.namespace == self.name))
+            await session.commit()
+
+
+def create_cache(name: str, maxsize: int, ttl: float, backend: Optional[str] = None):
+    """Create a named cache using the configured backend."""
+    backend = backend or config.CACHE_BACKEND
+    if backend == "sqlite":
+        cache = SQLiteCache(name, maxsize, ttl)
+    elif backend == "memory":
+        cache = MemoryCache(name, maxsize, ttl)
+    else:
+        raise ValueError(f"Unknown cache backend: {backend}")
+    register_cache(name, cache)
+    return cache
+
+
+def register_cache(name: str, cache: Any):
+    """Include a cache that has a ``stats`` attribute in ``cache_stats``."""
+    _caches[name] = cache
+
+
+def cache_stats() -> Dict[str, CacheStats]:
+    """Return hit and miss counters of every cache created so far."""
+    return {name: cache.stats for name, cache in _caches.items()}
+
+
+def _collect_cache_metrics():
+    hits = Counter("bot_cache_hits_total", "Cache lookups served from the cache.", ["cache"])
+    misses = Counter("bot_cache_misses_total", "Cache lookups that missed.", ["cache"])
+    for name, stats in cache_stats().items():
+        hits.inc(stats.hits, cache=name)
+        misses.inc(stats.misses, cache=name)
+    return [hits, misses]
+
+
+registry.add_collector(_collect_cache_metrics)
@@ -0,0 +1,121 @@
+"""Process-wide provider clients with keep-alive connection pooling.
+
+The provider SDKs are slow to import, so they are imported when their
+client is first needed, or ahead of time by ``preload_sdks``.
+"""
+
+import asyncio
+import importlib
+import importlib.util
+import logging
+from typing import TYPE_CHECKING, Optional
+
+from telegram_ai_bot import config
+
+if TYPE_CHECKING:
+    import httpx
+    from g4f.client import AsyncClient
+    from mistralai import Mistral
+
+logger = logging.getLogger(__name__)
+
+# Modules imported by the clients and the search, in preload order
+SDK_MODULES = ("httpx", "mistralai", "duckduckgo_search", "g4f.client")
+
+_api_client: Optional["httpx.AsyncClient"] = None
+_web_client: Optional["httpx.AsyncClient"] = None
+_mistral_client: Optional["Mistral"] = None
+_image_client: Optional["AsyncClient"] = None
+_preload_task: Optional[asyncio.Task] = None
+
+
+def http2_available() -> bool:
+    """Return True if HTTP/2 is enabled and the ``h2`` package is installed."""
+    return config.HTTP2_ENABLED and importlib.util.find_spec("h2") is not None
+
+
+def build_http_client(timeout: float) -> "httpx.AsyncClient":
+    """Build an HTTP client using the configured pool limits."""
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=config.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=config.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=config.HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        http2=http2_available(),
+        limits=limits,
+        timeout=httpx.Timeout(timeout, connect=config.HTTP_CONNECT_TIMEOUT),
+        follow_redirects=True,
+    )
+
+
+def get_api_client() -> "httpx.AsyncClient":
+    """Return the shared HTTP client used for AI provider APIs."""
+    global _api_client
+    if _api_client is None or _api_client.is_closed:
+        _api_client = build_http_client(config.API_TIMEOUT)
+    return _api_client
+
+
+def get_web_client() -> "httpx.AsyncClient":
+    """Return the shared HTTP client used for fetching web pages."""
+    global _web_client
+    if _web_client is None or _web_client.is_closed:
+        _web_client = build_http_client(config.WEB_TIMEOUT)
+    return _web_client
+
+
+def get_mistral_client() -> "Mistral":
+    """Return the shared Mistral client backed by the pooled API client."""
+    global _mistral_client
+    if _mistral_client is None:
+        from mistralai import Mistral
+
+        _mistral_client = Mistral(
+            api_key=config.get_ai_token,
+            server_url=config.MISTRAL_SERVER_URL,
+            async_client=get_api_client(),
+        )
+    return _mistral_client
+
+
+def get_image_client() -> "AsyncClient":
+    """Return the shared g4f client used for image generation."""
+    global _image_client
+    if _image_client is None:
+        from g4f.client import AsyncClient
+
+        _image_client = AsyncClient()
+    return _image_client
+
+
+def preload_sdks(modules=SDK_MODULES):
+    """Import the provider SDKs so the first requests do not wait for them.
+
+    Blocking; run it in a thread. Missing optional SDKs are skipped.
+    """
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError as e:
+            logger.warning(f"Unable to preload {name}: {e}")
+
+
+def start_sdk_preload() -> asyncio.Task:
+    """Start preloading the provider SDKs in a thread, once per process."""
+    global _preload_task
+    if _preload_task is None:
+        _preload_task = asyncio.create_task(asyncio.to_thread(preload_sdks))
+    return _preload_task
+
+
+async def close_clients():
+    """Close all pooled connections; safe to call more than once."""
+    global _api_client, _web_client, _mistral_client, _image_client
+    for client in (_api_client, _web_client):
+        if client is not None and not client.is_closed:
+            await client.aclose()
+    _api_client = _web_client = _mistral_client = _image_client = None
+    logger.info("Provider clients closed")
@@ -0,0 +1,188 @@
+"""Runtime configuration for the Telegram AI Bot loaded from the environment."""
+
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment."""
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def env_bool(name: str, default: bool) -> bool:
+    """Read a boolean setting from the environment."""
+    value = os.getenv(name)
+    if not value:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def get_ai_token() -> str:
+    """Return the Mistral API key; read lazily so it can be rotated."""
+    return os.getenv("AITOKEN")
+
+
+# Database used by the bot, caches and stores
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///db.sqlite3")
+
+# Write-behind registration of new users
+USER_FLUSH_SIZE = env_int("USER_FLUSH_SIZE", 100)
+USER_FLUSH_INTERVAL = env_float("USER_FLUSH_INTERVAL", 1.0)
+USER_KNOWN_IDS = env_int("USER_KNOWN_IDS", 100000)
+
+# Mistral API endpoint, overridable to point the bot at a local stub server
+MISTRAL_SERVER_URL = os.getenv("MISTRAL_SERVER_URL", "https://api.mistral.ai")
+
+# Import the provider SDKs in a background thread at startup
+SDK_PRELOAD = env_bool("SDK_PRELOAD", True)
+
+# Connection pooling for the shared HTTP clients
+HTTP2_ENABLED = env_bool("HTTP2_ENABLED", True)
+HTTP_MAX_CONNECTIONS = env_int("HTTP_MAX_CONNECTIONS", 100)
+HTTP_MAX_KEEPALIVE = env_int("HTTP_MAX_KEEPALIVE", 20)
+HTTP_KEEPALIVE_EXPIRY = env_float("HTTP_KEEPALIVE_EXPIRY", 30.0)
+HTTP_CONNECT_TIMEOUT = env_float("HTTP_CONNECT_TIMEOUT", 10.0)
+API_TIMEOUT = env_float("API_TIMEOUT", 60.0)
+WEB_TIMEOUT = env_float("WEB_TIMEOUT", 10.0)
+
+# Progressive delivery of streamed answers via edit_text
+STREAM_REPLIES = env_bool("STREAM_REPLIES", True)
+STREAM_EDIT_INTERVAL = env_float("STREAM_EDIT_INTERVAL", 1.0)
+STREAM_MAX_EDIT_INTERVAL = env_float("STREAM_MAX_EDIT_INTERVAL", 10.0)
+
+# Image generation prompt enhancement
+IMAGE_PROMPT_MODEL = os.getenv("IMAGE_PROMPT_MODEL", "mistral-large-2411")
+IMAGE_PROMPT_SKIP_WORDS = env_int("IMAGE_PROMPT_SKIP_WORDS", 25)
+IMAGE_PROMPT_CACHE_SIZE = env_int("IMAGE_PROMPT_CACHE_SIZE", 1000)
+IMAGE_PROMPT_CACHE_TTL = env_float("IMAGE_PROMPT_CACHE_TTL", 7 * 24 * 3600.0)
+
+# Opt-in cache of single-turn text and code answers matched by similarity
+SEMANTIC_CACHE = env_bool("SEMANTIC_CACHE", False)
+SEMANTIC_CACHE_SIZE = env_int("SEMANTIC_CACHE_SIZE", 5000)
+SEMANTIC_CACHE_TTL = env_float("SEMANTIC_CACHE_TTL", 24 * 3600.0)
+SEMANTIC_CACHE_THRESHOLD = env_float("SEMANTIC_CACHE_THRESHOLD", 0.9)
+SEMANTIC_CACHE_PERMUTATIONS = env_int("SEMANTIC_CACHE_PERMUTATIONS", 64)
+
+# Prometheus metrics on a separate port (0 disables) and OpenTelemetry spans
+METRICS_PORT = env_int("METRICS_PORT", 0)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+TRACING = env_bool("TRACING", False)
+
+# Image recognition; downscaling needs the optional Pillow package
+VISION_MAX_SIDE = env_int("VISION_MAX_SIDE", 1024)
+VISION_JPEG_QUALITY = env_int("VISION_JPEG_QUALITY", 90)
+VISION_THREAD_BYTES = env_int("VISION_THREAD_BYTES", 256 * 1024)
+
+# Web search pipeline
+SEARCH_WORKERS = env_int("SEARCH_WORKERS", 4)
+SEARCH_DEADLINE = env_float("SEARCH_DEADLINE", 8.0)
+SEARCH_CHUNK_SIZE = env_int("SEARCH_CHUNK_SIZE", 16384)
+SEARCH_MAX_PAGE_BYTES = env_int("SEARCH_MAX_PAGE_BYTES", 2 * 1024 * 1024)
+SEARCH_PAGE_CHARS = env_int("SEARCH_PAGE_CHARS", 550)
+# HTML extraction: auto, selectolax, lxml, bs4 or stdlib; 0 processes uses threads
+SEARCH_EXTRACTOR = os.getenv("SEARCH_EXTRACTOR", "auto")
+SEARCH_PROCESSES = env_int("SEARCH_PROCESSES", 2)
+SEARCH_PARAGRAPH_MARGIN = env_float("SEARCH_PARAGRAPH_MARGIN", 4.0)
+
+# Web search caches ("memory" or "sqlite")
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+REWRITE_CACHE_SIZE = env_int("REWRITE_CACHE_SIZE", 1000)
+REWRITE_CACHE_TTL = env_float("REWRITE_CACHE_TTL", 24 * 3600.0)
+SEARCH_CACHE_SIZE = env_int("SEARCH_CACHE_SIZE", 1000)
+SEARCH_CACHE_TTL = env_float("SEARCH_CACHE_TTL", 3600.0)
+PAGE_CACHE_SIZE = env_int("PAGE_CACHE_SIZE", 2000)
+PAGE_CACHE_TTL = env_float("PAGE_CACHE_TTL", 6 * 3600.0)
+
+# Conversation history ("memory" or "sqlite")
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "memory")
+HISTORY_MAX_MESSAGES = env_int("HISTORY_MAX_MESSAGES", 5)
+# HISTORY_MAX_LENGTH (characters) is the pre-token-budget name, still honoured
+HISTORY_MAX_TOKENS = env_int(
+    "HISTORY_MAX_TOKENS", env_int("HISTORY_MAX_LENGTH", 16384) // 4
+)
+HISTORY_MAX_USERS = env_int("HISTORY_MAX_USERS", 10000)
+HISTORY_IDLE_TTL = env_float("HISTORY_IDLE_TTL", 24 * 3600.0)
+HISTORY_PRUNE_INTERVAL = env_float("HISTORY_PRUNE_INTERVAL", 3600.0)
+
+# Admin mailing
+BROADCAST_RATE = env_float("BROADCAST_RATE", 25.0)
+BROADCAST_CONCURRENCY = env_int("BROADCAST_CONCURRENCY", 25)
+BROADCAST_BATCH_SIZE = env_int("BROADCAST_BATCH_SIZE", 500)
+BROADCAST_MAX_RETRIES = env_int("BROADCAST_MAX_RETRIES", 3)
+BROADCAST_PROGRESS_INTERVAL = env_float("BROADCAST_PROGRESS_INTERVAL", 10.0)
+
+# Channel subscription check
+SUBSCRIPTION_CACHE_SIZE = env_int("SUBSCRIPTION_CACHE_SIZE", 100000)
+SUBSCRIPTION_CACHE_TTL = env_float("SUBSCRIPTION_CACHE_TTL", 300.0)
+SUBSCRIPTION_NEGATIVE_TTL = env_float("SUBSCRIPTION_NEGATIVE_TTL", 30.0)
+
+# Admission control of AI requests
+ADMISSION_USER_INTERVAL = env_float("ADMISSION_USER_INTERVAL", 10.0)
+ADMISSION_USER_BURST = env_int("ADMISSION_USER_BURST", 1)
+ADMISSION_MAX_USERS = env_int("ADMISSION_MAX_USERS", 100000)
+ADMISSION_MAX_QUEUE = env_int("ADMISSION_MAX_QUEUE", 50)
+ADMISSION_DEFAULT_CONCURRENCY = env_int("ADMISSION_DEFAULT_CONCURRENCY", 10)
+ADMISSION_CONCURRENCY = {
+    "text": env_int("ADMISSION_TEXT_CONCURRENCY", 20),
+    "code": env_int("ADMISSION_CODE_CONCURRENCY", 20),
+    "image": env_int("ADMISSION_IMAGE_CONCURRENCY", 5),
+    "vision": env_int("ADMISSION_VISION_CONCURRENCY", 10),
+    "search": env_int("ADMISSION_SEARCH_CONCURRENCY", 10),
+}
+
+# FSM storage ("memory", "sqlite" or "redis")
+FSM_STORAGE = os.getenv("FSM_STORAGE", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+FSM_CACHE_SIZE = env_int("FSM_CACHE_SIZE", 10000)
+FSM_FLUSH_INTERVAL = env_float("FSM_FLUSH_INTERVAL", 0.5)
+FSM_FLUSH_SIZE = env_int("FSM_FLUSH_SIZE", 200)
+
+# Update delivery ("polling" or "webhook")
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+# JSON file describing several bots served by one process; see bots.py
+BOTS_CONFIG = os.getenv("BOTS_CONFIG", "")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET") or None
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = env_int("WEBHOOK_PORT", 8080)
+WEBHOOK_WORKERS = env_int("WEBHOOK_WORKERS", 1)
+WEBHOOK_DRAIN_TIMEOUT = env_float("WEBHOOK_DRAIN_TIMEOUT", 60.0)
+WEBHOOK_DEDUP_SIZE = env_int("WEBHOOK_DEDUP_SIZE", 10000)
+
+# Background generation jobs
+JOB_WORKERS = env_int("JOB_WORKERS", 100)
+JOB_QUEUE_SIZE = env_int("JOB_QUEUE_SIZE", 1000)
+JOB_TIMEOUT = env_float("JOB_TIMEOUT", 180.0)
+JOB_DRAIN_TIMEOUT = env_float("JOB_DRAIN_TIMEOUT", 30.0)
+
+# AI providers per capability as ordered "kind:model" lists (kinds: mistral, g4f)
+TEXT_PROVIDERS = os.getenv(
+    "TEXT_PROVIDERS", "mistral:mistral-large-2411,mistral:mistral-small-latest"
+)
+CODE_PROVIDERS = os.getenv(
+    "CODE_PROVIDERS", "mistral:codestral-2405,mistral:mistral-large-2411"
+)
+VISION_PROVIDERS = os.getenv(
+    "VISION_PROVIDERS", "mistral:pixtral-large-2411,mistral:pixtral-12b-2409"
+)
+IMAGE_PROVIDERS = os.getenv("IMAGE_PROVIDERS", "g4f:flux")
+PROVIDER_WINDOW = env_int("PROVIDER_WINDOW", 100)
+PROVIDER_MIN_SAMPLES = env_int("PROVIDER_MIN_SAMPLES", 5)
+PROVIDER_ERROR_RATE = env_float("PROVIDER_ERROR_RATE", 0.5)
+PROVIDER_CIRCUIT_FAILURES = env_int("PROVIDER_CIRCUIT_FAILURES", 5)
+PROVIDER_CIRCUIT_COOLDOWN = env_float("PROVIDER_CIRCUIT_COOLDOWN", 30.0)
+PROVIDER_HEDGE = env_bool("PROVIDER_HEDGE", True)
+PROVIDER_HEDGE_MIN = env_float("PROVIDER_HEDGE_MIN", 2.0)
+PROVIDER_HEDGE_MAX = env_float("PROVIDER_HEDGE_MAX", 30.0)
@@ -1,26 +1,140 @@
 """Database models and setup for the Telegram AI Bot."""
 
-from sqlalchemy import BigInteger
+from typing import Optional
+
+from sqlalchemy import (
+    BigInteger,
+    Index,
+    String,
+    Text,
+    UniqueConstraint,
+    event,
+    inspect,
+    text,
+    true,
+)
 from sqlalchemy.ext.asyncio import AsyncAttrs, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
 
-engine = create_async_engine(url="sqlite+aiosqlite:///db.sqlite3", echo=False)
+from telegram_ai_bot import config
+
+engine = create_async_engine(url=config.DATABASE_URL, echo=False)
 async_session = async_sessionmaker(engine)
 
 
+def configure_sqlite(dbapi_connection, connection_record):
+    """Use WAL so readers do not block on the writer, and fsync less often."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine.sync_engine, "connect", configure_sqlite)
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     """Base class for SQLAlchemy models."""
 
 
 class User(Base):
-    """User model for storing Telegram user IDs."""
+    """User model for storing the Telegram user IDs of each bot."""
     __tablename__ = "users"
+    __table_args__ = (UniqueConstraint("bot_id", "tg_id"),)
 
     user_id: Mapped[int] = mapped_column(primary_key=True)
+    bot_id: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
     tg_id: Mapped[int] = mapped_column(BigInteger)
+    is_active: Mapped[bool] = mapped_column(default=True, server_default=true())
+
+
+class Broadcast(Base):
+    """Admin mailing model storing progress so it can resume after a restart."""
+    __tablename__ = "broadcasts"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    bot_id: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0")
+    admin_chat_id: Mapped[int] = mapped_column(BigInteger)
+    from_chat_id: Mapped[int] = mapped_column(BigInteger)
+    message_id: Mapped[int]
+    last_user_id: Mapped[int] = mapped_column(default=0)
+    sent: Mapped[int] = mapped_column(default=0)
+    failed: Mapped[int] = mapped_column(default=0)
+    blocked: Mapped[int] = mapped_column(default=0)
+    status: Mapped[str] = mapped_column(String(16), default="running", index=True)
+
+
+class CacheEntry(Base):
+    """Cache entry model for the SQLite cache backend."""
+    __tablename__ = "cache_entries"
+
+    namespace: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    value: Mapped[str] = mapped_column(Text)
+    expires_at: Mapped[float]
+    accessed_at: Mapped[float] = mapped_column(index=True)
+
+
+class HistoryMessage(Base):
+    """Conversation history message model."""
+    __tablename__ = "history_messages"
+    __table_args__ = (Index("ix_history_messages_tg_id_id", "tg_id", "id"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    tg_id: Mapped[int] = mapped_column(BigInteger)
+    role: Mapped[str] = mapped_column(String(16))
+    content: Mapped[str] = mapped_column(Text)
+    created_at: Mapped[float] = mapped_column(index=True)
+
+
+class FSMRecord(Base):
+    """FSM state and data of one chat/user for the SQLite FSM storage."""
+    __tablename__ = "fsm_records"
+
+    key: Mapped[str] = mapped_column(String, primary_key=True)
+    state: Mapped[Optional[str]] = mapped_column(String)
+    data: Mapped[str] = mapped_column(Text, default="{}")
+
+
+class ImageFile(Base):
+    """Telegram file_id of an uploaded image, by bot and SHA-256 of its bytes."""
+    __tablename__ = "image_files"
+
+    bot_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    content_hash: Mapped[str] = mapped_column(String(64), primary_key=True)
+    file_id: Mapped[str] = mapped_column(String)
+
+
+def upgrade_schema(connection, bot_id: int):
+    """Add the ``bot_id`` columns to tables created before multi-bot support.
+
+    Existing users and mailings are assigned to ``bot_id``. The users table
+    is rebuilt because SQLite cannot drop its old unique ``tg_id`` constraint.
+    """
+    tables = inspect(connection)
+    if "bot_id" not in {column["name"] for column in tables.get_columns("broadcasts")}:
+        connection.execute(
+            text(
+                "ALTER TABLE broadcasts ADD COLUMN bot_id BIGINT NOT NULL "
+                f"DEFAULT {int(bot_id)}"
+            )
+        )
+    if "bot_id" not in {column["name"] for column in tables.get_columns("users")}:
+        connection.execute(text("ALTER TABLE users RENAME TO users_before_bot_id"))
+        User.__table__.create(connection)
+        connection.execute(
+            text(
+                "INSERT INTO users (user_id, bot_id, tg_id, is_active) "
+                "SELECT user_id, :bot_id, tg_id, is_active FROM users_before_bot_id"
+            ),
+            {"bot_id": bot_id},
+        )
+        connection.execute(text("DROP TABLE users_before_bot_id"))
 
 
-async def async_main():
-    """Initialize the database."""
+async def async_main(bot_id: int = 0):
+    """Initialize the database; rows of an older schema are given ``bot_id``."""
     async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema, bot_id)
\ No newline at end of file
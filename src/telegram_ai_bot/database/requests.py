@@ -1,20 +1,255 @@
 """Database operations for the Telegram AI Bot."""
 
-from sqlalchemy import select
+import asyncio
+import logging
+from typing import AsyncIterator, Iterable, List, Optional, Sequence, Set, Tuple
 
-from telegram_ai_bot.database.models import User, async_session
+from sqlalchemy import select, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
+from telegram_ai_bot import config
+from telegram_ai_bot.database.models import Broadcast, ImageFile, User, async_session
+from telegram_ai_bot.metrics import instrument
 
-async def set_user(tg_id: int):
-    """Add a new user to the database if they don't exist."""
+logger = logging.getLogger(__name__)
+
+
+@instrument("db.insert_users")
+async def insert_users(
+    users: Iterable[Tuple[int, int]],
+    session_factory: async_sessionmaker = async_session,
+):
+    """Add (bot_id, tg_id) users in one transaction, ignoring existing ones."""
+    rows = [{"bot_id": bot_id, "tg_id": tg_id} for bot_id, tg_id in users]
+    if not rows:
+        return
+    async with session_factory() as session:
+        await session.execute(
+            insert(User)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["bot_id", "tg_id"])
+        )
+        await session.commit()
+
+
+async def set_user(tg_id: int, bot_id: int):
+    """Add a new user of a bot to the database if they don't exist."""
+    await insert_users([(bot_id, tg_id)])
+
+
+class UserWriteBuffer:
+    """Write-behind buffer batching new user registrations.
+
+    Recently seen ids are remembered so repeated /start presses cost nothing.
+    Pending ids are written when ``max_size`` accumulate or ``interval``
+    seconds after the first one, whichever comes first.
+    """
+
+    def __init__(
+        self,
+        max_size: Optional[int] = None,
+        interval: Optional[float] = None,
+        max_known: Optional[int] = None,
+        session_factory: async_sessionmaker = async_session,
+    ):
+        self.max_size = max_size or config.USER_FLUSH_SIZE
+        self.interval = config.USER_FLUSH_INTERVAL if interval is None else interval
+        self.max_known = max_known or config.USER_KNOWN_IDS
+        self.session_factory = session_factory
+        self._pending: Set[Tuple[int, int]] = set()
+        self._known: Set[Tuple[int, int]] = set()
+        self._timer: Optional[asyncio.Task] = None
+
+    async def add(self, tg_id: int, bot_id: int):
+        """Queue a user of a bot for registration."""
+        user = (bot_id, tg_id)
+        if user in self._known or user in self._pending:
+            return
+        self._pending.add(user)
+        if len(self._pending) >= self.max_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Write all pending users now."""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+        users, self._pending = self._pending, set()
+        if not users:
+            return
+        try:
+            await insert_users(users, self.session_factory)
+        except Exception as e:
+            logger.error(f"Unable to register {len(users)} users: {e}")
+            self._pending |= users
+            return
+        if len(self._known) + len(users) > self.max_known:
+            self._known.clear()
+        self._known |= users
+
+
+user_buffer = UserWriteBuffer()
+
+
+async def queue_user(tg_id: int, bot_id: int):
+    """Register a user of a bot through the shared write-behind buffer."""
+    await user_buffer.add(tg_id, bot_id)
+
+
+USER_CHUNK_SIZE = 1000
+
+
+async def get_users() -> List[User]:
+    """Retrieve all users from the database.
+
+    Loads every row as an ORM object; use ``iter_tg_ids`` to walk large tables.
+    """
+    async with async_session() as session:
+        return list(await session.scalars(select(User)))
+
+
+@instrument("db.get_users_after")
+async def _get_users_after(
+    user_id: int,
+    limit: int,
+    active_only: bool,
+    session_factory: async_sessionmaker,
+    bot_id: Optional[int] = None,
+) -> Sequence:
+    query = select(User.user_id, User.tg_id).where(User.user_id > user_id)
+    if active_only:
+        query = query.where(User.is_active)
+    if bot_id is not None:
+        query = query.where(User.bot_id == bot_id)
+    async with session_factory() as session:
+        result = await session.execute(query.order_by(User.user_id).limit(limit))
+        return result.all()
+
+
+async def get_active_users_after(bot_id: int, user_id: int, limit: int) -> Sequence:
+    """Return a bot's next ``limit`` active (user_id, tg_id) rows after ``user_id``."""
+    return await _get_users_after(user_id, limit, True, async_session, bot_id)
+
+
+async def iter_tg_id_chunks(
+    chunk_size: int = USER_CHUNK_SIZE,
+    active_only: bool = False,
+    session_factory: async_sessionmaker = async_session,
+    bot_id: Optional[int] = None,
+) -> AsyncIterator[List[int]]:
+    """Yield users' tg_ids in chunks, paginating by user_id.
+
+    Each chunk is a column-only keyset query in its own short session, so
+    memory use and connection hold time do not grow with the table. With
+    ``bot_id`` only that bot's users are returned.
+    """
+    last_user_id = 0
+    while True:
+        rows = await _get_users_after(
+            last_user_id, chunk_size, active_only, session_factory, bot_id
+        )
+        if not rows:
+            return
+        last_user_id = rows[-1].user_id
+        yield [row.tg_id for row in rows]
+
+
+async def iter_tg_ids(
+    chunk_size: int = USER_CHUNK_SIZE,
+    active_only: bool = False,
+    session_factory: async_sessionmaker = async_session,
+    bot_id: Optional[int] = None,
+) -> AsyncIterator[int]:
+    """Yield every user's tg_id without loading the whole table."""
+    chunks = iter_tg_id_chunks(chunk_size, active_only, session_factory, bot_id)
+    async for chunk in chunks:
+        for tg_id in chunk:
+            yield tg_id
+
+
+@instrument("db.deactivate_users")
+async def deactivate_users(bot_id: int, tg_ids: List[int]):
+    """Mark users who blocked the bot as inactive."""
+    if not tg_ids:
+        return
+    async with async_session() as session:
+        await session.execute(
+            update(User)
+            .where(User.bot_id == bot_id, User.tg_id.in_(tg_ids))
+            .values(is_active=False)
+        )
+        await session.commit()
+
+
+async def create_broadcast(
+    bot_id: int, admin_chat_id: int, from_chat_id: int, message_id: int
+) -> int:
+    """Store a new mailing of a bot and return its id."""
+    async with async_session() as session:
+        broadcast = Broadcast(
+            bot_id=bot_id,
+            admin_chat_id=admin_chat_id,
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+        )
+        session.add(broadcast)
+        await session.flush()
+        broadcast_id = broadcast.id
+        await session.commit()
+        return broadcast_id
+
+
+async def get_broadcast(broadcast_id: int) -> Optional[Broadcast]:
+    """Return a mailing by id."""
+    async with async_session() as session:
+        return await session.get(Broadcast, broadcast_id)
+
+
+async def get_running_broadcasts() -> Sequence:
+    """Return (id, bot_id) rows of mailings that have not finished."""
+    async with async_session() as session:
+        result = await session.execute(
+            select(Broadcast.id, Broadcast.bot_id).where(Broadcast.status == "running")
+        )
+        return result.all()
+
+
+@instrument("db.update_broadcast")
+async def update_broadcast(broadcast_id: int, **values):
+    """Persist mailing progress."""
+    async with async_session() as session:
+        await session.execute(
+            update(Broadcast).where(Broadcast.id == broadcast_id).values(**values)
+        )
+        await session.commit()
+
+
+async def get_image_file_id(bot_id: int, content_hash: str) -> Optional[str]:
+    """Return the file_id of an image this bot uploaded before, if any."""
     async with async_session() as session:
-        user = await session.scalar(select(User).where(User.tg_id == tg_id))
-        if not user:
-            session.add(User(tg_id=tg_id))
-            await session.commit()
+        return await session.scalar(
+            select(ImageFile.file_id).where(
+                ImageFile.bot_id == bot_id, ImageFile.content_hash == content_hash
+            )
+        )
 
 
-async def get_users():
-    """Retrieve all users from the database."""
+async def save_image_file_id(bot_id: int, content_hash: str, file_id: str):
+    """Remember the file_id Telegram assigned to an uploaded image."""
     async with async_session() as session:
-        return await session.scalars(select(User))
\ No newline at end of file
+        await session.execute(
+            insert(ImageFile)
+            .values(bot_id=bot_id, content_hash=content_hash, file_id=file_id)
+            .on_conflict_do_update(
+                index_elements=["bot_id", "content_hash"], set_={"file_id": file_id}
+            )
+        )
+        await session.commit()
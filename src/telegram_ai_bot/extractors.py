@@ -0,0 +1,233 @@
+"""Paragraph text extraction from HTML with pluggable parser backends.
+
+Backends parse a whole document and stop collecting once the character
+budget is filled. ``extract_paragraphs`` is a top-level function so it can
+run in a process pool. The optional parsers are imported by the backend
+using them, so only the extraction processes load them.
+"""
+
+import codecs
+import importlib.util
+import re
+from html.parser import HTMLParser
+from typing import Callable, Dict, List, Optional
+
+# Slice size for backends that are fed incrementally and can stop early
+FEED_SIZE = 65536
+SKIPPED_TAGS = ("script", "style", "noscript", "template")
+AUTO_ORDER = ("selectolax", "lxml", "bs4", "stdlib")
+
+
+class ParagraphExtractor(HTMLParser):
+    """Incrementally collect ``<p>`` text until a character budget is filled."""
+
+    SKIPPED_TAGS = set(SKIPPED_TAGS)
+
+    def __init__(self, limit: int):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.paragraphs: List[str] = []
+        self._current: Optional[List[str]] = None
+        self._length = 0
+        self._skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        """Return True once enough paragraph text has been collected."""
+        return self._length >= self.limit
+
+    @property
+    def text(self) -> str:
+        """Return the collected paragraph text."""
+        paragraphs = list(self.paragraphs)
+        if self._current:
+            paragraphs.append("".join(self._current))
+        return " ".join(paragraphs)
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth += 1
+        elif tag == "p":
+            self._close_paragraph()
+            self._current = []
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        elif tag == "p":
+            self._close_paragraph()
+
+    def handle_data(self, data):
+        if self._current is not None and not self._skip_depth and not self.done:
+            self._current.append(data)
+            self._length += len(data)
+
+    def _close_paragraph(self):
+        if self._current is not None:
+            self.paragraphs.append("".join(self._current))
+            self._length += 1
+            self._current = None
+
+
+class ParagraphScanner:
+    """Count bytes inside ``<p>`` blocks of a streamed page without parsing it.
+
+    Used to stop downloading once the page holds enough paragraph markup to
+    fill the budget.
+    """
+
+    TAG = re.compile(rb"<(/?)p[\s>/]", re.IGNORECASE)
+    # Longest partial tag that may be split across chunks
+    OVERLAP = 4
+
+    def __init__(self):
+        self.paragraph_bytes = 0
+        self._opened_at: Optional[int] = None
+        self._offset = 0
+        self._scanned = 0
+        self._tail = b""
+
+    @property
+    def inside(self) -> bool:
+        """Return True while the scanned data ends inside a paragraph."""
+        return self._opened_at is not None
+
+    def feed(self, chunk: bytes):
+        """Scan the next chunk of the page."""
+        data = self._tail + chunk
+        base = self._offset - len(self._tail)
+        for match in self.TAG.finditer(data):
+            position = base + match.start()
+            if position < self._scanned:
+                continue
+            self._scanned = base + match.end()
+            if match.group(1):
+                if self._opened_at is not None:
+                    self.paragraph_bytes += position - self._opened_at
+                    self._opened_at = None
+            elif self._opened_at is None:
+                self._opened_at = position
+        self._offset += len(chunk)
+        self._tail = data[-self.OVERLAP:]
+        self._scanned = max(self._scanned, self._offset - self.OVERLAP)
+
+
+class _Budget:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.parts: List[str] = []
+        self.length = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.limit
+
+    def add(self, text: str):
+        self.parts.append(text)
+        self.length += len(text) + 1
+
+    @property
+    def text(self) -> str:
+        return " ".join(self.parts)
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def extract_with_stdlib(html: str, limit: int) -> str:
+    """Extract paragraphs with the standard library parser."""
+    parser = ParagraphExtractor(limit)
+    for start in range(0, len(html), FEED_SIZE):
+        parser.feed(html[start:start + FEED_SIZE])
+        if parser.done:
+            break
+    return parser.text
+
+
+def extract_with_lxml(html: str, limit: int) -> str:
+    """Extract paragraphs with lxml's incremental C parser."""
+    from lxml import etree
+
+    budget = _Budget(limit)
+    parser = etree.HTMLPullParser(events=("end",), tag="p")
+    for start in range(0, len(html), FEED_SIZE):
+        parser.feed(html[start:start + FEED_SIZE])
+        for _, element in parser.read_events():
+            etree.strip_elements(element, *SKIPPED_TAGS, with_tail=False)
+            budget.add("".join(element.itertext()))
+            element.clear(keep_tail=True)
+            if budget.full:
+                return budget.text
+    parser.close()
+    for _, element in parser.read_events():
+        if budget.full:
+            break
+        etree.strip_elements(element, *SKIPPED_TAGS, with_tail=False)
+        budget.add("".join(element.itertext()))
+    return budget.text
+
+
+def extract_with_selectolax(html: str, limit: int) -> str:
+    """Extract paragraphs with selectolax's lexbor parser."""
+    from selectolax.lexbor import LexborHTMLParser
+
+    budget = _Budget(limit)
+    tree = LexborHTMLParser(html)
+    for node in tree.css("p"):
+        for skipped in node.css(", ".join(SKIPPED_TAGS)):
+            skipped.decompose()
+        budget.add(node.text(deep=True))
+        if budget.full:
+            break
+    return budget.text
+
+
+def extract_with_bs4(html: str, limit: int) -> str:
+    """Extract paragraphs with BeautifulSoup, building only ``<p>`` elements."""
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    parser = "lxml" if _installed("lxml") else "html.parser"
+    budget = _Budget(limit)
+    soup = BeautifulSoup(html, parser, parse_only=SoupStrainer("p"))
+    for paragraph in soup.find_all("p"):
+        for skipped in paragraph.find_all(SKIPPED_TAGS):
+            skipped.decompose()
+        budget.add(paragraph.get_text())
+        if budget.full:
+            break
+    return budget.text
+
+
+BACKENDS: Dict[str, Callable[[str, int], str]] = {
+    "selectolax": extract_with_selectolax,
+    "lxml": extract_with_lxml,
+    "bs4": extract_with_bs4,
+    "stdlib": extract_with_stdlib,
+}
+
+
+def available_backends() -> List[str]:
+    """Return installed backends, fastest first."""
+    return [name for name in AUTO_ORDER if name == "stdlib" or _installed(name)]
+
+
+def resolve_backend(name: str) -> str:
+    """Return the backend to use for a configured name; ``auto`` picks the fastest."""
+    if name == "auto":
+        return available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML extractor: {name}")
+    return name
+
+
+def extract_paragraphs(data: bytes, encoding: str, limit: int, backend: str) -> str:
+    """Decode a page and return up to ``limit`` characters of its paragraph text.
+
+    A multi-byte character cut off at the end of ``data`` is dropped.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)("replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")("replace")
+    return BACKENDS[backend](decoder.decode(data), limit)[:limit]
@@ -0,0 +1,173 @@
+"""FSM storage backends selectable from configuration."""
+
+import asyncio
+import json
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from telegram_ai_bot import config
+from telegram_ai_bot.database.models import FSMRecord, async_session
+
+logger = logging.getLogger(__name__)
+
+EMPTY_DATA = "{}"
+
+# (state, JSON-encoded data)
+Record = Tuple[Optional[str], str]
+
+
+class SQLiteStorage(BaseStorage):
+    """FSM storage in the bot database with write batching and a read cache.
+
+    Writes are applied to an in-process LRU cache at once and persisted in
+    one transaction every ``flush_interval`` seconds or ``batch_size``
+    changes. The cache assumes this process is the only writer; use the
+    Redis backend to share states between several bot processes.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker = async_session,
+        cache_size: Optional[int] = None,
+        flush_interval: Optional[float] = None,
+        batch_size: Optional[int] = None,
+        key_builder: Optional[KeyBuilder] = None,
+    ):
+        self.session_factory = session_factory
+        self.cache_size = cache_size or config.FSM_CACHE_SIZE
+        self.flush_interval = (
+            config.FSM_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self.batch_size = batch_size or config.FSM_FLUSH_SIZE
+        self.key_builder = key_builder or DefaultKeyBuilder(
+            with_bot_id=True, with_business_connection_id=True, with_destiny=True
+        )
+        self._cache: "OrderedDict[str, Record]" = OrderedDict()
+        self._pending: Dict[str, Record] = {}
+        self._flushing: Dict[str, Record] = {}
+        self._timer: Optional[asyncio.Task] = None
+
+    async def _load(self, key: str) -> Record:
+        for records in (self._pending, self._flushing, self._cache):
+            record = records.get(key)
+            if record is not None:
+                break
+        else:
+            async with self.session_factory() as session:
+                row = (
+                    await session.execute(
+                        select(FSMRecord.state, FSMRecord.data).where(FSMRecord.key == key)
+                    )
+                ).first()
+            record = (row.state, row.data) if row else (None, EMPTY_DATA)
+        self._remember(key, record)
+        return record
+
+    def _remember(self, key: str, record: Record):
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _save(self, key: str, record: Record):
+        self._remember(key, record)
+        self._pending[key] = record
+        if len(self._pending) >= self.batch_size:
+            await self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.flush_interval)
+        self._timer = None
+        await self.flush()
+
+    async def flush(self):
+        """Persist all pending changes in one transaction."""
+        if self._timer is not None and self._timer is not asyncio.current_task():
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        self._flushing, self._pending = self._pending, {}
+        empty = [key for key, record in self._flushing.items() if record == (None, EMPTY_DATA)]
+        rows = [
+            {"key": key, "state": state, "data": data}
+            for key, (state, data) in self._flushing.items()
+            if (state, data) != (None, EMPTY_DATA)
+        ]
+        try:
+            async with self.session_factory() as session:
+                if empty:
+                    await session.execute(delete(FSMRecord).where(FSMRecord.key.in_(empty)))
+                if rows:
+                    statement = insert(FSMRecord).values(rows)
+                    excluded = statement.excluded
+                    await session.execute(
+                        statement.on_conflict_do_update(
+                            index_elements=["key"],
+                            set_={"state": excluded.state, "data": excluded.data},
+                        )
+                    )
+                await session.commit()
+        except Exception as e:
+            logger.error(f"Unable to save {len(self._flushing)} FSM records: {e}")
+            self._pending = {**self._flushing, **self._pending}
+        finally:
+            self._flushing = {}
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        """Set the state of a key."""
+        name = self.key_builder.build(key)
+        _, data = await self._load(name)
+        await self._save(name, (state.state if isinstance(state, State) else state, data))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        """Return the state of a key."""
+        state, _ = await self._load(self.key_builder.build(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        """Replace the data of a key; values must be JSON-serializable."""
+        name = self.key_builder.build(key)
+        state, _ = await self._load(name)
+        await self._save(name, (state, json.dumps(dict(data))))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        """Return a copy of the data of a key."""
+        _, data = await self._load(self.key_builder.build(key))
+        return json.loads(data)
+
+    async def close(self) -> None:
+        """Write pending changes."""
+        await self.flush()
+
+
+def create_storage(backend: Optional[str] = None) -> BaseStorage:
+    """Create the FSM storage selected by ``FSM_STORAGE``."""
+    backend = backend or config.FSM_STORAGE
+    if backend == "memory":
+        return MemoryStorage()
+    if backend == "sqlite":
+        return SQLiteStorage()
+    if backend == "redis":
+        from aiogram.fsm.storage.redis import RedisStorage
+
+        return RedisStorage.from_url(
+            config.REDIS_URL, key_builder=DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        )
+    raise ValueError(f"Unknown FSM storage: {backend}")
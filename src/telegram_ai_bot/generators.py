@@ -2,110 +2,256 @@
 
 import base64
 import logging
-import os
-from typing import List, Dict, Any
+import time
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List
 
-import httpx
-from bs4 import BeautifulSoup
-from dotenv import load_dotenv
-from duckduckgo_search import DDGS
-from g4f.client import AsyncClient
-from mistralai import Mistral
+from telegram_ai_bot import config
+from telegram_ai_bot.bots import current_bot
+from telegram_ai_bot.cache import create_cache, normalize_text
+from telegram_ai_bot.clients import get_api_client, get_image_client, get_mistral_client
+from telegram_ai_bot.metrics import instrument, instrument_stream, span
+from telegram_ai_bot.providers import (
+    ProviderRouter,
+    get_backend,
+    get_router,
+    parse_providers,
+)
+from telegram_ai_bot.search import fetch_pages, web_search
+from telegram_ai_bot.semantic_cache import cached_stream, create_semantic_cache
+from telegram_ai_bot.utils.images import build_json_body, prepare_image
+from telegram_ai_bot.utils.singleflight import coalesce, coalesce_stream
 
-load_dotenv()
 logger = logging.getLogger(__name__)
 
+EMPTY_RESPONSE = "Error: Empty response from AI"
 
-async def text_generation(messages: List[Dict[str, Any]]) -> str:
-    """Generate text using the Mistral AI model."""
-    api_key = os.getenv("AITOKEN")
-    model = "mistral-large-2411"
-    client = Mistral(api_key=api_key)
+rewrite_cache = create_cache(
+    "rewrite", config.REWRITE_CACHE_SIZE, config.REWRITE_CACHE_TTL
+)
+image_prompt_cache = create_cache(
+    "image_prompt", config.IMAGE_PROMPT_CACHE_SIZE, config.IMAGE_PROMPT_CACHE_TTL
+)
+text_answer_cache = create_semantic_cache("text_answer") if config.SEMANTIC_CACHE else None
+code_answer_cache = create_semantic_cache("code_answer") if config.SEMANTIC_CACHE else None
+
+
+async def stream_chat(model: str, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Yield content chunks of a streamed Mistral chat completion."""
+    client = get_mistral_client()
     response = await client.chat.stream_async(model=model, messages=messages)
-    full_response = ""
     async for chunk in response:
         content = chunk.data.choices[0].delta.content
         if content is not None:
-            full_response += content
-    return full_response or "Error: Empty response from AI"
+            yield content
 
 
-async def image_generation(prompt: str) -> str:
-    """Generate an image based on a text prompt."""
-    client = AsyncClient()
-    api_key = os.getenv("AITOKEN")
-    model = "mistral-large-2411"
-    client_text = Mistral(api_key=api_key)
-    response = await client_text.chat.stream_async(
-        model=model,
-        messages=[
+async def collect_stream(chunks: AsyncIterator[str]) -> str:
+    """Concatenate a stream of content chunks."""
+    return "".join([chunk async for chunk in chunks])
+
+
+async def stream_g4f_chat(model: str, messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Yield content chunks of a streamed g4f chat completion."""
+    response = get_image_client().chat.completions.create(
+        model=model, messages=messages, stream=True
+    )
+    async for chunk in response:
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
+
+
+async def recognize_with_mistral(model: str, image: bytes, mime_type: str, text: str) -> str:
+    """Describe an image with a Mistral vision model."""
+    data = {
+        "model": model,
+        "messages": [
             {
                 "role": "user",
-                "content": f"Improve the prompt for the Flux neural network, which generates images, in English: {prompt}",
+                "content": [
+                    {"type": "text", "text": text},
+                    {"type": "image_url", "image_url": "{image}"},
+                ],
             },
         ],
+    }
+    length, body = build_json_body(data, image, mime_type)
+    headers = {
+        "Authorization": f"Bearer {config.get_ai_token()}",
+        "Content-Type": "application/json",
+        "Content-Length": str(length),
+    }
+    client = get_api_client()
+    response = await client.post(
+        f"{config.MISTRAL_SERVER_URL}/v1/chat/completions",
+        headers=headers,
+        content=body,
     )
-    full_response = ""
-    async for chunk in response:
-        content = chunk.data.choices[0].delta.content
-        if content is not None:
-            full_response += content
-    response = await client.images.generate(
-        model="flux", prompt=full_response, response_format="b64_json"
+    response.raise_for_status()
+    result = response.json()
+    if "choices" in result and result["choices"]:
+        return result["choices"][0]["message"]["content"]
+    return "Error: Unable to get response from AI"
+
+
+async def generate_with_g4f(model: str, prompt: str) -> str:
+    """Generate an image with g4f and return it base64-encoded."""
+    response = await get_image_client().images.generate(
+        model=model, prompt=prompt, response_format="b64_json"
     )
     return response.data[0].b64_json
 
 
-async def code_generation(prompt: str) -> str:
-    """Generate code with explanations in Russian."""
-    api_key = os.getenv("AITOKEN")
-    model = "codestral-2405"
-    client = Mistral(api_key=api_key)
-    response = await client.chat.stream_async(
-        model=model,
-        messages=[
+# Backend implementations per capability and provider kind
+PROVIDER_KINDS = {
+    "text": {"mistral": stream_chat, "g4f": stream_g4f_chat},
+    "code": {"mistral": stream_chat, "g4f": stream_g4f_chat},
+    "vision": {"mistral": recognize_with_mistral},
+    "image": {"g4f": generate_with_g4f},
+}
+PROVIDER_SETTINGS = {
+    "text": (config.TEXT_PROVIDERS, 5.0),
+    "code": (config.CODE_PROVIDERS, 5.0),
+    "vision": (config.VISION_PROVIDERS, 10.0),
+    "image": (config.IMAGE_PROVIDERS, 15.0),
+}
+
+
+def register_backends(router: ProviderRouter, capability: str, providers: str):
+    """Add the backends of a ``kind:model`` provider list to a router."""
+    expected_latency = PROVIDER_SETTINGS[capability][1]
+    for kind, model in parse_providers(providers):
+        implementation = PROVIDER_KINDS[capability].get(kind)
+        if implementation is None:
+            raise ValueError(f"Unknown {capability} provider kind: {kind}")
+        call = partial(implementation, model)
+        router.add(get_backend(capability, f"{kind}:{model}", call, expected_latency))
+
+
+def register_providers():
+    """Register the configured backends of every capability."""
+    for capability, (providers, _) in PROVIDER_SETTINGS.items():
+        register_backends(get_router(capability), capability, providers)
+
+
+register_providers()
+
+
+def bot_router(capability: str) -> ProviderRouter:
+    """Return the router of a capability for the bot handling the update.
+
+    Bots without their own provider list for the capability use the default
+    router.
+    """
+    providers = current_bot().providers.get(capability)
+    if not providers:
+        return get_router(capability)
+    router = get_router(capability, providers)
+    if not router.backends:
+        register_backends(router, capability, providers)
+    return router
+
+
+@instrument_stream("text")
+def stream_text_generation(messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Stream generated text from the text providers.
+
+    Answers to conversations of a single user message are cached when the
+    semantic cache is enabled; later turns depend on history and are not.
+    """
+    stream = partial(bot_router("text").stream, messages)
+    if len(messages) != 1 or messages[0]["role"] != "user":
+        return stream()
+    return cached_stream(text_answer_cache, messages[0]["content"], stream)
+
+
+async def text_generation(messages: List[Dict[str, Any]]) -> str:
+    """Generate text using the text providers."""
+    return await collect_stream(stream_text_generation(messages)) or EMPTY_RESPONSE
+
+
+def is_detailed_english_prompt(prompt: str) -> bool:
+    """Return True for prompts that are already long English descriptions."""
+    letters = [char for char in prompt if char.isalpha()]
+    if not letters:
+        return False
+    latin = sum(1 for char in letters if char.isascii())
+    return (
+        latin / len(letters) >= 0.95
+        and len(prompt.split()) >= config.IMAGE_PROMPT_SKIP_WORDS
+    )
+
+
+@instrument("image.prompt", count_tokens=True)
+async def enhance_image_prompt(prompt: str) -> str:
+    """Rewrite a prompt for Flux, reusing earlier rewrites of the same prompt."""
+    if is_detailed_english_prompt(prompt):
+        return prompt
+    key = normalize_text(prompt)
+    enhanced = await image_prompt_cache.get(key)
+    if enhanced is not None:
+        return enhanced
+    enhanced = await collect_stream(
+        stream_chat(
+            config.IMAGE_PROMPT_MODEL,
+            [
+                {
+                    "role": "user",
+                    "content": f"Improve the prompt for the Flux neural network, which generates images, in English: {prompt}",
+                },
+            ],
+        )
+    )
+    if not enhanced.strip():
+        return prompt
+    await image_prompt_cache.set(key, enhanced)
+    return enhanced
+
+
+@instrument("image")
+@coalesce(normalize_text)
+async def image_generation(prompt: str) -> str:
+    """Generate an image based on a text prompt.
+
+    Concurrent requests for the same normalized prompt share one generation.
+    """
+    started = time.perf_counter()
+    full_response = await enhance_image_prompt(prompt)
+    enhanced = time.perf_counter()
+    image = await bot_router("image").call(full_response)
+    logger.info(
+        f"Image generated: prompt {enhanced - started:.2f}s, "
+        f"image {time.perf_counter() - enhanced:.2f}s"
+    )
+    return image
+
+
+@instrument_stream("code")
+def stream_code_generation(prompt: str) -> AsyncIterator[str]:
+    """Stream generated code with explanations in Russian."""
+    stream = partial(
+        bot_router("code").stream,
+        [
             {
                 "role": "user",
                 "content": f"Provide explanations in Russian only. Here's the prompt: {prompt}",
             }
         ],
     )
-    full_response = ""
-    async for chunk in response:
-        content = chunk.data.choices[0].delta.content
-        if content is not None:
-            full_response += content
-    return full_response or "Error: Empty response from AI"
+    return cached_stream(code_answer_cache, prompt, stream)
+
+
+async def code_generation(prompt: str) -> str:
+    """Generate code with explanations in Russian."""
+    return await collect_stream(stream_code_generation(prompt)) or EMPTY_RESPONSE
 
 
-async def image_recognition(image_path: str, text: str) -> str:
+@instrument("vision", count_tokens=True)
+async def image_recognition(image: bytes, text: str) -> str:
     """Recognize and describe an image with a given text prompt."""
-    image = encode_image_to_base64(image_path)
-    api_key = os.getenv("AITOKEN")
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    data = {
-        "model": "pixtral-large-2411",
-        "messages": [
-            {
-                "role": "user",
-                "content": [
-                    {"type": "text", "text": text},
-                    {"type": "image_url", "image_url": f"data:image/jpeg;base64,{image}"},
-                ],
-            },
-        ],
-    }
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        response = await client.post(
-            "https://api.mistral.ai/v1/chat/completions",
-            headers=headers,
-            json=data,
-        )
-        response.raise_for_status()
-        result = response.json()
-        if "choices" in result and result["choices"]:
-            return result["choices"][0]["message"]["content"]
-        return "Error: Unable to get response from AI"
+    image, mime_type = await prepare_image(image)
+    return await bot_router("vision").call(image, mime_type, text)
 
 
 def encode_image_to_base64(image_path: str) -> str:
@@ -114,55 +260,61 @@ def encode_image_to_base64(image_path: str) -> str:
         return base64.b64encode(image_file.read()).decode("utf-8")
 
 
-async def search_with_mistral(query: str) -> str:
-    """Perform a web search and synthesize results using Mistral AI."""
-    api_key = os.getenv("AITOKEN")
-    model = "mistral-large-2411"
-    client = Mistral(api_key=api_key)
-    response = await client.chat.stream_async(
-        model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": f"Formulate the most effective and relevant web search query to answer the user's message: '{query}'. Return only the search query text.",
-            },
-        ],
-    )
-    web_search_text = ""
-    async for chunk in response:
-        content = chunk.data.choices[0].delta.content
-        if content is not None:
-            web_search_text += content
-    searcher = DDGS()
-    search_data = searcher.text(
-        web_search_text, safesearch="off", max_results=3, region="ru-ru"
+async def build_search_messages(query: str) -> List[Dict[str, Any]]:
+    """Search the web for a query and build the synthesis prompt."""
+    web_search_text = await rewrite_cache.get(normalize_text(query))
+    if web_search_text is None:
+        with span("search.rewrite"):
+            web_search_text = await collect_stream(
+                bot_router("text").stream(
+                    [
+                        {
+                            "role": "system",
+                            "content": f"Formulate the most effective and relevant web search query to answer the user's message: '{query}'. Return only the search query text.",
+                        },
+                    ],
+                )
+            )
+        if web_search_text.strip():
+            await rewrite_cache.set(normalize_text(query), web_search_text)
+    search_data = await web_search(web_search_text)
+    pages = await fetch_pages(
+        [result["href"] for result in search_data], config.SEARCH_PAGE_CHARS
     )
     web_data = []
-    async with httpx.AsyncClient() as client_http:
-        for result in search_data:
-            try:
-                response_http = await client_http.get(result["href"], timeout=10)
-                response_http.raise_for_status()
-                soup = BeautifulSoup(response_http.text, "html.parser")
-                paragraphs = soup.find_all("p")
-                page_text = " ".join(p.text for p in paragraphs)
-                web_data.append(f"Source: {result['href']}\nContent: {page_text[:550]}...")
-            except Exception as e:
-                logger.error(f"Error parsing {result['href']}: {e}")
-                web_data.append(f"Unable to retrieve content from {result['href']}")
-    response = await client.chat.stream_async(
-        model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": f"Using only the information from the provided web pages, answer the user's question. Synthesize information from different sources to provide a complete and accurate response. Avoid speculation and do not add information not present in the provided pages. Web content:\n\n{' '.join(web_data)}\n\nUser question: {query}",
-            },
-            {"role": "user", "content": query},
-        ],
-    )
-    full_response = ""
-    async for chunk in response:
-        content = chunk.data.choices[0].delta.content
-        if content is not None:
-            full_response += content
-    return full_response or "Error: Empty response from AI"
\ No newline at end of file
+    for url, page_text in pages.items():
+        if page_text is None:
+            web_data.append(f"Unable to retrieve content from {url}")
+        else:
+            web_data.append(f"Source: {url}\nContent: {page_text}...")
+    return [
+        {
+            "role": "system",
+            "content": f"Using only the information from the provided web pages, answer the user's question. Synthesize information from different sources to provide a complete and accurate response. Avoid speculation and do not add information not present in the provided pages. Web content:\n\n{' '.join(web_data)}\n\nUser question: {query}",
+        },
+        {"role": "user", "content": query},
+    ]
+
+
+@instrument_stream("search.synthesis")
+def stream_search_synthesis(messages: List[Dict[str, Any]]) -> AsyncIterator[str]:
+    """Stream the answer synthesized from web pages."""
+    return bot_router("text").stream(messages)
+
+
+@instrument_stream("search")
+@coalesce_stream(normalize_text)
+async def stream_search_with_mistral(query: str) -> AsyncIterator[str]:
+    """Perform a web search and stream the synthesized answer.
+
+    Concurrent identical queries share one search and one answer stream.
+    """
+    messages = await build_search_messages(query)
+    async for chunk in stream_search_synthesis(messages):
+        yield chunk
+
+
+@coalesce(normalize_text)
+async def search_with_mistral(query: str) -> str:
+    """Perform a web search and synthesize results using Mistral AI."""
+    return await collect_stream(stream_search_with_mistral(query)) or EMPTY_RESPONSE
@@ -0,0 +1,192 @@
+"""Conversation history stores with in-memory and SQLite backends."""
+
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, select
+
+from telegram_ai_bot import config
+from telegram_ai_bot.database.models import HistoryMessage, async_session
+from telegram_ai_bot.utils.trim_history import ConversationBuffer
+
+
+class HistoryStore(ABC):
+    """Interface of per-user conversation history stores.
+
+    Stores keep at most ``max_messages`` messages per user and return
+    histories trimmed to ``max_tokens`` approximate model tokens.
+    """
+
+    def __init__(self, max_messages: int, max_tokens: int, idle_ttl: float):
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.idle_ttl = idle_ttl
+
+    @abstractmethod
+    async def get(self, user_id: int) -> List[Dict[str, Any]]:
+        """Return the user's history, oldest message first."""
+        ...
+
+    @abstractmethod
+    async def append(self, user_id: int, message: Dict[str, Any]):
+        """Append a message to the user's history."""
+        ...
+
+    @abstractmethod
+    async def clear(self, user_id: int):
+        """Forget the user's history."""
+        ...
+
+    @abstractmethod
+    async def prune(self):
+        """Forget histories of users idle for longer than ``idle_ttl`` seconds."""
+        ...
+
+    def _new_buffer(self) -> ConversationBuffer:
+        return ConversationBuffer(self.max_tokens, self.max_messages)
+
+
+class MemoryHistoryStore(HistoryStore):
+    """In-process history store with idle-user and total-user eviction."""
+
+    def __init__(
+        self,
+        max_messages: int,
+        max_tokens: int,
+        max_users: int,
+        idle_ttl: float,
+    ):
+        super().__init__(max_messages, max_tokens, idle_ttl)
+        self.max_users = max_users
+        self._users: "OrderedDict[int, Tuple[float, ConversationBuffer]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    async def get(self, user_id: int) -> List[Dict[str, Any]]:
+        """Return the user's history, oldest message first."""
+        await self.prune()
+        entry = self._users.get(user_id)
+        return entry[1].messages() if entry else []
+
+    async def append(self, user_id: int, message: Dict[str, Any]):
+        """Append a message and evict idle or least recently active users."""
+        await self.prune()
+        entry = self._users.get(user_id)
+        buffer = entry[1] if entry else self._new_buffer()
+        buffer.append(message)
+        self._users[user_id] = (time.monotonic(), buffer)
+        self._users.move_to_end(user_id)
+        while len(self._users) > self.max_users:
+            self._users.popitem(last=False)
+
+    async def clear(self, user_id: int):
+        """Forget the user's history."""
+        self._users.pop(user_id, None)
+
+    async def prune(self):
+        """Forget histories of users idle for longer than ``idle_ttl`` seconds."""
+        expired = time.monotonic() - self.idle_ttl
+        while self._users:
+            user_id, (last_seen, _) = next(iter(self._users.items()))
+            if last_seen > expired:
+                break
+            del self._users[user_id]
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """History store backed by the bot database, shared by all workers."""
+
+    def __init__(
+        self,
+        max_messages: int,
+        max_tokens: int,
+        idle_ttl: float,
+        session_factory=async_session,
+        prune_interval: float = config.HISTORY_PRUNE_INTERVAL,
+    ):
+        super().__init__(max_messages, max_tokens, idle_ttl)
+        self.session_factory = session_factory
+        self.prune_interval = prune_interval
+        self._next_prune = time.monotonic() + prune_interval
+
+    async def get(self, user_id: int) -> List[Dict[str, Any]]:
+        """Return the user's history, oldest message first."""
+        async with self.session_factory() as session:
+            rows = (
+                await session.execute(
+                    select(HistoryMessage.role, HistoryMessage.content)
+                    .where(HistoryMessage.tg_id == user_id)
+                    .order_by(HistoryMessage.id.desc())
+                    .limit(self.max_messages)
+                )
+            ).all()
+        buffer = self._new_buffer()
+        buffer.extend({"role": row.role, "content": row.content} for row in reversed(rows))
+        return buffer.messages()
+
+    async def append(self, user_id: int, message: Dict[str, Any]):
+        """Append a message, cap the history and periodically prune idle users."""
+        if time.monotonic() >= self._next_prune:
+            self._next_prune = time.monotonic() + self.prune_interval
+            await self.prune()
+        async with self.session_factory() as session:
+            session.add(
+                HistoryMessage(
+                    tg_id=user_id,
+                    role=message["role"],
+                    content=str(message.get("content", "")),
+                    created_at=time.time(),
+                )
+            )
+            await session.flush()
+            oldest_kept = (
+                select(HistoryMessage.id)
+                .where(HistoryMessage.tg_id == user_id)
+                .order_by(HistoryMessage.id.desc())
+                .offset(self.max_messages - 1)
+                .limit(1)
+                .scalar_subquery()
+            )
+            await session.execute(
+                delete(HistoryMessage).where(
+                    HistoryMessage.tg_id == user_id, HistoryMessage.id < oldest_kept
+                )
+            )
+            await session.commit()
+
+    async def clear(self, user_id: int):
+        """Forget the user's history."""
+        async with self.session_factory() as session:
+            await session.execute(delete(HistoryMessage).where(HistoryMessage.tg_id == user_id))
+            await session.commit()
+
+    async def prune(self):
+        """Forget histories of users idle for longer than ``idle_ttl`` seconds."""
+        active = select(HistoryMessage.tg_id).where(
+            HistoryMessage.created_at > time.time() - self.idle_ttl
+        )
+        async with self.session_factory() as session:
+            await session.execute(
+                delete(HistoryMessage).where(HistoryMessage.tg_id.not_in(active))
+            )
+            await session.commit()
+
+
+def create_history_store(backend: Optional[str] = None) -> HistoryStore:
+    """Create a history store using the configured backend."""
+    backend = backend or config.HISTORY_BACKEND
+    if backend == "sqlite":
+        return SQLiteHistoryStore(
+            config.HISTORY_MAX_MESSAGES, config.HISTORY_MAX_TOKENS, config.HISTORY_IDLE_TTL
+        )
+    if backend == "memory":
+        return MemoryHistoryStore(
+            config.HISTORY_MAX_MESSAGES,
+            config.HISTORY_MAX_TOKENS,
+            config.HISTORY_MAX_USERS,
+            config.HISTORY_IDLE_TTL,
+        )
+    raise ValueError(f"Unknown history backend: {backend}")
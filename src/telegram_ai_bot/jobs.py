@@ -0,0 +1,160 @@
+"""Background job queue running long generations outside update handlers."""
+
+import asyncio
+import contextvars
+import itertools
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from telegram_ai_bot import config
+from telegram_ai_bot.admission import AdmissionController, Overloaded, admission
+from telegram_ai_bot.metrics import Gauge, registry, span
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A generation submitted by a user.
+
+    The job runs in a copy of the context it was submitted from.
+    """
+
+    def __init__(
+        self,
+        job_id: int,
+        user_id: int,
+        feature: str,
+        run: Callable[[], Awaitable[None]],
+        on_queued: Optional[Callable[[int], Awaitable]] = None,
+        on_timeout: Optional[Callable[[], Awaitable]] = None,
+    ):
+        self.id = job_id
+        self.user_id = user_id
+        self.feature = feature
+        self.run = run
+        self.on_queued = on_queued
+        self.on_timeout = on_timeout
+        self.cancelled = False
+        self.task: Optional[asyncio.Task] = None
+        self.context = contextvars.copy_context()
+
+
+class JobQueue:
+    """Bounded queue of jobs executed by a pool of worker tasks.
+
+    Each job holds a concurrency slot of its feature from the admission
+    controller while it runs and is cancelled after ``timeout`` seconds.
+    Keep ``workers`` above the sum of the feature limits so jobs waiting
+    for a busy feature do not starve the others.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_size: Optional[int] = None,
+        controller: AdmissionController = admission,
+    ):
+        self.workers = workers or config.JOB_WORKERS
+        self.timeout = timeout or config.JOB_TIMEOUT
+        self.controller = controller
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue(
+            max_size or config.JOB_QUEUE_SIZE
+        )
+        self._ids = itertools.count(1)
+        self._user_jobs: Dict[int, Set[Job]] = {}
+        self._worker_tasks: List[asyncio.Task] = []
+
+    def submit(
+        self,
+        user_id: int,
+        feature: str,
+        run: Callable[[], Awaitable[None]],
+        on_queued: Optional[Callable[[int], Awaitable]] = None,
+        on_timeout: Optional[Callable[[], Awaitable]] = None,
+    ) -> int:
+        """Queue a job and return its id; raise Overloaded if the queue is full."""
+        if not self._worker_tasks:
+            self._worker_tasks = [
+                asyncio.create_task(self._worker()) for _ in range(self.workers)
+            ]
+        job = Job(next(self._ids), user_id, feature, run, on_queued, on_timeout)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise Overloaded() from None
+        self._user_jobs.setdefault(user_id, set()).add(job)
+        return job.id
+
+    @property
+    def queued(self) -> int:
+        """Return the number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def pending(self, user_id: int) -> int:
+        """Return the number of queued or running jobs of a user."""
+        return len(self._user_jobs.get(user_id, ()))
+
+    def cancel_user(self, user_id: int) -> int:
+        """Cancel all queued and running jobs of a user and return their count."""
+        jobs = self._user_jobs.pop(user_id, set())
+        for job in jobs:
+            job.cancelled = True
+            if job.task is not None:
+                job.task.cancel()
+        return len(jobs)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.cancelled:
+                    job.task = job.context.run(asyncio.create_task, self._execute(job))
+                    await asyncio.wait({job.task})
+                    if not job.task.cancelled() and job.task.exception():
+                        error = job.task.exception()
+                        logger.error(f"Job {job.id} ({job.feature}) failed: {error!r}")
+            finally:
+                jobs = self._user_jobs.get(job.user_id)
+                if jobs is not None:
+                    jobs.discard(job)
+                    if not jobs:
+                        del self._user_jobs[job.user_id]
+                self._queue.task_done()
+
+    async def _execute(self, job: Job):
+        async with self.controller.slot(job.feature, job.on_queued):
+            try:
+                with span(f"job.{job.feature}"):
+                    await asyncio.wait_for(job.run(), self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"Job {job.id} ({job.feature}) timed out")
+                if job.on_timeout is not None:
+                    await job.on_timeout()
+
+    async def close(self, drain_timeout: Optional[float] = None):
+        """Let jobs finish for up to ``drain_timeout`` seconds, then cancel them."""
+        drain_timeout = config.JOB_DRAIN_TIMEOUT if drain_timeout is None else drain_timeout
+        if self._worker_tasks and drain_timeout > 0:
+            try:
+                await asyncio.wait_for(self._queue.join(), drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Cancelling unfinished jobs on shutdown")
+        for user_id in list(self._user_jobs):
+            self.cancel_user(user_id)
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+
+
+job_queue = JobQueue()
+
+
+def _collect_job_metrics():
+    queued = Gauge("bot_jobs_queued", "Jobs waiting for a worker.")
+    queued.set(job_queue.queued)
+    return [queued]
+
+
+registry.add_collector(_collect_job_metrics)
@@ -0,0 +1,333 @@
+"""Prometheus-format metrics and optional OpenTelemetry spans."""
+
+import functools
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from aiohttp import web
+
+from telegram_ai_bot import config
+from telegram_ai_bot.utils.trim_history import estimate_tokens
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry is optional
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Metric:
+    """A named family of samples distinguished by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, Tuple[str, ...], float]]:
+        """Yield (suffix, label values, extra label pairs, value) samples."""
+        for key, value in self._values.items():
+            yield "", key, (), value
+
+    def render(self) -> List[str]:
+        """Return the metric in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        for suffix, key, extra, value in self.samples():
+            names = self.labelnames + tuple(name for name, _ in extra)
+            values = key + tuple(label for _, label in extra)
+            lines.append(
+                f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}"
+            )
+        return lines
+
+
+class Counter(Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        """Add ``amount`` to the counter."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        """Return the current count."""
+        return self._values.get(self._key(labels), 0)
+
+
+class Gauge(Metric):
+    """Value that can go up and down."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        """Set the gauge."""
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        """Increase the gauge."""
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        """Decrease the gauge."""
+        self.inc(-amount, **labels)
+
+    def value(self, **labels) -> float:
+        """Return the current value."""
+        return self._values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """Distribution of observations in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value: float, **labels):
+        """Record an observation."""
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                state[0][index] += 1
+                break
+        state[1] += value
+        state[2] += 1
+
+    def count(self, **labels) -> int:
+        """Return the number of observations."""
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        """Yield cumulative bucket, sum and count samples."""
+        for key, (counts, total, count) in self._values.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield "_bucket", key, (("le", _format_value(bound)),), cumulative
+            yield "_sum", key, (), total
+            yield "_count", key, (), count
+
+
+class Registry:
+    """Collection of metrics rendered together on ``/metrics``.
+
+    Collectors are callables returning metrics built at scrape time, for
+    values such as cache hit rates that are kept elsewhere.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+        self.collectors: List[Callable[[], Iterable[Metric]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric and return it."""
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]):
+        """Add a callable producing metrics on every scrape."""
+        self.collectors.append(collector)
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        for collector in self.collectors:
+            try:
+                for metric in collector():
+                    lines.extend(metric.render())
+            except Exception as e:
+                logger.error(f"Metrics collector {collector.__name__} failed: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+stage_latency = registry.register(
+    Histogram("bot_stage_duration_seconds", "Duration of instrumented stages.", ["stage"])
+)
+stages_in_flight = registry.register(
+    Gauge("bot_stage_in_flight", "Instrumented stages running.", ["stage"])
+)
+stage_errors = registry.register(
+    Counter("bot_stage_errors_total", "Instrumented stages that raised.", ["stage", "error"])
+)
+generated_tokens = registry.register(
+    Counter(
+        "bot_generated_tokens_total",
+        "Estimated tokens of generated answers.",
+        ["stage"],
+    )
+)
+provider_latency = registry.register(
+    Histogram(
+        "bot_provider_duration_seconds",
+        "Latency of provider calls, to the first chunk for streams.",
+        ["capability", "backend"],
+    )
+)
+provider_errors = registry.register(
+    Counter("bot_provider_errors_total", "Failed provider calls.", ["capability", "backend"])
+)
+
+_tracer = otel_trace.get_tracer("telegram_ai_bot") if otel_trace and config.TRACING else None
+
+
+@contextmanager
+def span(stage: str, **attributes) -> Iterator[None]:
+    """Measure a stage, and trace it as an OpenTelemetry span when enabled."""
+    stages_in_flight.inc(stage=stage)
+    started = time.perf_counter()
+    otel_span = (
+        _tracer.start_as_current_span(stage, attributes=attributes)
+        if _tracer is not None
+        else None
+    )
+    try:
+        if otel_span is None:
+            yield
+        else:
+            with otel_span:
+                yield
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        stage_errors.inc(stage=stage, error=type(e).__name__)
+        raise
+    finally:
+        stages_in_flight.dec(stage=stage)
+        stage_latency.observe(time.perf_counter() - started, stage=stage)
+
+
+def instrument(stage: str, count_tokens: bool = False):
+    """Decorate a coroutine function to record it as ``stage``.
+
+    With ``count_tokens`` the tokens of a returned text are estimated.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with span(stage):
+                result = await func(*args, **kwargs)
+            if count_tokens and isinstance(result, str):
+                generated_tokens.inc(estimate_tokens(result), stage=stage)
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def instrument_stream(stage: str):
+    """Decorate a function returning an async iterator of text chunks.
+
+    The stage lasts until the stream is exhausted or closed and its tokens
+    are estimated from the chunks.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> AsyncIterator[str]:
+            with span(stage):
+                tokens = 0
+                try:
+                    async for chunk in func(*args, **kwargs):
+                        tokens += estimate_tokens(chunk)
+                        yield chunk
+                finally:
+                    generated_tokens.inc(tokens, stage=stage)
+
+        return wrapper
+
+    return decorator
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """Serve the registry in the Prometheus text format."""
+    return web.Response(
+        body=registry.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+def create_metrics_app() -> web.Application:
+    """Create an aiohttp application serving ``METRICS_PATH``."""
+    app = web.Application()
+    app.router.add_get(config.METRICS_PATH, metrics_handler)
+    return app
+
+
+@asynccontextmanager
+async def metrics_server(port: int, host: Optional[str] = None) -> AsyncIterator[web.AppRunner]:
+    """Serve metrics on a separate port while the block runs."""
+    runner = web.AppRunner(create_metrics_app())
+    await runner.setup()
+    await web.TCPSite(runner, host or config.METRICS_HOST, port).start()
+    logger.info(f"Serving metrics on port {port}")
+    try:
+        yield runner
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,49 @@
+"""Middleware applying admission control to AI request handlers."""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import Message
+
+from telegram_ai_bot.admission import AdmissionController, Overloaded, RateLimited, admission
+from telegram_ai_bot.bots import current_bot
+
+
+class AdmissionMiddleware(BaseMiddleware):
+    """Rate limit handlers flagged with an AI ``feature`` and shed them under load.
+
+    Users are limited per bot at that bot's rate. The feature's concurrency
+    slot, shared by all bots, is taken later by the job running the
+    generation.
+    """
+
+    def __init__(self, controller: AdmissionController = admission):
+        self.controller = controller
+
+    async def __call__(
+        self,
+        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
+        event: Message,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Run the handler if the request is admitted."""
+        feature = get_flag(data, "feature")
+        if feature is None:
+            return await handler(event, data)
+
+        settings = current_bot()
+        try:
+            self.controller.check(
+                (settings.id, event.from_user.id),
+                feature,
+                settings.user_interval,
+                settings.user_burst,
+            )
+            return await handler(event, data)
+        except RateLimited as e:
+            await event.answer(
+                f"Please wait {int(e.retry_after) + 1} seconds before the next request."
+            )
+        except Overloaded:
+            await event.answer("The bot is overloaded right now, please try again in a minute.")
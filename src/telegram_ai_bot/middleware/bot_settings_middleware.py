@@ -0,0 +1,29 @@
+"""Middleware selecting the settings of the bot that received an update."""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from telegram_ai_bot.bots import reset_bot, settings_for, use_bot
+
+
+class BotSettingsMiddleware(BaseMiddleware):
+    """Make the receiving bot's settings current while its update is handled.
+
+    Jobs submitted by the handlers copy the context, so generations see the
+    same settings.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Handle the update with its bot's settings."""
+        token = use_bot(settings_for(data["bot"].id))
+        try:
+            return await handler(event, data)
+        finally:
+            reset_bot(token)
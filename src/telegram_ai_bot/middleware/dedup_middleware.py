@@ -0,0 +1,41 @@
+"""Middleware dropping updates that were already received."""
+
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from telegram_ai_bot import config
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicationMiddleware(BaseMiddleware):
+    """Skip updates whose ``update_id`` was seen recently by the same bot.
+
+    Telegram redelivers a webhook update when the response is slow or lost,
+    so the same update can arrive twice. The last ``max_size`` ids of this
+    process are remembered; ids are only unique per bot.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or config.WEBHOOK_DEDUP_SIZE
+        self._seen: "OrderedDict[Tuple[int, int], None]" = OrderedDict()
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Process the update unless it is a duplicate."""
+        key = (data["bot"].id, event.update_id)
+        if key in self._seen:
+            logger.info(f"Skipping duplicate update {event.update_id}")
+            return None
+        self._seen[key] = None
+        if len(self._seen) > self.max_size:
+            self._seen.popitem(last=False)
+        return await handler(event, data)
@@ -0,0 +1,26 @@
+"""Middleware recording update handling metrics."""
+
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from telegram_ai_bot.metrics import span
+
+
+class MetricsMiddleware(BaseMiddleware):
+    """Measure every update as an ``update.<type>`` stage.
+
+    Its latency, in-flight count and errors are recorded, and a root span is
+    started for the update when tracing is enabled.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Handle the update inside a measured span."""
+        with span(f"update.{event.event_type}", update_id=event.update_id):
+            return await handler(event, data)
@@ -1,16 +1,73 @@
 """Middleware to check user subscription status."""
 
-import os
-from typing import Any, Awaitable, Callable, Dict
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
 
-from aiogram import BaseMiddleware
+from aiogram import BaseMiddleware, Bot
+from aiogram.enums import ChatMemberStatus
 from aiogram.types import CallbackQuery, Message
 
-from telegram_ai_bot import keyboards
+from telegram_ai_bot import config, keyboards
+from telegram_ai_bot.bots import current_bot
+from telegram_ai_bot.cache import create_cache
+from telegram_ai_bot.metrics import span
+
+logger = logging.getLogger(__name__)
+
+subscription_cache = create_cache(
+    "subscription",
+    config.SUBSCRIPTION_CACHE_SIZE,
+    config.SUBSCRIPTION_CACHE_TTL,
+    backend="memory",
+)
+_in_flight: Dict[Tuple[str, int], "asyncio.Future[bool]"] = {}
+
+
+def _cache_key(group: str, user_id: int) -> str:
+    return f"{group}:{user_id}"
+
+
+async def _fetch_subscription(bot: Bot, group: str, user_id: int) -> bool:
+    with span("get_chat_member"):
+        member = await bot.get_chat_member(chat_id=group, user_id=user_id)
+    subscribed = member.status != ChatMemberStatus.LEFT
+    await subscription_cache.set(
+        _cache_key(group, user_id),
+        subscribed,
+        ttl=None if subscribed else config.SUBSCRIPTION_NEGATIVE_TTL,
+    )
+    return subscribed
+
+
+async def is_subscribed(bot: Bot, user_id: int, group: str) -> bool:
+    """Return whether the user is subscribed to the ``group`` channel.
+
+    Results are cached, briefly when negative, and concurrent lookups for the
+    same user share one ``get_chat_member`` call.
+    """
+    subscribed = await subscription_cache.get(_cache_key(group, user_id))
+    if subscribed is not None:
+        return subscribed
+    key = (group, user_id)
+    future = _in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(_fetch_subscription(bot, group, user_id))
+        _in_flight[key] = future
+        future.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return await asyncio.shield(future)
+
+
+async def invalidate_subscription(user_id: int, group: str):
+    """Forget the cached subscription status of a user."""
+    await subscription_cache.delete(_cache_key(group, user_id))
 
 
 class CheckSubscribeMiddleware(BaseMiddleware):
-    """Middleware to ensure users are subscribed to the Telegram channel."""
+    """Middleware to ensure users are subscribed to the bot's Telegram channel.
+
+    Bots without a channel do not require a subscription.
+    """
 
     async def __call__(
         self,
@@ -20,22 +77,23 @@ class CheckSubscribeMiddleware(BaseMiddleware):
     ) -> Any:
         """Check subscription status before processing the event."""
         user = event.from_user
-        group = os.getenv("GROUP")
-        try:
-            user_subscription_status = await event.bot.get_chat_member(
-                chat_id=group, user_id=user.id
-            )
-            status = str(user_subscription_status).split()[0][8:-1]
-            if status == "left":
-                await event.answer(
-                    "👋 Hello! Since our bot is free, we kindly ask you to subscribe to our channel. "
-                    "You'll find lots of interesting content about AI!\n"
-                    "After subscribing, press the corresponding button.",
-                    reply_markup=keyboards.get_subscription_keyboard(),
-                )
-                return
+        group = current_bot().group
+        if not group:
             return await handler(event, data)
+        if isinstance(event, CallbackQuery) and event.data == "subscribe":
+            await invalidate_subscription(user.id, group)
+        try:
+            subscribed = await is_subscribed(event.bot, user.id, group)
         except Exception as e:
-            print(f"Error checking subscription: {e}")
+            logger.error(f"Error checking subscription: {e}")
             await event.answer("An error occurred! Please try again.")
-            return
\ No newline at end of file
+            return
+        if not subscribed:
+            await event.answer(
+                "👋 Hello! Since our bot is free, we kindly ask you to subscribe to our channel. "
+                "You'll find lots of interesting content about AI!\n"
+                "After subscribing, press the corresponding button.",
+                reply_markup=keyboards.get_subscription_keyboard(),
+            )
+            return
+        return await handler(event, data)
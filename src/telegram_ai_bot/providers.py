@@ -0,0 +1,324 @@
+"""Provider registry routing each AI capability across several backends."""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Tuple,
+)
+
+from telegram_ai_bot import config
+from telegram_ai_bot.metrics import Gauge, provider_errors, provider_latency, registry
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderError(Exception):
+    """Every backend of a capability failed."""
+
+    def __init__(self, capability: str, errors: List[Tuple[str, BaseException]]):
+        details = "; ".join(f"{name}: {error!r}" for name, error in errors)
+        super().__init__(f"All {capability} providers failed: {details}")
+        self.capability = capability
+        self.errors = errors
+
+
+class BackendStats:
+    """Rolling latency and error statistics with a circuit breaker."""
+
+    def __init__(self, window: int):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return a latency quantile in seconds, or None without samples."""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def p50(self) -> Optional[float]:
+        """Return the median latency."""
+        return self.quantile(0.5)
+
+    @property
+    def p95(self) -> Optional[float]:
+        """Return the 95th percentile latency."""
+        return self.quantile(0.95)
+
+    @property
+    def error_rate(self) -> float:
+        """Return the share of failed calls in the window."""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    @property
+    def circuit_open(self) -> bool:
+        """Return True while calls to the backend are suspended."""
+        return time.monotonic() < self.open_until
+
+    def record_success(self, latency: float):
+        """Record a successful call."""
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self, threshold: int, cooldown: float):
+        """Record a failed call, opening the circuit after ``threshold`` in a row."""
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= threshold:
+            self.open_until = time.monotonic() + cooldown
+
+
+class Backend:
+    """A named implementation of a capability."""
+
+    def __init__(self, name: str, call: Callable[..., Any], expected_latency: float):
+        self.name = name
+        self.call = call
+        self.expected_latency = expected_latency
+        self.stats = BackendStats(config.PROVIDER_WINDOW)
+
+    def estimated_latency(self) -> float:
+        """Return the measured median latency, or the expected one until measured."""
+        if len(self.stats.latencies) < config.PROVIDER_MIN_SAMPLES:
+            return self.expected_latency
+        return self.stats.p50
+
+    def hedge_delay(self) -> float:
+        """Return how long to wait for this backend before asking another one."""
+        p95 = self.stats.p95
+        if len(self.stats.latencies) < config.PROVIDER_MIN_SAMPLES or p95 is None:
+            p95 = self.expected_latency * 2
+        return min(max(p95, config.PROVIDER_HEDGE_MIN), config.PROVIDER_HEDGE_MAX)
+
+
+class ProviderRouter:
+    """Route calls of one capability to the best available backend.
+
+    Backends with an open circuit are skipped, the rest are ordered by error
+    rate tier and latency. A call that has not finished within the primary
+    backend's p95 is hedged with the next backend and the first success
+    wins; failures fall through to the remaining backends.
+    """
+
+    def __init__(self, capability: str):
+        self.capability = capability
+        self.backends: List[Backend] = []
+
+    def register(self, name: str, call: Callable[..., Any], expected_latency: float = 5.0):
+        """Add a backend; earlier backends win ties."""
+        self.add(Backend(name, call, expected_latency))
+
+    def add(self, backend: Backend):
+        """Add a backend that may be shared with other routers."""
+        self.backends.append(backend)
+
+    def candidates(self) -> List[Backend]:
+        """Return backends in the order they should be tried."""
+        available = [backend for backend in self.backends if not backend.stats.circuit_open]
+        if not available:
+            # Every circuit is open: probe the one that opened first
+            return sorted(self.backends, key=lambda backend: backend.stats.open_until)
+        return sorted(
+            available,
+            key=lambda backend: (
+                backend.stats.error_rate > config.PROVIDER_ERROR_RATE,
+                backend.estimated_latency(),
+            ),
+        )
+
+    async def _timed(self, backend: Backend, attempt: Callable[[Backend], Awaitable]):
+        started = time.monotonic()
+        try:
+            result = await attempt(backend)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            backend.stats.record_failure(
+                config.PROVIDER_CIRCUIT_FAILURES, config.PROVIDER_CIRCUIT_COOLDOWN
+            )
+            provider_errors.inc(capability=self.capability, backend=backend.name)
+            raise
+        latency = time.monotonic() - started
+        backend.stats.record_success(latency)
+        provider_latency.observe(latency, capability=self.capability, backend=backend.name)
+        return result
+
+    async def _execute(
+        self,
+        attempt: Callable[[Backend], Awaitable],
+        discard: Optional[Callable[[Any], Awaitable]] = None,
+    ):
+        candidates = self.candidates()
+        if not candidates:
+            raise ProviderError(self.capability, [])
+        pending: Dict[asyncio.Task, Backend] = {}
+        errors: List[Tuple[str, BaseException]] = []
+        started = 0
+        hedged = False
+
+        def start_next():
+            nonlocal started
+            backend = candidates[started]
+            started += 1
+            pending[asyncio.create_task(self._timed(backend, attempt))] = backend
+
+        start_next()
+        try:
+            while pending:
+                can_hedge = config.PROVIDER_HEDGE and not hedged and started < len(candidates)
+                timeout = candidates[0].hedge_delay() if can_hedge else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    logger.info(
+                        f"Hedging slow {self.capability} call to "
+                        f"{candidates[0].name} with {candidates[started].name}"
+                    )
+                    start_next()
+                    continue
+                winner = None
+                for task in done:
+                    backend = pending.pop(task)
+                    if task.exception() is not None:
+                        logger.warning(
+                            f"{self.capability} provider {backend.name} failed: "
+                            f"{task.exception()!r}"
+                        )
+                        errors.append((backend.name, task.exception()))
+                    elif winner is None:
+                        winner = task
+                    elif discard is not None:
+                        await discard(task.result())
+                if winner is not None:
+                    return winner.result()
+                if not pending and started < len(candidates):
+                    start_next()
+            raise ProviderError(self.capability, errors)
+        finally:
+            for task in pending:
+                task.cancel()
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            if discard is not None:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
+
+    async def call(self, *args, **kwargs):
+        """Call the capability and return the first successful result."""
+        return await self._execute(lambda backend: backend.call(*args, **kwargs))
+
+    async def stream(self, *args, **kwargs) -> AsyncIterator:
+        """Stream from the first backend to produce a chunk.
+
+        Latency is measured to the first chunk. Once a chunk arrives the
+        stream is committed to that backend.
+        """
+        stream, first = await self._execute(
+            lambda backend: _first_chunk(backend.call(*args, **kwargs)),
+            discard=lambda result: result[0].aclose(),
+        )
+        try:
+            if first is None:
+                return
+            yield first
+            async for chunk in stream:
+                yield chunk
+        finally:
+            await stream.aclose()
+
+
+async def _first_chunk(stream: AsyncIterator) -> Tuple[AsyncIterator, Any]:
+    try:
+        return stream, await stream.__anext__()
+    except StopAsyncIteration:
+        return stream, None
+    except BaseException:
+        await stream.aclose()
+        raise
+
+
+_routers: Dict[Tuple[str, Optional[str]], ProviderRouter] = {}
+_backends: Dict[Tuple[str, str], Backend] = {}
+
+
+def get_router(capability: str, providers: Optional[str] = None) -> ProviderRouter:
+    """Return the router of a capability, creating it on first use.
+
+    ``providers`` selects the router of a bot's own provider list instead of
+    the default one.
+    """
+    router = _routers.get((capability, providers))
+    if router is None:
+        router = _routers[(capability, providers)] = ProviderRouter(capability)
+    return router
+
+
+def get_backend(
+    capability: str, name: str, call: Callable[..., Any], expected_latency: float
+) -> Backend:
+    """Return the backend of a capability named ``name``, creating it on first use.
+
+    Routers listing the same backend share its statistics and circuit.
+    """
+    backend = _backends.get((capability, name))
+    if backend is None:
+        backend = _backends[(capability, name)] = Backend(name, call, expected_latency)
+    return backend
+
+
+def provider_stats() -> Dict[str, Dict[str, BackendStats]]:
+    """Return the statistics of every registered backend."""
+    stats: Dict[str, Dict[str, BackendStats]] = {}
+    for router in _routers.values():
+        for backend in router.backends:
+            stats.setdefault(router.capability, {})[backend.name] = backend.stats
+    return stats
+
+
+def parse_providers(value: str) -> List[Tuple[str, str]]:
+    """Parse a ``kind:model,kind:model`` provider list."""
+    providers = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            kind, _, model = item.partition(":")
+            providers.append((kind.strip(), model.strip()))
+    return providers
+
+
+def _collect_provider_metrics():
+    labels = ["capability", "backend"]
+    p50 = Gauge("bot_provider_p50_seconds", "Rolling median provider latency.", labels)
+    p95 = Gauge("bot_provider_p95_seconds", "Rolling 95th percentile provider latency.", labels)
+    error_rate = Gauge("bot_provider_error_rate", "Rolling provider error rate.", labels)
+    circuit = Gauge("bot_provider_circuit_open", "1 while a provider is skipped.", labels)
+    for capability, backends in provider_stats().items():
+        for name, stats in backends.items():
+            if stats.latencies:
+                p50.set(stats.p50, capability=capability, backend=name)
+                p95.set(stats.p95, capability=capability, backend=name)
+            error_rate.set(stats.error_rate, capability=capability, backend=name)
+            circuit.set(int(stats.circuit_open), capability=capability, backend=name)
+    return [p50, p95, error_rate, circuit]
+
+
+registry.add_collector(_collect_provider_metrics)
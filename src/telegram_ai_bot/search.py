@@ -0,0 +1,177 @@
+"""Web search pipeline: DuckDuckGo lookup and concurrent page extraction."""
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from telegram_ai_bot import config
+from telegram_ai_bot.cache import create_cache, normalize_text
+from telegram_ai_bot.clients import get_web_client
+from telegram_ai_bot.extractors import (  # noqa: F401 (re-exported)
+    ParagraphExtractor,
+    ParagraphScanner,
+    extract_paragraphs,
+    resolve_backend,
+)
+from telegram_ai_bot.metrics import instrument
+
+logger = logging.getLogger(__name__)
+
+search_cache = create_cache("search", config.SEARCH_CACHE_SIZE, config.SEARCH_CACHE_TTL)
+page_cache = create_cache("page", config.PAGE_CACHE_SIZE, config.PAGE_CACHE_TTL)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the worker pool used for blocking search and parsing work."""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=config.SEARCH_WORKERS, thread_name_prefix="search"
+        )
+    return _executor
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """Return the process pool used for HTML extraction."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=config.SEARCH_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _process_pool
+
+
+async def start_process_pool():
+    """Start every extraction process before the first search needs them.
+
+    Spawned processes take seconds to import the bot, which would otherwise
+    count against the deadline of the first searches.
+    """
+    if not config.SEARCH_PROCESSES:
+        return
+    loop = asyncio.get_running_loop()
+    pool = get_process_pool()
+    # Each submission finding no idle process spawns a new one
+    await asyncio.gather(
+        *(loop.run_in_executor(pool, os.getpid) for _ in range(config.SEARCH_PROCESSES))
+    )
+
+
+def shutdown_executor():
+    """Stop the search worker pools."""
+    global _executor, _process_pool
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+async def run_in_worker(func: Callable, *args, **kwargs) -> Any:
+    """Run a blocking callable in the search worker pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(func, *args, **kwargs)
+    )
+
+
+def _ddgs_text(query: str, region: str, max_results: int) -> List[Dict[str, Any]]:
+    from duckduckgo_search import DDGS
+
+    return list(
+        DDGS().text(query, safesearch="off", max_results=max_results, region=region)
+    )
+
+
+@instrument("search.web_search")
+async def web_search(
+    query: str, region: str = "ru-ru", max_results: int = 3
+) -> List[Dict[str, Any]]:
+    """Search DuckDuckGo without blocking the event loop."""
+    key = f"{region}:{max_results}:{normalize_text(query)}"
+    results = await search_cache.get(key)
+    if results is None:
+        results = await run_in_worker(_ddgs_text, query, region, max_results)
+        if results:
+            await search_cache.set(key, results)
+    return results
+
+
+async def run_extractor(data: bytes, encoding: str, limit: int) -> str:
+    """Extract paragraph text off the event loop with the configured backend.
+
+    Runs in the process pool, or in the thread pool if ``SEARCH_PROCESSES``
+    is 0.
+    """
+    args = (data, encoding, limit, resolve_backend(config.SEARCH_EXTRACTOR))
+    if not config.SEARCH_PROCESSES:
+        return await run_in_worker(extract_paragraphs, *args)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_process_pool(), extract_paragraphs, *args)
+
+
+async def extract_page(url: str, limit: int) -> str:
+    """Download a page and return its paragraph text, up to ``limit`` characters.
+
+    The download stops once the page holds ``SEARCH_PARAGRAPH_MARGIN`` bytes
+    of paragraph markup per character of the budget, or at
+    ``SEARCH_MAX_PAGE_BYTES``.
+    """
+    scanner = ParagraphScanner()
+    chunks = []
+    received = 0
+    async with get_web_client().stream("GET", url) as response:
+        response.raise_for_status()
+        encoding = response.encoding or "utf-8"
+        async for chunk in response.aiter_bytes(config.SEARCH_CHUNK_SIZE):
+            chunks.append(chunk)
+            received += len(chunk)
+            scanner.feed(chunk)
+            if received >= config.SEARCH_MAX_PAGE_BYTES or (
+                not scanner.inside
+                and scanner.paragraph_bytes >= limit * config.SEARCH_PARAGRAPH_MARGIN
+            ):
+                break
+    data = b"".join(chunks)[:config.SEARCH_MAX_PAGE_BYTES]
+    return await run_extractor(data, encoding, limit)
+
+
+@instrument("search.fetch_pages")
+async def fetch_pages(
+    urls: List[str], limit: int, deadline: Optional[float] = None
+) -> Dict[str, Optional[str]]:
+    """Extract pages concurrently, keeping whatever arrived before the deadline.
+
+    Pages that failed or did not finish in time map to ``None``.
+    """
+    deadline = config.SEARCH_DEADLINE if deadline is None else deadline
+    results: Dict[str, Optional[str]] = dict.fromkeys(urls)
+    for url in urls:
+        results[url] = await page_cache.get(url)
+    tasks = {
+        asyncio.create_task(extract_page(url, limit)): url
+        for url in urls
+        if results[url] is None
+    }
+    if not tasks:
+        return results
+    done, pending = await asyncio.wait(tasks, timeout=deadline)
+    for task in pending:
+        task.cancel()
+        logger.warning(f"Timed out fetching {tasks[task]}")
+    for task in done:
+        if task.exception() is not None:
+            logger.error(f"Error parsing {tasks[task]}: {task.exception()}")
+        else:
+            results[tasks[task]] = task.result()
+            await page_cache.set(tasks[task], task.result())
+    return results
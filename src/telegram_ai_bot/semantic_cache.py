@@ -0,0 +1,207 @@
+"""Response cache matching near-identical prompts by MinHash similarity."""
+
+import logging
+import random
+import time
+import zlib
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+from telegram_ai_bot import config
+from telegram_ai_bot.cache import CacheStats, normalize_text, register_cache
+
+# numpy is optional and imported by the first MinHasher, see load_numpy
+np = None
+_numpy_loaded = False
+
+logger = logging.getLogger(__name__)
+
+# Mersenne prime keeping (a * x + b) below 2**63 for 32-bit shingle hashes
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+def load_numpy():
+    """Import numpy once and return it, or None when it is not installed."""
+    global np, _numpy_loaded
+    if not _numpy_loaded:
+        _numpy_loaded = True
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        np = numpy
+    return np
+
+
+def shingles(text: str, size: int) -> Set[bytes]:
+    """Return the character n-grams of normalized text."""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text.encode()}
+    return {text[i:i + size].encode() for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """Compute MinHash signatures, vectorized with numpy when installed."""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        generator = random.Random(seed)
+        self.a = [generator.randrange(1, MERSENNE_PRIME) for _ in range(num_perm)]
+        self.b = [generator.randrange(0, MERSENNE_PRIME) for _ in range(num_perm)]
+        if load_numpy() is not None:
+            self._a = np.array(self.a, dtype=np.uint64)
+            self._b = np.array(self.b, dtype=np.uint64)
+
+    def signature(self, items: Set[bytes]) -> Tuple[int, ...]:
+        """Return the signature of a set of shingles."""
+        hashes = [zlib.crc32(item) for item in items]
+        if np is not None and hasattr(self, "_a"):
+            values = np.array(hashes, dtype=np.uint64)[:, None]
+            permuted = (values * self._a + self._b) % MERSENNE_PRIME
+            return tuple(int(value) for value in permuted.min(axis=0))
+        return tuple(
+            min((a * value + b) % MERSENNE_PRIME for value in hashes)
+            for a, b in zip(self.a, self.b)
+        )
+
+
+def similarity(first: Tuple[int, ...], second: Tuple[int, ...]) -> float:
+    """Estimate the Jaccard similarity of two signatures."""
+    return sum(x == y for x, y in zip(first, second)) / len(first)
+
+
+class SemanticCache:
+    """In-process response cache with exact and near-duplicate lookups.
+
+    Prompts are normalized and fingerprinted with MinHash over character
+    shingles. A lookup first tries the exact normalized prompt, then the
+    cached prompts sharing a locality-sensitive hashing band, and returns
+    the most similar answer reaching ``threshold``. Entries expire after
+    ``ttl`` seconds and the least recently used are evicted past ``maxsize``.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        maxsize: Optional[int] = None,
+        ttl: Optional[float] = None,
+        threshold: Optional[float] = None,
+        num_perm: Optional[int] = None,
+        bands: int = 16,
+        shingle_size: int = 3,
+    ):
+        self.name = name
+        self.maxsize = maxsize or config.SEMANTIC_CACHE_SIZE
+        self.ttl = ttl or config.SEMANTIC_CACHE_TTL
+        self.threshold = config.SEMANTIC_CACHE_THRESHOLD if threshold is None else threshold
+        num_perm = num_perm or config.SEMANTIC_CACHE_PERMUTATIONS
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.hasher = MinHasher(num_perm)
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[float, Tuple[int, ...], str]]" = OrderedDict()
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _bands(self, signature: Tuple[int, ...]) -> List[Tuple[int, Tuple[int, ...]]]:
+        return [
+            (band, signature[start:start + self.rows])
+            for band, start in enumerate(range(0, len(signature), self.rows))
+        ]
+
+    def _remove(self, key: str):
+        _, signature, _ = self._entries.pop(key)
+        for band in self._bands(signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band]
+
+    def _live(self, key: str, now: float) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        if entry[0] <= now:
+            self._remove(key)
+            return False
+        return True
+
+    async def get(self, prompt: str) -> Optional[str]:
+        """Return the answer cached for this or a similar prompt."""
+        now = time.monotonic()
+        key = normalize_text(prompt)
+        if self._live(key, now):
+            return self._hit(key)
+        signature = self.hasher.signature(shingles(key, self.shingle_size))
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self._buckets.get(band, set())
+        best, best_score = None, self.threshold
+        for candidate in candidates:
+            if not self._live(candidate, now):
+                continue
+            score = similarity(signature, self._entries[candidate][1])
+            if score >= best_score:
+                best, best_score = candidate, score
+        if best is None:
+            self.stats.misses += 1
+            return None
+        logger.debug(f"{self.name} cache matched {key!r} to {best!r} ({best_score:.2f})")
+        return self._hit(best)
+
+    def _hit(self, key: str) -> str:
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        return self._entries[key][2]
+
+    async def set(self, prompt: str, answer: str):
+        """Store the answer of a prompt, evicting the least recently used entries."""
+        key = normalize_text(prompt)
+        if key in self._entries:
+            self._remove(key)
+        signature = self.hasher.signature(shingles(key, self.shingle_size))
+        self._entries[key] = (time.monotonic() + self.ttl, signature, answer)
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, set()).add(key)
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    async def clear(self):
+        """Remove all entries."""
+        self._entries.clear()
+        self._buckets.clear()
+
+
+def create_semantic_cache(name: str) -> SemanticCache:
+    """Create a semantic cache whose stats appear in ``cache_stats``."""
+    cache = SemanticCache(name)
+    register_cache(name, cache)
+    return cache
+
+
+async def cached_stream(
+    cache: Optional[SemanticCache],
+    prompt: str,
+    stream: Callable[[], AsyncIterator[str]],
+) -> AsyncIterator[str]:
+    """Yield a cached answer, or stream a new one and cache it once complete."""
+    if cache is None:
+        async for chunk in stream():
+            yield chunk
+        return
+    answer = await cache.get(prompt)
+    if answer is not None:
+        yield answer
+        return
+    parts = []
+    async for chunk in stream():
+        parts.append(chunk)
+        yield chunk
+    answer = "".join(parts)
+    if answer.strip():
+        await cache.set(prompt, answer)
@@ -1,24 +1,37 @@
 """User interaction handlers for the Telegram AI Bot."""
 
 import base64
-import os
+import hashlib
 import logging
-from datetime import datetime, timedelta
+from functools import partial
+from typing import Awaitable, Callable
 
 from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import CommandStart
 from aiogram.fsm.context import FSMContext
+from aiogram.fsm.state import State
 from aiogram.types import BufferedInputFile, CallbackQuery, Message
 
-from telegram_ai_bot import keyboards as kb
-from telegram_ai_bot.database.requests import set_user
+from telegram_ai_bot import config, keyboards as kb
+from telegram_ai_bot.database.requests import (
+    get_image_file_id,
+    queue_user,
+    save_image_file_id,
+)
 from telegram_ai_bot.generators import (
     code_generation,
     image_generation,
     image_recognition,
     search_with_mistral,
+    stream_code_generation,
+    stream_search_with_mistral,
+    stream_text_generation,
     text_generation,
 )
+from telegram_ai_bot.history import create_history_store
+from telegram_ai_bot.jobs import job_queue
+from telegram_ai_bot.middleware.admission_middleware import AdmissionMiddleware
 from telegram_ai_bot.middleware.subscribe_middleware import CheckSubscribeMiddleware
 from telegram_ai_bot.states import (
     CodeGeneration,
@@ -27,7 +40,8 @@ from telegram_ai_bot.states import (
     TextGeneration,
     WebSearch,
 )
-from telegram_ai_bot.utils.trim_history import trim_history
+from telegram_ai_bot.utils.images import pick_photo
+from telegram_ai_bot.utils.streaming import stream_reply
 
 # Настраиваем logger для модуля
 logger = logging.getLogger(__name__)
@@ -35,14 +49,17 @@ logger = logging.getLogger(__name__)
 user_router = Router(name="user")
 user_router.message.middleware(CheckSubscribeMiddleware())
 user_router.callback_query.middleware(CheckSubscribeMiddleware())
-history = {}
+user_router.message.middleware(AdmissionMiddleware())
+history_store = create_history_store()
+
+ERROR_TEXT = "An error occurred. Please try again."
 
 
 @user_router.callback_query()
 async def handle_subscription_callback(callback: CallbackQuery, state: FSMContext):
     """Handle subscription callback queries."""
     if callback.data == "subscribe":
-        await set_user(callback.from_user.id)
+        await queue_user(callback.from_user.id, callback.bot.id)
         await callback.bot.send_message(
             text="Welcome! Choose an option from the menu.",
             reply_markup=kb.get_main_keyboard(),
@@ -54,15 +71,16 @@ async def handle_subscription_callback(callback: CallbackQuery, state: FSMContex
 @user_router.message(CommandStart())
 async def start_command(message: Message, state: FSMContext):
     """Handle the /start command."""
-    await set_user(message.from_user.id)
+    await queue_user(message.from_user.id, message.bot.id)
     await message.answer(text="Welcome!", reply_markup=kb.get_main_keyboard())
     await state.clear()
 
 
 @user_router.message(F.text == "Back to Menu")
 async def back_to_menu(message: Message, state: FSMContext):
-    """Return to the main menu."""
-    await set_user(message.from_user.id)
+    """Return to the main menu, cancelling the user's running requests."""
+    job_queue.cancel_user(message.from_user.id)
+    await queue_user(message.from_user.id, message.bot.id)
     await message.answer(
         text="You are back in the menu!", reply_markup=kb.get_main_keyboard()
     )
@@ -88,40 +106,76 @@ async def start_text_generation(message: Message, state: FSMContext):
     )
 
 
-@user_router.message(TextGeneration.text)
+def submit_job(
+    message: Message,
+    state: FSMContext,
+    feature: str,
+    run: Callable[[], Awaitable[None]],
+    done_state: State,
+):
+    """Run a generation in the job queue and return the user to ``done_state``.
+
+    Failures and timeouts are reported to the user. A job cancelled because
+    the user went back to the menu leaves the state alone.
+    """
+    chat_id = message.chat.id
+
+    async def job():
+        try:
+            await run()
+        except Exception as e:
+            logger.error(f"Error in {feature} job: {e}")
+            await message.bot.send_message(chat_id=chat_id, text=ERROR_TEXT)
+        await state.set_state(done_state)
+
+    async def on_queued(position: int):
+        await message.bot.send_message(
+            chat_id=chat_id,
+            text=f"The bot is busy, your request is number {position} in the queue...",
+        )
+
+    async def on_timeout():
+        await message.bot.send_message(
+            chat_id=chat_id, text="The request took too long. Please try again."
+        )
+        await state.set_state(done_state)
+
+    job_queue.submit(message.from_user.id, feature, job, on_queued, on_timeout)
+
+
+@user_router.message(TextGeneration.text, flags={"feature": "text"})
 async def process_text_generation(message: Message, state: FSMContext):
-    """Process text generation request with rate limiting."""
-    current_time = datetime.now()
-    data = await state.get_data()
-    last_request_time = data.get("last_request_time")
-    if last_request_time:
-        last_request_time = datetime.fromisoformat(last_request_time)
-        if current_time - last_request_time < timedelta(seconds=10):
-            remaining_time = 10 - (current_time - last_request_time).total_seconds()
-            await message.answer(
-                f"Please wait {int(remaining_time)} seconds before the next request."
-            )
-            return
+    """Queue a text generation request."""
     send_message = await message.answer(
         "The bot is thinking, please wait a moment..."
     )
     await state.set_state(TextGeneration.wait)
-    if message.from_user.id not in history:
-        history[message.from_user.id] = []
-    history[message.from_user.id].append({"role": "user", "content": message.text})
-    history[message.from_user.id] = await trim_history(
-        history[message.from_user.id], max_length=4096, max_messages=5
+    submit_job(
+        message,
+        state,
+        "text",
+        partial(generate_text, message, send_message),
+        TextGeneration.text,
     )
-    answer = await text_generation(history[message.from_user.id])
+
+
+async def generate_text(message: Message, send_message: Message):
+    """Answer with the user's conversation history as context."""
+    await history_store.append(
+        message.from_user.id, {"role": "user", "content": message.text}
+    )
+    messages = await history_store.get(message.from_user.id)
+    if config.STREAM_REPLIES:
+        answer = await stream_reply(send_message, stream_text_generation(messages))
+    else:
+        answer = await text_generation(messages)
     if not answer:
         raise ValueError("Empty response from model")
-    history[message.from_user.id].append({"role": "assistant", "content": answer})
-    history[message.from_user.id] = await trim_history(
-        history[message.from_user.id], max_length=4096, max_messages=5
+    await history_store.append(
+        message.from_user.id, {"role": "assistant", "content": answer}
     )
-    await send_message.answer(answer)
-    await state.update_data(last_request_time=current_time.isoformat())
-    await state.set_state(TextGeneration.text)
+    if not config.STREAM_REPLIES:
+        await message.bot.send_message(chat_id=message.chat.id, text=answer)
 
 
 @user_router.message(F.text == "Image Generation")
@@ -133,38 +187,41 @@ async def start_image_generation(message: Message, state: FSMContext):
     )
 
 
-@user_router.message(ImageGeneration.image)
+@user_router.message(ImageGeneration.image, flags={"feature": "image"})
 async def process_image_generation(message: Message, state: FSMContext):
-    """Process image generation request with rate limiting."""
-    current_time = datetime.now()
-    data = await state.get_data()
-    last_request_time = data.get("last_request_time")
-    if last_request_time:
-        last_request_time = datetime.fromisoformat(last_request_time)
-        if current_time - last_request_time < timedelta(seconds=10):
-            remaining_time = 10 - (current_time - last_request_time).total_seconds()
-            await message.answer(
-                f"Please wait {int(remaining_time)} seconds before the next request."
-            )
-            return
-    send_message = await message.answer(
+    """Queue an image generation request."""
+    await message.answer(
         "The bot is generating an image, please wait a moment..."
     )
     await state.set_state(ImageGeneration.wait)
+    submit_job(
+        message, state, "image", partial(generate_image, message), ImageGeneration.image
+    )
+
+
+async def generate_image(message: Message):
+    """Generate an image from the prompt and send it to the user."""
     answer = await image_generation(message.text)
-    image_bytes = base64.b64decode(answer)
-    await send_message.answer_photo(
-        photo=BufferedInputFile(file=image_bytes, filename="generated_image.jpg")
+    await send_image(message, base64.b64decode(answer))
+
+
+async def send_image(message: Message, image_bytes: bytes):
+    """Send image bytes, re-using the file_id if this bot uploaded them before."""
+    bot = message.bot
+    content_hash = hashlib.sha256(image_bytes).hexdigest()
+    file_id = await get_image_file_id(bot.id, content_hash)
+    if file_id is not None:
+        try:
+            await bot.send_photo(chat_id=message.chat.id, photo=file_id)
+            return
+        except TelegramBadRequest as e:
+            logger.warning(f"Cached image file_id rejected, uploading again: {e}")
+    sent = await bot.send_photo(
+        chat_id=message.chat.id,
+        photo=BufferedInputFile(file=image_bytes, filename="generated_image.jpg"),
     )
-    generated_images_dir = "generated_images"
-    if os.path.exists(generated_images_dir):
-        for distribution in os.listdir(generated_images_dir):
-            file_path = os.path.join(generated_images_dir, distribution)
-            if os.path.isfile(file_path):
-                os.remove(file_path)
-        os.rmdir(generated_images_dir)
-    await state.update_data(last_request_time=current_time.isoformat())
-    await state.set_state(ImageGeneration.image)
+    if sent.photo:
+        await save_image_file_id(bot.id, content_hash, sent.photo[-1].file_id)
 
 
 @user_router.message(F.text == "Code Generation")
@@ -176,40 +233,38 @@ async def start_code_generation(message: Message, state: FSMContext):
     )
 
 
-@user_router.message(CodeGeneration.code)
+@user_router.message(CodeGeneration.code, flags={"feature": "code"})
 async def process_code_generation(message: Message, state: FSMContext):
-    """Process code generation request with rate limiting."""
-    current_time = datetime.now()
-    data = await state.get_data()
-    last_request_time = data.get("last_request_time")
-    if last_request_time:
-        last_request_time = datetime.fromisoformat(last_request_time)
-        if current_time - last_request_time < timedelta(seconds=10):
-            remaining_time = 10 - (current_time - last_request_time).total_seconds()
-            await message.answer(
-                f"Please wait {int(remaining_time)} seconds before the next request."
-            )
-            return
+    """Queue a code generation request."""
     send_message = await message.answer(
         "The bot is generating code, please wait a moment..."
     )
     await state.set_state(CodeGeneration.wait)
-    if message.from_user.id not in history:
-        history[message.from_user.id] = []
-    history[message.from_user.id].append({"role": "user", "content": message.text})
-    history[message.from_user.id] = await trim_history(
-        history[message.from_user.id], max_length=4096, max_messages=5
+    submit_job(
+        message,
+        state,
+        "code",
+        partial(generate_code, message, send_message),
+        CodeGeneration.code,
     )
-    answer = await code_generation(message.text)
+
+
+async def generate_code(message: Message, send_message: Message):
+    """Generate code for the prompt."""
+    await history_store.append(
+        message.from_user.id, {"role": "user", "content": message.text}
+    )
+    if config.STREAM_REPLIES:
+        answer = await stream_reply(send_message, stream_code_generation(message.text))
+    else:
+        answer = await code_generation(message.text)
     if not answer:
         raise ValueError("Empty response from model")
-    history[message.from_user.id].append({"role": "assistant", "content": answer})
-    history[message.from_user.id] = await trim_history(
-        history[message.from_user.id], max_length=4096, max_messages=5
+    await history_store.append(
+        message.from_user.id, {"role": "assistant", "content": answer}
     )
-    await send_message.answer(answer)
-    await state.update_data(last_request_time=current_time.isoformat())
-    await state.set_state(CodeGeneration.code)
+    if not config.STREAM_REPLIES:
+        await message.bot.send_message(chat_id=message.chat.id, text=answer)
 
 
 @user_router.message(F.text == "Image Recognition")
@@ -221,40 +276,33 @@ async def start_image_recognition(message: Message, state: FSMContext):
     )
 
 
-@user_router.message(ImageRecognition.vision, F.photo)
+@user_router.message(ImageRecognition.vision, F.photo, flags={"feature": "vision"})
 async def process_image_recognition(message: Message, state: FSMContext):
-    """Process image recognition request with rate limiting."""
-    current_time = datetime.now()
-    data = await state.get_data()
-    last_request_time = data.get("last_request_time")
-    if last_request_time:
-        last_request_time = datetime.fromisoformat(last_request_time)
-        if current_time - last_request_time < timedelta(seconds=10):
-            remaining_time = 10 - (current_time - last_request_time).total_seconds()
-            await message.answer(f"Please wait {int(remaining_time)} seconds before the next request.")
-            return
+    """Queue an image recognition request."""
     processing_message = await message.answer("The bot is processing the image, please wait a moment...")
-    try:
-        await state.set_state(ImageRecognition.wait)
-        os.makedirs("images", exist_ok=True)  # Создаём директорию, если она отсутствует
-        photo = message.photo[-1]
-        get_file = await message.bot.get_file(photo.file_id)
-        photo_path = f"images/{photo.file_id}.jpg"
-        await message.bot.download(get_file.file_id, destination=photo_path, timeout=90)
-        caption = message.caption or "Describe this image in detail"
-        answer = await image_recognition(photo_path, caption)
-        if answer is None:
-            await message.answer("Sorry, an error occurred while processing the image. Please try again.")
-        else:
-            await processing_message.edit_text(answer)
-        await state.update_data(last_request_time=current_time.isoformat())
-        await state.set_state(ImageRecognition.vision)
-    except Exception as e:
-        logger.error(f"Error processing image: {e}")
-        await message.answer("An error occurred. Please try again.")
-    finally:
-        if os.path.exists(photo_path):
-            os.remove(photo_path)
+    await state.set_state(ImageRecognition.wait)
+    submit_job(
+        message,
+        state,
+        "vision",
+        partial(recognize_image, message, processing_message),
+        ImageRecognition.vision,
+    )
+
+
+async def recognize_image(message: Message, processing_message: Message):
+    """Describe the photo using the caption as the prompt."""
+    photo = pick_photo(message.photo, config.VISION_MAX_SIDE)
+    image = await message.bot.download(photo.file_id, timeout=90)
+    caption = message.caption or "Describe this image in detail"
+    answer = await image_recognition(image.getvalue(), caption)
+    if answer is None:
+        await message.bot.send_message(
+            chat_id=message.chat.id,
+            text="Sorry, an error occurred while processing the image. Please try again.",
+        )
+    else:
+        await processing_message.edit_text(answer)
 
 
 @user_router.message(F.text == "Web Search (beta)")
@@ -266,22 +314,24 @@ async def start_web_search(message: Message, state: FSMContext):
     )
 
 
-@user_router.message(WebSearch.internet)
+@user_router.message(WebSearch.internet, flags={"feature": "search"})
 async def process_web_search(message: Message, state: FSMContext):
-    """Process web search request with rate limiting."""
-    current_time = datetime.now()
-    data = await state.get_data()
-    last_request_time = data.get("last_request_time")
-    if last_request_time:
-        last_request_time = datetime.fromisoformat(last_request_time)
-        if current_time - last_request_time < timedelta(seconds=10):
-            remaining_time = 10 - (current_time - last_request_time).total_seconds()
-            await message.answer(f"Please wait {int(remaining_time)} seconds before the next request.")
-            return
+    """Queue a web search request."""
     send_message = await message.answer("The bot is searching the web, please wait a moment...")
     await state.set_state(WebSearch.wait)
-    res = await search_with_mistral(message.text)
-    await send_message.answer(res)
-    await state.update_data(last_request_time=current_time.isoformat())
-    await state.set_state(WebSearch.internet)
-    
\ No newline at end of file
+    submit_job(
+        message,
+        state,
+        "search",
+        partial(search_web, message, send_message),
+        WebSearch.internet,
+    )
+
+
+async def search_web(message: Message, send_message: Message):
+    """Answer the query from web search results."""
+    if config.STREAM_REPLIES:
+        await stream_reply(send_message, stream_search_with_mistral(message.text))
+    else:
+        res = await search_with_mistral(message.text)
+        await message.bot.send_message(chat_id=message.chat.id, text=res)
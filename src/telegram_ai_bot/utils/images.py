@@ -0,0 +1,94 @@
+"""In-memory preparation of photos for the vision model."""
+
+import asyncio
+import base64
+import io
+import json
+import logging
+import uuid
+from typing import Any, AsyncIterator, Dict, Sequence, Tuple
+
+from aiogram.types import PhotoSize
+
+from telegram_ai_bot import config
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Multiple of 3 so chunks encode to base64 without padding in between
+ENCODE_CHUNK_SIZE = 3 * 16384
+
+
+def pick_photo(photos: Sequence[PhotoSize], max_side: int) -> PhotoSize:
+    """Return the smallest Telegram rendition covering ``max_side``, else the largest."""
+    for photo in sorted(photos, key=lambda p: p.width * p.height):
+        if max(photo.width, photo.height) >= max_side:
+            return photo
+    return max(photos, key=lambda p: p.width * p.height)
+
+
+def downscale_image(data: bytes, max_side: int) -> Tuple[bytes, str]:
+    """Shrink an image so its longest side is at most ``max_side``.
+
+    Returns the image bytes and MIME type. Without Pillow the input is
+    returned unchanged as JPEG, which is what Telegram sends for photos.
+    """
+    if Image is None:
+        return data, "image/jpeg"
+    with Image.open(io.BytesIO(data)) as image:
+        if max(image.size) <= max_side:
+            return data, Image.MIME.get(image.format, "image/jpeg")
+        image.thumbnail((max_side, max_side))
+        output = io.BytesIO()
+        image.convert("RGB").save(output, format="JPEG", quality=config.VISION_JPEG_QUALITY)
+    return output.getvalue(), "image/jpeg"
+
+
+async def prepare_image(data: bytes) -> Tuple[bytes, str]:
+    """Downscale an image, in a worker thread when it is large."""
+    if Image is None:
+        return data, "image/jpeg"
+    if len(data) < config.VISION_THREAD_BYTES:
+        return downscale_image(data, config.VISION_MAX_SIDE)
+    return await asyncio.to_thread(downscale_image, data, config.VISION_MAX_SIDE)
+
+
+def base64_length(size: int) -> int:
+    """Return the length of the padded base64 encoding of ``size`` bytes."""
+    return (size + 2) // 3 * 4
+
+
+def iter_base64(data: bytes, chunk_size: int = ENCODE_CHUNK_SIZE):
+    """Yield the base64 encoding of ``data`` piece by piece."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield base64.b64encode(view[start:start + chunk_size])
+
+
+def build_json_body(
+    payload: Dict[str, Any], data: bytes, mime_type: str
+) -> Tuple[int, AsyncIterator[bytes]]:
+    """Return the length and a byte stream of ``payload`` serialised as JSON.
+
+    The string ``"{image}"`` anywhere in ``payload`` is replaced by a data URL
+    of ``data``, whose base64 is produced chunk by chunk while sending
+    instead of being held in memory as one string.
+    """
+    marker = uuid.uuid4().hex
+    body = json.dumps(payload).replace('"{image}"', f'"{marker}"')
+    prefix, suffix = body.split(marker, 1)
+    prefix = f"{prefix}data:{mime_type};base64,".encode()
+    suffix = suffix.encode()
+    length = len(prefix) + base64_length(len(data)) + len(suffix)
+
+    async def stream() -> AsyncIterator[bytes]:
+        yield prefix
+        for chunk in iter_base64(data):
+            yield chunk
+        yield suffix
+
+    return length, stream()
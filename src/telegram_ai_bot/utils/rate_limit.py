@@ -0,0 +1,46 @@
+"""Token bucket rate limiting."""
+
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Token bucket allowing ``rate`` operations per second with bursts up to ``capacity``."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> float:
+        """Take tokens if available and return 0, otherwise return seconds to wait."""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        self._refill(now)
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available and take them."""
+        async with self._lock:
+            while True:
+                delay = self.try_acquire(tokens)
+                if not delay:
+                    return
+                await asyncio.sleep(delay)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens for ``seconds``, e.g. after a RetryAfter."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._updated = self._paused_until
+        self.tokens = 0
@@ -0,0 +1,161 @@
+"""Coalescing of identical concurrent calls into one shared execution."""
+
+import asyncio
+import functools
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from telegram_ai_bot.metrics import Counter, registry
+
+coalesced_calls = registry.register(
+    Counter(
+        "bot_coalesced_calls_total",
+        "Calls served by an identical call already in flight.",
+        ["name"],
+    )
+)
+
+
+def _consume_result(task: asyncio.Future):
+    # Keep asyncio quiet about errors of calls whose waiters all left
+    if not task.cancelled():
+        task.exception()
+
+
+class _Call:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class _SharedStream:
+    """Buffer a source stream so every subscriber gets all of its chunks."""
+
+    def __init__(self, source: AsyncIterator):
+        self.chunks: List[Any] = []
+        self.error: Optional[BaseException] = None
+        self.finished = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.ensure_future(self._pump(source))
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, source: AsyncIterator):
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.finished = True
+            self._notify()
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def subscribe(self) -> AsyncIterator:
+        """Yield the chunks received so far, then the rest as they arrive."""
+        index = 0
+        while True:
+            if index < len(self.chunks):
+                index += 1
+                yield self.chunks[index - 1]
+            elif self.finished:
+                if self.error is not None:
+                    raise self.error
+                return
+            else:
+                await self._changed.wait()
+
+
+class SingleFlight:
+    """Run at most one call per key and share its outcome with every caller.
+
+    A caller that is cancelled stops waiting without affecting the others;
+    the shared call is cancelled only once every caller has left.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, _Call] = {}
+        self._streams: Dict[Hashable, _SharedStream] = {}
+
+    @staticmethod
+    def _forget(entries: dict, key: Hashable, entry: Any):
+        if entries.get(key) is entry:
+            del entries[key]
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable]) -> Any:
+        """Await the call running for ``key``, starting ``factory()`` if there is none."""
+        call = self._calls.get(key)
+        if call is None:
+            call = self._calls[key] = _Call(asyncio.ensure_future(factory()))
+            call.task.add_done_callback(_consume_result)
+            call.task.add_done_callback(lambda _: self._forget(self._calls, key, call))
+        else:
+            coalesced_calls.inc(name=self.name)
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not call.waiters and not call.task.done():
+                self._forget(self._calls, key, call)
+                call.task.cancel()
+
+    async def stream(self, key: Hashable, factory: Callable[[], AsyncIterator]) -> AsyncIterator:
+        """Iterate the stream running for ``key``, starting ``factory()`` if there is none.
+
+        Callers joining late first receive the chunks produced so far.
+        """
+        shared = self._streams.get(key)
+        if shared is None:
+            shared = self._streams[key] = _SharedStream(factory())
+            shared.task.add_done_callback(lambda _: self._forget(self._streams, key, shared))
+        else:
+            coalesced_calls.inc(name=self.name)
+        shared.subscribers += 1
+        try:
+            async for chunk in shared.subscribe():
+                yield chunk
+        finally:
+            shared.subscribers -= 1
+            if not shared.subscribers and not shared.task.done():
+                self._forget(self._streams, key, shared)
+                shared.task.cancel()
+
+
+def coalesce(key: Callable[..., Hashable]):
+    """Decorate a coroutine function so identical concurrent calls share one run.
+
+    ``key`` maps the call arguments to the identity of a call.
+    """
+    def decorator(func):
+        flight = SingleFlight(func.__name__)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await flight.do(key(*args, **kwargs), functools.partial(func, *args, **kwargs))
+
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
+
+
+def coalesce_stream(key: Callable[..., Hashable]):
+    """Decorate a function returning an async iterator to share identical streams."""
+    def decorator(func):
+        flight = SingleFlight(func.__name__)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs) -> AsyncIterator:
+            return flight.stream(key(*args, **kwargs), functools.partial(func, *args, **kwargs))
+
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
@@ -0,0 +1,169 @@
+"""Progressive delivery of streamed AI answers into Telegram messages."""
+
+import asyncio
+import logging
+import time
+from typing import AsyncIterator, List, Optional
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+from telegram_ai_bot import config
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_MESSAGE_LIMIT = 4096
+FINAL_EDIT_ATTEMPTS = 3
+
+
+def split_point(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> int:
+    """Return where to cut text so the first part fits in one message."""
+    if len(text) <= limit:
+        return len(text)
+    for separator in ("\n", " "):
+        index = text.rfind(separator, 0, limit)
+        if index >= limit // 2:
+            return index + 1
+    return limit
+
+
+def _not_modified(error: TelegramBadRequest) -> bool:
+    return "message is not modified" in error.message
+
+
+class StreamingReply:
+    """Render a streamed answer by progressively editing a placeholder message.
+
+    Edits are coalesced so a chat sees at most one edit per interval. The
+    interval grows when Telegram answers with ``RetryAfter`` and slowly
+    shrinks back after successful edits. Intermediate edits are sent as plain
+    text because partial Markdown is often unbalanced; the final edit of each
+    message uses the bot's default parse mode and falls back to plain text.
+    Answers longer than one message continue in follow-up messages.
+    """
+
+    def __init__(
+        self,
+        placeholder: Message,
+        min_interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+        limit: int = TELEGRAM_MESSAGE_LIMIT,
+    ):
+        self.messages: List[Message] = [placeholder]
+        self.text = ""
+        self.limit = limit
+        self.min_interval = (
+            config.STREAM_EDIT_INTERVAL if min_interval is None else min_interval
+        )
+        self.max_interval = (
+            config.STREAM_MAX_EDIT_INTERVAL if max_interval is None else max_interval
+        )
+        self.interval = self.min_interval
+        self._start = 0
+        self._rendered = ""
+        self._open = True
+        self._stopped = False
+        self._next_edit = time.monotonic() + self.min_interval
+
+    @property
+    def _pending(self) -> str:
+        return self.text[self._start:]
+
+    async def feed(self, chunk: str):
+        """Append a chunk and edit the current message if the interval allows."""
+        self.text += chunk
+        await self._split_overflow()
+        if (
+            self._open
+            and time.monotonic() >= self._next_edit
+            and self._pending.strip()
+        ):
+            await self._edit_partial(self._pending)
+
+    async def finish(self, empty_text: str = "Error: Empty response from AI") -> str:
+        """Render the remaining text with formatting and return the full answer.
+
+        ``empty_text`` is shown and returned when nothing was streamed.
+        """
+        if not self.text.strip():
+            self.text = ""
+            await self._edit_final(empty_text)
+            return empty_text
+        await self._split_overflow()
+        if self._open and not self._stopped:
+            await self._edit_final(self._pending)
+        return self.text
+
+    async def _split_overflow(self):
+        while not self._stopped:
+            if not self._open:
+                if not self._pending.strip():
+                    return
+                await self._send_follow_up(self._pending[: self.limit])
+                continue
+            if len(self._pending) <= self.limit:
+                return
+            cut = split_point(self._pending, self.limit)
+            await self._edit_final(self._pending[:cut])
+            self._start += cut
+            self._open = False
+
+    async def _send_follow_up(self, text: str):
+        for _ in range(FINAL_EDIT_ATTEMPTS):
+            try:
+                message = await self.messages[-1].answer(text, parse_mode=None)
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+                continue
+            except TelegramBadRequest as e:
+                logger.warning(f"Unable to send streamed message: {e}")
+                break
+            self.messages.append(message)
+            self._rendered = text
+            self._open = True
+            self._next_edit = time.monotonic() + self.interval
+            return
+        logger.error("Giving up on streaming the rest of the answer")
+        self._stopped = True
+
+    async def _edit_partial(self, text: str):
+        if text == self._rendered:
+            return
+        try:
+            await self.messages[-1].edit_text(text, parse_mode=None)
+            self._rendered = text
+            self.interval = max(self.min_interval, self.interval * 0.9)
+        except TelegramRetryAfter as e:
+            self.interval = min(self.max_interval, max(self.interval * 2, e.retry_after))
+            logger.debug(f"Edit rate limited, next edit in {self.interval:.1f}s")
+        except TelegramBadRequest as e:
+            if not _not_modified(e):
+                logger.warning(f"Unable to edit streamed message: {e}")
+        self._next_edit = time.monotonic() + self.interval
+
+    async def _edit_final(self, text: str):
+        message = self.messages[-1]
+        for _ in range(FINAL_EDIT_ATTEMPTS):
+            try:
+                try:
+                    await message.edit_text(text)
+                except TelegramBadRequest as e:
+                    if _not_modified(e) or text == self._rendered:
+                        break
+                    await message.edit_text(text, parse_mode=None)
+                break
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                if not _not_modified(e):
+                    logger.warning(f"Unable to edit streamed message: {e}")
+                break
+        self._rendered = text
+
+
+async def stream_reply(placeholder: Message, chunks: AsyncIterator[str]) -> str:
+    """Stream chunks into a placeholder message and return the full answer."""
+    reply = StreamingReply(placeholder)
+    async for chunk in chunks:
+        await reply.feed(chunk)
+    return await reply.finish()
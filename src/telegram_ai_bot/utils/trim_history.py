@@ -1,6 +1,18 @@
 """Utility to trim conversation history."""
 
-from typing import List, Dict, Any
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Iterable, List, Tuple
+
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the model token count of a text.
+
+    Four UTF-8 bytes per token is close to Mistral's tokenizer for English and
+    Russian text (Cyrillic letters take two bytes each).
+    """
+    return (len(text.encode("utf-8")) + 3) // 4
 
 
 async def trim_history(history: List[Dict[str, Any]], max_length: int = 4096, max_messages: int = 5) -> List[Dict[str, Any]]:
@@ -17,4 +29,81 @@ async def trim_history(history: List[Dict[str, Any]], max_length: int = 4096, ma
             break
         removed_message = history.pop(0)
         current_length -= len(str(removed_message.get("content", "")))
-    return history
\ No newline at end of file
+    return history
+
+
+class ConversationBuffer:
+    """Conversation history bounded by an approximate token budget.
+
+    Token counts are computed once per message and kept in running totals,
+    so appending and trimming cost O(1) per evicted message. System messages
+    are never evicted and are returned before the rest of the conversation.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int,
+        max_messages: int,
+        estimator: Callable[[str], int] = estimate_tokens,
+    ):
+        self.max_tokens = max_tokens
+        self.max_messages = max_messages
+        self.estimator = estimator
+        self.tokens = 0
+        self._system: List[Tuple[Dict[str, Any], int]] = []
+        self._messages: Deque[Tuple[Dict[str, Any], int]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._system) + len(self._messages)
+
+    def _count(self, message: Dict[str, Any]) -> int:
+        return self.estimator(str(message.get("content", ""))) + MESSAGE_OVERHEAD_TOKENS
+
+    def append(self, message: Dict[str, Any]):
+        """Append a message and evict the oldest ones that exceed the budget."""
+        message = dict(message)
+        tokens = self._count(message)
+        if message.get("role") == "system":
+            self._system.append((message, tokens))
+        else:
+            self._messages.append((message, tokens))
+        self.tokens += tokens
+        self._trim()
+
+    def extend(self, messages: Iterable[Dict[str, Any]]):
+        """Append several messages."""
+        for message in messages:
+            self.append(message)
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """Return system messages followed by the conversation, oldest first."""
+        return [message for message, _ in self._system] + [
+            message for message, _ in self._messages
+        ]
+
+    def _trim(self):
+        while len(self._messages) > self.max_messages or (
+            self.tokens > self.max_tokens and len(self._messages) > 1
+        ):
+            _, tokens = self._messages.popleft()
+            self.tokens -= tokens
+        if self.tokens > self.max_tokens and self._messages:
+            self._truncate_last()
+
+    def _truncate_last(self):
+        message, tokens = self._messages.pop()
+        self.tokens -= tokens
+        budget = max(self.max_tokens - self.tokens, MESSAGE_OVERHEAD_TOKENS + 1)
+        content = str(message.get("content", ""))
+        low, high = 0, len(content)
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self._count({"content": content[:middle] + "..."}) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        content = content[:low]
+        message["content"] = content + "..."
+        tokens = self._count(message)
+        self._messages.append((message, tokens))
+        self.tokens += tokens
@@ -0,0 +1,162 @@
+"""Webhook delivery of updates through an aiohttp server with several workers."""
+
+import asyncio
+import logging
+import multiprocessing
+import signal
+from typing import Callable, List, Optional, Sequence
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from telegram_ai_bot import config
+from telegram_ai_bot.metrics import metrics_server
+
+logger = logging.getLogger(__name__)
+
+
+class DrainingRequestHandler(SimpleRequestHandler):
+    """Webhook handler that acknowledges at once and drains on shutdown.
+
+    Updates are processed in background tasks so Telegram gets its answer
+    immediately. On shutdown, before the dispatcher and the bot session are
+    closed, running updates get ``drain_timeout`` seconds to finish.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, drain_timeout: float, **kwargs):
+        super().__init__(dispatcher, bot, handle_in_background=True, **kwargs)
+        self.drain_timeout = drain_timeout
+
+    @property
+    def in_flight(self) -> int:
+        """Return the number of updates being processed."""
+        return len(self._background_feed_update_tasks)
+
+    async def drain(self, *args):
+        """Wait for updates being processed."""
+        tasks = set(self._background_feed_update_tasks)
+        if not tasks:
+            return
+        logger.info(f"Draining {len(tasks)} updates")
+        _, pending = await asyncio.wait(tasks, timeout=self.drain_timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"Cancelled {len(pending)} updates after the drain timeout")
+
+
+WEBHOOK_HANDLERS = web.AppKey("webhook_handlers", List[DrainingRequestHandler])
+
+
+def webhook_path(bot: Bot, bots: Sequence[Bot]) -> str:
+    """Return the path of a bot's webhook; several bots get one path each."""
+    if len(bots) == 1:
+        return config.WEBHOOK_PATH
+    return f"{config.WEBHOOK_PATH}/{bot.id}"
+
+
+def create_app(dispatcher: Dispatcher, *bots: Bot, **data) -> web.Application:
+    """Create the aiohttp application receiving the updates of ``bots``."""
+    app = web.Application()
+    handlers = []
+    for bot in bots:
+        handler = DrainingRequestHandler(
+            dispatcher,
+            bot,
+            drain_timeout=config.WEBHOOK_DRAIN_TIMEOUT,
+            secret_token=config.WEBHOOK_SECRET,
+        )
+        app.on_shutdown.append(handler.drain)
+        handler.register(app, path=webhook_path(bot, bots))
+        handlers.append(handler)
+    setup_application(app, dispatcher, bot=bots[0], bots=bots, **data)
+    app[WEBHOOK_HANDLERS] = handlers
+    return app
+
+
+async def set_webhook(bot: Bot, dispatcher: Dispatcher, path: Optional[str] = None):
+    """Point Telegram at the bot's path under ``WEBHOOK_URL``."""
+    await bot.set_webhook(
+        url=config.WEBHOOK_URL.rstrip("/") + (path or config.WEBHOOK_PATH),
+        secret_token=config.WEBHOOK_SECRET,
+        allowed_updates=dispatcher.resolve_used_update_types(),
+    )
+
+
+def run_worker(
+    index: int,
+    create_dispatcher: Callable[[], Dispatcher],
+    create_bots: Callable[[], List[Bot]],
+):
+    """Serve webhooks in this process; only worker 0 runs singleton jobs."""
+    logging.basicConfig(level=logging.INFO)
+    dispatcher = create_dispatcher()
+    app = create_app(dispatcher, *create_bots(), primary=index == 0)
+    if config.METRICS_PORT:
+
+        async def serve_metrics(app: web.Application):
+            # Each worker keeps its own metrics, so each gets its own port
+            async with metrics_server(config.METRICS_PORT + index):
+                yield
+
+        app.cleanup_ctx.append(serve_metrics)
+    web.run_app(
+        app,
+        host=config.WEBHOOK_HOST,
+        port=config.WEBHOOK_PORT,
+        reuse_port=config.WEBHOOK_WORKERS > 1,
+        print=None,
+    )
+
+
+def run_webhook(
+    create_dispatcher: Callable[[], Dispatcher],
+    create_bots: Callable[[], List[Bot]],
+    workers: Optional[int] = None,
+):
+    """Register the webhooks and serve them from ``workers`` processes.
+
+    Workers share the port through ``SO_REUSEPORT``; SIGTERM is forwarded so
+    each worker drains its updates before exiting. Dialog states must then
+    live in Redis because consecutive updates of a user may reach different
+    workers.
+    """
+    workers = workers or config.WEBHOOK_WORKERS
+    if workers > 1 and config.FSM_STORAGE != "redis":
+        logger.warning("Several webhook workers need FSM_STORAGE=redis to share states")
+
+    async def register():
+        dispatcher = create_dispatcher()
+        bots = create_bots()
+        for bot in bots:
+            async with bot.session:
+                await set_webhook(bot, dispatcher, webhook_path(bot, bots))
+
+    asyncio.run(register())
+    if workers == 1:
+        run_worker(0, create_dispatcher, create_bots)
+        return
+    processes = [
+        multiprocessing.Process(
+            target=run_worker, args=(index, create_dispatcher, create_bots)
+        )
+        for index in range(workers)
+    ]
+    for process in processes:
+        process.start()
+
+    def stop(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    for process in processes:
+        while True:
+            try:
+                process.join()
+                break
+            except KeyboardInterrupt:
+                # Workers receive the same SIGINT and shut down on their own
+                continue
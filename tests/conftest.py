@@ -0,0 +1,20 @@
+"""Shared fixtures: point the bot at a throwaway SQLite database."""
+
+import asyncio
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp(prefix="telegram_ai_bot_tests_")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_db_dir, 'db.sqlite3')}"
+
+import pytest  # noqa: E402
+
+from telegram_ai_bot.database.models import async_main, engine  # noqa: E402
+
+
+@pytest.fixture(scope="session", autouse=True)
+def create_tables():
+    """Create all tables once for the test session."""
+    asyncio.run(async_main())
+    asyncio.run(engine.dispose())
+    yield
@@ -0,0 +1,90 @@
+"""Unit tests for admission control."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from telegram_ai_bot.admission import AdmissionController, Overloaded, RateLimited
+from telegram_ai_bot.middleware.admission_middleware import AdmissionMiddleware
+
+
+@pytest.mark.asyncio
+async def test_user_rate_limit():
+    """Test that a user's second request within the interval is rejected."""
+    controller = AdmissionController(limits={"text": 5}, user_interval=10, user_burst=1)
+    async with controller.admit(1, "text"):
+        pass
+    with pytest.raises(RateLimited) as error:
+        async with controller.admit(1, "text"):
+            pass
+    assert 9 < error.value.retry_after <= 10
+    async with controller.admit(2, "text"):
+        pass
+
+
+@pytest.mark.asyncio
+async def test_queue_positions_and_fifo_order():
+    """Test that waiting requests learn their position and run in order."""
+    controller = AdmissionController(limits={"image": 1}, user_interval=0, max_queue=5)
+    release = asyncio.Event()
+    order, positions = [], []
+
+    async def request(user_id):
+        async def on_queued(position):
+            positions.append((user_id, position))
+
+        async with controller.admit(user_id, "image", on_queued):
+            order.append(user_id)
+            await release.wait()
+
+    tasks = [asyncio.create_task(request(user_id)) for user_id in (1, 2, 3)]
+    await asyncio.sleep(0.01)
+    assert order == [1]
+    assert positions == [(2, 1), (3, 2)]
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == [1, 2, 3]
+    assert controller.gate("image").active == 0
+
+
+@pytest.mark.asyncio
+async def test_load_shedding_and_cancelled_waiter():
+    """Test that a full queue sheds requests and cancelled waiters leave it."""
+    controller = AdmissionController(limits={"search": 1}, user_interval=0, max_queue=1)
+    release = asyncio.Event()
+
+    async def hold(user_id):
+        async with controller.admit(user_id, "search"):
+            await release.wait()
+
+    first = asyncio.create_task(hold(1))
+    waiting = asyncio.create_task(hold(2))
+    await asyncio.sleep(0.01)
+    with pytest.raises(Overloaded):
+        async with controller.admit(3, "search"):
+            pass
+    waiting.cancel()
+    await asyncio.sleep(0.01)
+    assert controller.gate("search").queued == 0
+    release.set()
+    await first
+    assert controller.gate("search").active == 0
+
+
+@pytest.mark.asyncio
+async def test_middleware_uses_feature_flag():
+    """Test that only flagged handlers are rate limited."""
+    middleware = AdmissionMiddleware(AdmissionController(user_interval=10))
+    message = MagicMock()
+    message.from_user.id = 5
+    message.answer = AsyncMock()
+    handler = AsyncMock(return_value="done")
+    flagged = {"handler": MagicMock(flags={"feature": "text"})}
+    plain = {"handler": MagicMock(flags={})}
+
+    assert await middleware(handler, message, flagged) == "done"
+    assert await middleware(handler, message, flagged) is None
+    assert "Please wait" in message.answer.call_args.args[0]
+    assert await middleware(handler, message, plain) == "done"
+    assert handler.await_count == 2
@@ -0,0 +1,210 @@
+"""Unit tests for serving several bots from one process."""
+
+import asyncio
+import json
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+from sqlalchemy import create_engine, text
+
+from telegram_ai_bot import config, generators
+from telegram_ai_bot.admin import AdminFilter
+from telegram_ai_bot.admission import AdmissionController
+from telegram_ai_bot.bots import (
+    BotSettings,
+    current_bot,
+    load_bot_settings,
+    reset_bot,
+    set_bot_settings,
+    use_bot,
+)
+from telegram_ai_bot.database.models import upgrade_schema
+from telegram_ai_bot.jobs import JobQueue
+from telegram_ai_bot.middleware.admission_middleware import AdmissionMiddleware
+from telegram_ai_bot.middleware.bot_settings_middleware import BotSettingsMiddleware
+from telegram_ai_bot.middleware.dedup_middleware import UpdateDeduplicationMiddleware
+from telegram_ai_bot.webhook import create_app
+
+MAIN = BotSettings("101:MAIN", name="main", admins=[1], group="@main")
+SIDE = BotSettings(
+    "202:SIDE",
+    name="side",
+    admins=[2],
+    providers={"text": "mistral:mistral-small-latest"},
+    user_interval=0,
+)
+
+
+@pytest.fixture(autouse=True)
+def bots():
+    """Configure the main and side bots."""
+    set_bot_settings([MAIN, SIDE])
+    yield
+    set_bot_settings([])
+
+
+def test_load_bot_settings(tmp_path, monkeypatch):
+    """Test that the bots file is read and the environment is the fallback."""
+    path = tmp_path / "bots.json"
+    bots = [{"token": "7:A", "admins": [5]}, {"token": "8:B"}]
+    path.write_text(json.dumps({"bots": bots}))
+    first, second = load_bot_settings(str(path))
+    assert (first.id, first.name, first.admins) == (7, "7", [5])
+    assert (second.id, second.admins, second.group) == (8, [667393044], None)
+
+    bots = [{"token": "7:A", "providers": {"music": "x:y"}}]
+    path.write_text(json.dumps({"bots": bots}))
+    with pytest.raises(ValueError, match="music"):
+        load_bot_settings(str(path))
+
+    monkeypatch.setattr(config, "BOTS_CONFIG", "")
+    monkeypatch.setenv("TOKEN", "9:ENV")
+    monkeypatch.setenv("GROUP", "@env")
+    monkeypatch.setenv("ADMINS", "3,4")
+    (settings,) = load_bot_settings()
+    assert (settings.id, settings.group, settings.admins) == (9, "@env", [3, 4])
+
+
+def test_upgrade_schema_assigns_existing_rows(tmp_path):
+    """Test that users and mailings of an older database move to the given bot."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.sqlite3'}")
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "CREATE TABLE users (user_id INTEGER PRIMARY KEY, tg_id BIGINT UNIQUE, "
+                "is_active BOOLEAN NOT NULL DEFAULT 1)"
+            )
+        )
+        conn.execute(
+            text(
+                "CREATE TABLE broadcasts (id INTEGER PRIMARY KEY, "
+                "admin_chat_id BIGINT, from_chat_id BIGINT, message_id INTEGER, "
+                "last_user_id INTEGER, sent INTEGER, failed INTEGER, blocked INTEGER, "
+                "status VARCHAR(16))"
+            )
+        )
+        conn.execute(
+            text("INSERT INTO users (tg_id, is_active) VALUES (10, 1), (11, 0)")
+        )
+        conn.execute(text("INSERT INTO broadcasts (status) VALUES ('running')"))
+        upgrade_schema(conn, 101)
+        upgrade_schema(conn, 202)
+        conn.execute(text("INSERT INTO users (bot_id, tg_id) VALUES (202, 10)"))
+        users = conn.execute(text("SELECT bot_id, tg_id, is_active FROM users")).all()
+        broadcasts = conn.execute(text("SELECT bot_id FROM broadcasts")).all()
+    engine.dispose()
+    assert users == [(101, 10, 1), (101, 11, 0), (202, 10, 1)]
+    assert broadcasts == [(101,)]
+
+
+@pytest.mark.asyncio
+async def test_admin_filter_uses_the_current_bot():
+    """Test that each bot has its own admins."""
+    message = MagicMock()
+    message.from_user.id = 2
+    assert not await AdminFilter()(message)
+    token = use_bot(SIDE)
+    try:
+        assert await AdminFilter()(message)
+    finally:
+        reset_bot(token)
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_with_the_submitting_bot():
+    """Test that a job sees the settings of the bot whose update submitted it."""
+    queue = JobQueue(controller=AdmissionController(user_interval=0), workers=1)
+    seen = []
+
+    async def job():
+        seen.append(current_bot().name)
+
+    queue.submit(1, "text", job)
+    token = use_bot(SIDE)
+    try:
+        queue.submit(1, "text", job)
+    finally:
+        reset_bot(token)
+    await queue.close(drain_timeout=1)
+    assert seen == ["main", "side"]
+
+
+def test_bot_router_shares_backends():
+    """Test that a bot's provider list reuses the default backends."""
+    default = generators.bot_router("text")
+    token = use_bot(SIDE)
+    try:
+        side = generators.bot_router("text")
+        assert generators.bot_router("text") is side
+    finally:
+        reset_bot(token)
+    small = "mistral:mistral-small-latest"
+    assert [backend.name for backend in side.backends] == [small]
+    assert side.backends[0] is next(b for b in default.backends if b.name == small)
+
+
+@pytest.mark.asyncio
+async def test_rate_limits_are_per_bot():
+    """Test that a user is limited separately on each bot, at the bot's rate."""
+    middleware = AdmissionMiddleware(AdmissionController(user_interval=10))
+    message = MagicMock()
+    message.from_user.id = 5
+    message.answer = AsyncMock()
+    handler = AsyncMock(return_value="done")
+    data = {"handler": MagicMock(flags={"feature": "text"})}
+
+    assert await middleware(handler, message, data) == "done"
+    assert await middleware(handler, message, data) is None
+    token = use_bot(SIDE)
+    try:
+        for _ in range(3):
+            assert await middleware(handler, message, data) == "done"
+    finally:
+        reset_bot(token)
+
+
+def make_update(update_id):
+    """Return a raw text message update."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": "hello",
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_webhook_serves_each_bot_with_its_settings():
+    """Test that bots get their own paths and equal update ids are not duplicates."""
+    handled = []
+    router = Router()
+
+    @router.message()
+    async def handler(message: Message):
+        handled.append((message.bot.id, current_bot().name))
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(UpdateDeduplicationMiddleware(max_size=100))
+    dp.update.outer_middleware(BotSettingsMiddleware())
+    dp.include_router(router)
+    app = create_app(dp, Bot(MAIN.token), Bot(SIDE.token))
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    try:
+        for path in (f"{config.WEBHOOK_PATH}/101", f"{config.WEBHOOK_PATH}/202"):
+            response = await client.post(path, json=make_update(1))
+            assert response.status == 200
+        for _ in range(100):
+            if len(handled) == 2:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        await client.close()
+    assert sorted(handled) == [(101, "main"), (202, "side")]
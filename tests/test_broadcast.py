@@ -0,0 +1,125 @@
+"""Unit tests for the broadcast engine."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.exceptions import TelegramForbiddenError, TelegramRetryAfter
+from sqlalchemy import delete, select
+
+from telegram_ai_bot import broadcast as broadcast_module
+from telegram_ai_bot.broadcast import Broadcaster, resume_broadcasts
+from telegram_ai_bot.database.models import Broadcast, User, async_session
+from telegram_ai_bot.database.requests import create_broadcast, get_broadcast
+from telegram_ai_bot.utils.rate_limit import TokenBucket
+
+
+@pytest.fixture
+async def users():
+    """Populate the users table with five active users of bot 42 and two of bot 43."""
+    async with async_session() as session:
+        await session.execute(delete(User))
+        await session.execute(delete(Broadcast))
+        session.add_all(User(bot_id=42, tg_id=tg_id) for tg_id in range(1, 6))
+        session.add_all(User(bot_id=43, tg_id=tg_id) for tg_id in (2, 6))
+        await session.commit()
+    yield
+    async with async_session() as session:
+        await session.execute(delete(User))
+        await session.execute(delete(Broadcast))
+        await session.commit()
+
+
+def test_token_bucket_limits_burst():
+    """Test that the bucket hands out at most its capacity at once."""
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() == 0
+    assert bucket.try_acquire() > 0
+
+
+def test_token_bucket_pause():
+    """Test that a pause blocks the bucket for the given time."""
+    bucket = TokenBucket(rate=1000, capacity=10)
+    bucket.pause(5)
+    assert bucket.try_acquire() == pytest.approx(5, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_counts_and_deactivates(users):
+    """Test that blocked users are deactivated and a RetryAfter is retried."""
+    bot = MagicMock()
+    calls = []
+
+    async def copy_message(chat_id, from_chat_id, message_id):
+        calls.append(chat_id)
+        if chat_id == 2:
+            raise TelegramForbiddenError(method=MagicMock(), message="bot was blocked")
+        if chat_id == 3 and calls.count(3) == 1:
+            raise TelegramRetryAfter(method=MagicMock(), message="flood", retry_after=0)
+
+    bot.copy_message = copy_message
+    bot.send_message = AsyncMock()
+    broadcast_id = await create_broadcast(
+        bot_id=42, admin_chat_id=99, from_chat_id=99, message_id=7
+    )
+
+    counters = await Broadcaster(bot, rate=1000, concurrency=2, batch_size=2).run(broadcast_id)
+
+    assert counters == {"sent": 4, "failed": 0, "blocked": 1}
+    assert calls.count(3) == 2
+    assert 6 not in calls
+    broadcast = await get_broadcast(broadcast_id)
+    assert broadcast.status == "done"
+    assert broadcast.sent == 4
+    async with async_session() as session:
+        inactive = await session.execute(
+            select(User.bot_id, User.tg_id).where(~User.is_active)
+        )
+        assert inactive.all() == [(42, 2)]
+    assert "Mailing completed" in bot.send_message.call_args.kwargs["text"]
+
+
+@pytest.mark.asyncio
+async def test_broadcaster_resumes_after_last_user(users):
+    """Test that a resumed mailing skips users already processed."""
+    bot = MagicMock()
+    bot.copy_message = AsyncMock()
+    bot.send_message = AsyncMock()
+    broadcast_id = await create_broadcast(
+        bot_id=42, admin_chat_id=99, from_chat_id=99, message_id=7
+    )
+    async with async_session() as session:
+        user_ids = list(
+            await session.scalars(
+                select(User.user_id).where(User.bot_id == 42).order_by(User.user_id)
+            )
+        )
+        broadcast = await session.get(Broadcast, broadcast_id)
+        broadcast.last_user_id = user_ids[2]
+        broadcast.sent = 3
+        await session.commit()
+
+    counters = await Broadcaster(bot, rate=1000).run(broadcast_id)
+
+    assert counters["sent"] == 5
+    assert bot.copy_message.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_resume_broadcasts_uses_the_owning_bot(users, monkeypatch):
+    """Test that mailings resume with their own bot and others are left alone."""
+    started = []
+
+    def start_broadcast(bot, broadcast_id):
+        started.append((bot, broadcast_id))
+
+    monkeypatch.setattr(broadcast_module, "start_broadcast", start_broadcast)
+    ours = await create_broadcast(
+        bot_id=42, admin_chat_id=99, from_chat_id=99, message_id=7
+    )
+    await create_broadcast(bot_id=77, admin_chat_id=99, from_chat_id=99, message_id=7)
+    bot = MagicMock(id=42)
+
+    await resume_broadcasts([bot])
+
+    assert started == [(bot, ours)]
@@ -0,0 +1,99 @@
+"""Unit tests for the TTL/LRU caches."""
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from telegram_ai_bot import cache
+from telegram_ai_bot.cache import MemoryCache, SQLiteCache, normalize_text
+from telegram_ai_bot.database.models import Base
+
+
+class FakeTime:
+    """Controllable replacement for the time module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Patch the cache clock."""
+    fake = FakeTime()
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    """Provide sessions bound to a temporary database."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'cache.sqlite3'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine)
+    await engine.dispose()
+
+
+def test_normalize_text():
+    """Test cache key normalization."""
+    assert normalize_text("  What is   AI? ") == "what is ai?"
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_lru_and_ttl(clock):
+    """Test LRU eviction, TTL expiry and hit/miss counters."""
+    memory = MemoryCache("test", maxsize=2, ttl=10)
+    await memory.set("a", 1)
+    await memory.set("b", 2)
+    assert await memory.get("a") == 1
+    await memory.set("c", 3)
+    assert await memory.get("b") is None
+    clock.now += 11
+    assert await memory.get("a") is None
+    assert len(memory) == 1
+    assert (memory.stats.hits, memory.stats.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_cache_lru_and_ttl(clock, session_factory):
+    """Test the SQLite backend with the same eviction rules."""
+    sqlite = SQLiteCache("test", maxsize=2, ttl=10, session_factory=session_factory)
+    await sqlite.set("a", {"text": "one"})
+    clock.now += 1
+    await sqlite.set("b", [1, 2])
+    clock.now += 1
+    assert await sqlite.get("a") == {"text": "one"}
+    clock.now += 1
+    await sqlite.set("c", "three")
+    assert await sqlite.get("b") is None
+    assert await sqlite.get("c") == "three"
+    clock.now += 11
+    assert await sqlite.get("c") is None
+    assert sqlite.stats.hits == 2
+    assert sqlite.stats.hit_rate == 0.5
+
+
+def test_create_cache_registers_stats():
+    """Test that created caches are reported in the stats registry."""
+    created = cache.create_cache("registry-test", maxsize=1, ttl=1, backend="memory")
+    assert cache.cache_stats()["registry-test"] is created.stats
+    with pytest.raises(ValueError):
+        cache.create_cache("bad", maxsize=1, ttl=1, backend="redis")
+
+
+@pytest.mark.asyncio
+async def test_memory_cache_per_entry_ttl_and_delete(clock):
+    """Test that set accepts a per-entry TTL and entries can be deleted."""
+    memory = MemoryCache("ttl", maxsize=10, ttl=100)
+    await memory.set("short", 1, ttl=5)
+    await memory.set("long", 2)
+    clock.now += 10
+    assert await memory.get("short") is None
+    assert await memory.get("long") == 2
+    await memory.delete("long")
+    assert await memory.get("long") is None
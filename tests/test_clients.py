@@ -0,0 +1,66 @@
+"""Unit tests for the shared provider clients."""
+
+import asyncio
+import os
+import pathlib
+import subprocess
+import sys
+
+import pytest
+
+from telegram_ai_bot import clients
+
+HEAVY_MODULES = ("mistralai", "g4f", "duckduckgo_search", "bs4", "lxml", "numpy")
+
+
+@pytest.mark.asyncio
+async def test_clients_are_shared():
+    """Test that repeated lookups reuse the same pooled clients."""
+    try:
+        assert clients.get_api_client() is clients.get_api_client()
+        assert clients.get_web_client() is clients.get_web_client()
+        assert clients.get_api_client() is not clients.get_web_client()
+        mistral = clients.get_mistral_client()
+        assert mistral is clients.get_mistral_client()
+        assert mistral.sdk_configuration.async_client is clients.get_api_client()
+    finally:
+        await clients.close_clients()
+
+
+@pytest.mark.asyncio
+async def test_close_clients_recreates_pool():
+    """Test that closed clients are rebuilt on next use."""
+    api_client = clients.get_api_client()
+    await clients.close_clients()
+    assert api_client.is_closed
+    new_client = clients.get_api_client()
+    assert new_client is not api_client
+    await clients.close_clients()
+    await clients.close_clients()
+
+
+def test_importing_the_bot_skips_provider_sdks():
+    """Test that the provider SDKs and parsers are not imported at startup."""
+    root = pathlib.Path(__file__).resolve().parents[1]
+    code = (
+        "import sys, run; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(root / "src"), str(root)]))
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        cwd=root,
+        env=env,
+        check=True,
+    )
+    assert result.stdout.strip() == ""
+
+
+@pytest.mark.asyncio
+async def test_preload_sdks_imports_modules(caplog):
+    """Test that preloading imports the SDKs and skips missing ones."""
+    await asyncio.to_thread(clients.preload_sdks, ("json", "missing_sdk"))
+    assert "json" in sys.modules
+    assert "Unable to preload missing_sdk" in caplog.text
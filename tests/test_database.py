@@ -1,26 +1,93 @@
 """Unit tests for database operations."""
 
+import asyncio
+
 import pytest
-from sqlalchemy import select
+from sqlalchemy import delete, func, select, text
 
-from telegram_ai_bot.database.models import User, async_session
-from telegram_ai_bot.database.requests import set_user, get_users
+from telegram_ai_bot.database.models import User, async_session, engine
+from telegram_ai_bot.database.requests import (
+    UserWriteBuffer,
+    get_users,
+    iter_tg_id_chunks,
+    iter_tg_ids,
+    set_user,
+)
 
 
 @pytest.mark.asyncio
 async def test_set_user():
     """Test adding a new user to the database."""
     async with async_session() as session:
-        await set_user(123456)
+        await set_user(123456, bot_id=42)
         user = await session.scalar(select(User).where(User.tg_id == 123456))
         assert user.tg_id == 123456
+        assert user.bot_id == 42
 
 
 @pytest.mark.asyncio
 async def test_get_users():
     """Test retrieving all users from the database."""
     async with async_session() as session:
-        session.add(User(tg_id=123456))
+        session.add(User(tg_id=654321))
         await session.commit()
     users = await get_users()
-    assert any(user.tg_id == 123456 for user in users)
\ No newline at end of file
+    assert any(user.tg_id == 654321 for user in users)
+
+@pytest.mark.asyncio
+async def test_iter_tg_ids():
+    """Test that tg_ids are streamed in user_id order across chunks."""
+    async with async_session() as session:
+        await session.execute(delete(User))
+        session.add_all([User(tg_id=tg_id) for tg_id in (30, 10, 20, 40, 50)])
+        session.add(User(tg_id=60, is_active=False))
+        await session.commit()
+    chunks = [chunk async for chunk in iter_tg_id_chunks(chunk_size=2)]
+    assert chunks == [[30, 10], [20, 40], [50, 60]]
+    assert [tg_id async for tg_id in iter_tg_ids(chunk_size=4, active_only=True)] == [
+        30, 10, 20, 40, 50
+    ]
+
+
+async def count_users(tg_ids):
+    """Return how many rows exist for the given tg_ids."""
+    async with async_session() as session:
+        return await session.scalar(
+            select(func.count()).select_from(User).where(User.tg_id.in_(tg_ids))
+        )
+
+
+@pytest.mark.asyncio
+async def test_set_user_is_idempotent():
+    """Test that registering a user twice keeps a single row per bot."""
+    await set_user(777, bot_id=42)
+    await set_user(777, bot_id=42)
+    assert await count_users([777]) == 1
+    await set_user(777, bot_id=43)
+    assert await count_users([777]) == 2
+
+
+@pytest.mark.asyncio
+async def test_user_write_buffer_flushes_by_size_and_interval():
+    """Test that buffered users are written in batches."""
+    buffer = UserWriteBuffer(max_size=3, interval=0.05)
+    for tg_id in (901, 902, 902):
+        await buffer.add(tg_id, 42)
+    assert await count_users([901, 902]) == 0
+    await buffer.add(903, 42)
+    assert await count_users([901, 902, 903]) == 3
+
+    await buffer.add(904, 42)
+    await asyncio.sleep(0.2)
+    assert await count_users([904]) == 1
+
+    await buffer.add(901, 42)
+    assert not buffer._pending
+
+
+@pytest.mark.asyncio
+async def test_sqlite_uses_wal():
+    """Test that connections are switched to WAL journaling."""
+    async with engine.connect() as conn:
+        mode = await conn.scalar(text("PRAGMA journal_mode"))
+    assert mode == "wal"
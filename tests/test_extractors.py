@@ -0,0 +1,51 @@
+"""Unit tests for HTML paragraph extractors."""
+
+import pytest
+
+from telegram_ai_bot.extractors import (
+    ParagraphScanner,
+    available_backends,
+    extract_paragraphs,
+    resolve_backend,
+)
+
+PAGE = (
+    "<html><head><script>var p = '<p>no</p>';</script></head><body>"
+    "<p>Hello <b>bold</b></p><div>skip</div><p>world<script>x()</script></p>"
+    "<p>" + "a" * 50 + "</p><p>more</p></body></html>"
+)
+
+
+@pytest.mark.parametrize("backend", available_backends())
+def test_backends_extract_paragraphs_within_budget(backend):
+    """Test that every backend skips scripts and stops at the budget."""
+    text = extract_paragraphs(PAGE.encode(), "utf-8", 30, backend)
+    assert text == "Hello bold world " + "a" * 13
+    assert extract_paragraphs(PAGE.encode(), "utf-8", 1000, backend).endswith(" more")
+
+
+def test_truncated_multibyte_character_is_dropped():
+    """Test that a character cut at the byte cap does not become garbage."""
+    data = "<p>привет</p>".encode("utf-8")[:-5]
+    assert extract_paragraphs(data, "utf-8", 100, "stdlib") == "приве"
+    assert extract_paragraphs(b"<p>x</p>", "no-such-codec", 100, "stdlib") == "x"
+
+
+def test_resolve_backend():
+    """Test backend selection."""
+    assert resolve_backend("auto") == available_backends()[0]
+    assert resolve_backend("stdlib") == "stdlib"
+    with pytest.raises(ValueError):
+        resolve_backend("regex")
+
+
+def test_scanner_counts_paragraph_bytes_across_chunks():
+    """Test that tags split between chunks are counted once."""
+    data = b"<html><P class=x>abc</p><pre>zz</pre><p>defgh</p ><path/><p>open"
+    whole = ParagraphScanner()
+    whole.feed(data)
+    split = ParagraphScanner()
+    for index in range(len(data)):
+        split.feed(data[index:index + 1])
+    assert whole.paragraph_bytes == split.paragraph_bytes == 22
+    assert whole.inside and split.inside
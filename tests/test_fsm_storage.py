@@ -0,0 +1,95 @@
+"""Unit tests for the FSM storage backends."""
+
+import pytest
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from telegram_ai_bot.database.models import Base, FSMRecord
+from telegram_ai_bot.fsm_storage import SQLiteStorage, create_storage
+from telegram_ai_bot.states import TextGeneration
+
+KEY = StorageKey(bot_id=1, chat_id=10, user_id=10)
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    """Provide sessions bound to a temporary database."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'fsm.sqlite3'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine)
+    await engine.dispose()
+
+
+async def count_records(session_factory):
+    """Return the number of stored FSM records."""
+    async with session_factory() as session:
+        return await session.scalar(select(func.count()).select_from(FSMRecord))
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_batches_writes_and_survives_restart(session_factory):
+    """Test that writes are cached, flushed in batches and read back later."""
+    storage = SQLiteStorage(session_factory, flush_interval=60, batch_size=100)
+    await storage.set_state(KEY, TextGeneration.text)
+    await storage.update_data(KEY, {"count": 1})
+    assert await storage.get_state(KEY) == TextGeneration.text.state
+    assert await storage.get_data(KEY) == {"count": 1}
+    assert await count_records(session_factory) == 0
+
+    await storage.close()
+    assert await count_records(session_factory) == 1
+
+    restarted = SQLiteStorage(session_factory)
+    assert await restarted.get_state(KEY) == TextGeneration.text.state
+    assert await restarted.get_data(KEY) == {"count": 1}
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_flushes_by_size_and_deletes_cleared(session_factory):
+    """Test that a full batch is written at once and cleared keys are removed."""
+    storage = SQLiteStorage(session_factory, flush_interval=60, batch_size=2)
+    other = StorageKey(bot_id=1, chat_id=20, user_id=20)
+    await storage.set_state(KEY, "a")
+    await storage.set_state(other, "b")
+    assert await count_records(session_factory) == 2
+
+    await storage.set_state(KEY, None)
+    await storage.set_data(KEY, {})
+    await storage.close()
+    assert await count_records(session_factory) == 1
+
+
+@pytest.mark.asyncio
+async def test_sqlite_storage_returns_data_copies(session_factory):
+    """Test that mutating returned data does not change the stored data."""
+    storage = SQLiteStorage(session_factory)
+    await storage.set_data(KEY, {"items": [1]})
+    data = await storage.get_data(KEY)
+    data["items"].append(2)
+    assert await storage.get_data(KEY) == {"items": [1]}
+    await storage.close()
+
+
+def test_create_storage():
+    """Test that the configured backend is created."""
+    assert isinstance(create_storage("memory"), MemoryStorage)
+    assert isinstance(create_storage("sqlite"), SQLiteStorage)
+    with pytest.raises(ValueError):
+        create_storage("unknown")
+
+
+@pytest.mark.asyncio
+async def test_redis_storage_with_fake_server():
+    """Test the Redis backend against an in-process fake server."""
+    fakeredis = pytest.importorskip("fakeredis")
+    from aiogram.fsm.storage.redis import RedisStorage
+
+    storage = RedisStorage(redis=fakeredis.FakeAsyncRedis())
+    await storage.set_state(KEY, TextGeneration.text)
+    await storage.set_data(KEY, {"count": 1})
+    assert await storage.get_state(KEY) == TextGeneration.text.state
+    assert await storage.get_data(KEY) == {"count": 1}
+    await storage.close()
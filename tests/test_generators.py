@@ -3,13 +3,14 @@
 import pytest
 from unittest.mock import AsyncMock, patch
 
-from telegram_ai_bot.generators import text_generation, image_generation, code_generation, encode_image_to_base64
+from telegram_ai_bot import generators
+from telegram_ai_bot.generators import text_generation, image_generation, code_generation, encode_image_to_base64, enhance_image_prompt
 
 
 @pytest.mark.asyncio
 async def test_text_generation():
     """Test text generation with mocked Mistral client."""
-    with patch("telegram_ai_bot.generators.Mistral") as MockMistral:
+    with patch("telegram_ai_bot.generators.get_mistral_client") as MockMistral:
         mock_client = AsyncMock()
         mock_response = AsyncMock()
         mock_chunk = type("Chunk", (), {"data": type("Data", (), {"choices": [type("Choice", (), {"delta": type("Delta", (), {"content": "Test response"})})]})})
@@ -23,7 +24,7 @@ async def test_text_generation():
 @pytest.mark.asyncio
 async def test_image_generation():
     """Test image generation with mocked clients."""
-    with patch("telegram_ai_bot.generators.Mistral") as MockMistral, patch("telegram_ai_bot.generators.AsyncClient") as MockAsyncClient:
+    with patch("telegram_ai_bot.generators.get_mistral_client") as MockMistral, patch("telegram_ai_bot.generators.get_image_client") as MockAsyncClient:
         mock_text_client = AsyncMock()
         mock_image_client = AsyncMock()
         mock_response_text = AsyncMock()
@@ -42,7 +43,7 @@ async def test_image_generation():
 @pytest.mark.asyncio
 async def test_code_generation():
     """Test code generation with mocked Mistral client."""
-    with patch("telegram_ai_bot.generators.Mistral") as MockMistral:
+    with patch("telegram_ai_bot.generators.get_mistral_client") as MockMistral:
         mock_client = AsyncMock()
         mock_response = AsyncMock()
         mock_chunk = type("Chunk", (), {"data": type("Data", (), {"choices": [type("Choice", (), {"delta": type("Delta", (), {"content": "Code response"})})]})})
@@ -58,4 +59,21 @@ def test_encode_image_to_base64(tmp_path):
     image_path = tmp_path / "test.jpg"
     image_path.write_bytes(b"fake image data")
     result = encode_image_to_base64(str(image_path))
-    assert result == "ZmFrZSBpbWFnZSBkYXRh"
\ No newline at end of file
+    assert result == "ZmFrZSBpbWFnZSBkYXRh"
+
+@pytest.mark.asyncio
+async def test_enhance_image_prompt_cache_and_bypass():
+    """Test that rewrites are cached and detailed English prompts are kept."""
+    await generators.image_prompt_cache.clear()
+    with patch("telegram_ai_bot.generators.stream_chat") as mock_stream:
+        async def chunks(*args):
+            yield "A red fox in the snow, golden hour"
+
+        mock_stream.side_effect = chunks
+        assert await enhance_image_prompt("Лиса в снегу") == "A red fox in the snow, golden hour"
+        assert await enhance_image_prompt("  лиса В снегу ") == "A red fox in the snow, golden hour"
+        assert mock_stream.call_count == 1
+
+        detailed = " ".join(["a detailed oil painting of a lighthouse at dusk"] * 4)
+        assert await enhance_image_prompt(detailed) == detailed
+        assert mock_stream.call_count == 1
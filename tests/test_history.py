@@ -0,0 +1,106 @@
+"""Unit tests for conversation history stores."""
+
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from telegram_ai_bot import history
+from telegram_ai_bot.database.models import Base
+from telegram_ai_bot.history import MemoryHistoryStore, SQLiteHistoryStore
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    """Provide sessions bound to a temporary database."""
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'history.sqlite3'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine)
+    await engine.dispose()
+
+
+def user_message(text):
+    """Build a user message."""
+    return {"role": "user", "content": text}
+
+
+@pytest.mark.asyncio
+async def test_memory_store_caps_messages_and_users():
+    """Test per-user message caps and least recently active eviction."""
+    store = MemoryHistoryStore(max_messages=2, max_tokens=100, max_users=2, idle_ttl=60)
+    for text in ("one", "two", "three"):
+        await store.append(1, user_message(text))
+    assert await store.get(1) == [user_message("two"), user_message("three")]
+    await store.append(2, user_message("hi"))
+    await store.append(3, user_message("hey"))
+    assert len(store) == 2
+    assert await store.get(1) == []
+
+
+@pytest.mark.asyncio
+async def test_memory_store_evicts_idle_users(monkeypatch):
+    """Test that idle users are forgotten."""
+    now = [100.0]
+    monkeypatch.setattr(history.time, "monotonic", lambda: now[0])
+    store = MemoryHistoryStore(max_messages=5, max_tokens=100, max_users=10, idle_ttl=60)
+    await store.append(1, user_message("old"))
+    now[0] += 30
+    await store.append(2, user_message("new"))
+    now[0] += 31
+    assert await store.get(1) == []
+    assert await store.get(2) == [user_message("new")]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_keeps_latest_messages(session_factory):
+    """Test that the SQLite store keeps the newest messages per user."""
+    store = SQLiteHistoryStore(
+        max_messages=2, max_tokens=100, idle_ttl=60, session_factory=session_factory
+    )
+    for text in ("one", "two", "three"):
+        await store.append(1, user_message(text))
+    await store.append(2, {"role": "assistant", "content": "other"})
+    assert await store.get(1) == [user_message("two"), user_message("three")]
+    await store.clear(1)
+    assert await store.get(1) == []
+    assert await store.get(2) == [{"role": "assistant", "content": "other"}]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_trims_by_tokens(session_factory):
+    """Test that histories are trimmed to the token budget."""
+    store = SQLiteHistoryStore(
+        max_messages=5, max_tokens=10, idle_ttl=60, session_factory=session_factory
+    )
+    await store.append(1, user_message("a" * 16))
+    await store.append(1, user_message("b" * 16))
+    assert await store.get(1) == [user_message("b" * 16)]
+
+
+def test_history_store_requires_all_methods():
+    """Test that incomplete backends fail at construction."""
+    class PartialStore(history.HistoryStore):
+        async def get(self, user_id):
+            return []
+
+    with pytest.raises(TypeError):
+        PartialStore(max_messages=5, max_tokens=100, idle_ttl=60)
+
+
+@pytest.mark.asyncio
+async def test_sqlite_store_prunes_idle_users_on_append(session_factory, monkeypatch):
+    """Test that appends periodically remove idle users' rows."""
+    now = [1000.0]
+    monkeypatch.setattr(history.time, "time", lambda: now[0])
+    monkeypatch.setattr(history.time, "monotonic", lambda: now[0])
+    store = SQLiteHistoryStore(
+        max_messages=5,
+        max_tokens=100,
+        idle_ttl=60,
+        session_factory=session_factory,
+        prune_interval=30,
+    )
+    await store.append(1, user_message("old"))
+    now[0] += 100
+    await store.append(2, user_message("new"))
+    assert await store.get(1) == []
+    assert await store.get(2) == [user_message("new")]
@@ -0,0 +1,86 @@
+"""Unit tests for in-memory image preparation."""
+
+import base64
+import io
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from telegram_ai_bot.generators import image_recognition
+from telegram_ai_bot.utils import images
+from telegram_ai_bot.utils.images import build_json_body, iter_base64, pick_photo
+
+
+def photo(width, height):
+    """Return a photo size stub."""
+    return MagicMock(width=width, height=height)
+
+
+def test_pick_photo_prefers_smallest_sufficient_size():
+    """Test that the smallest rendition covering the limit is chosen."""
+    sizes = [photo(90, 60), photo(320, 213), photo(1280, 853), photo(2560, 1706)]
+    assert pick_photo(sizes, 1024) is sizes[2]
+    assert pick_photo(sizes[:2], 1024) is sizes[1]
+
+
+def test_iter_base64_matches_one_shot_encoding():
+    """Test that chunked encoding equals encoding the whole buffer."""
+    data = bytes(range(256)) * 1000 + b"x"
+    assert b"".join(iter_base64(data, chunk_size=3 * 7)) == base64.b64encode(data)
+
+
+@pytest.mark.asyncio
+async def test_build_json_body_streams_valid_json():
+    """Test that the streamed body is the payload with an embedded data URL."""
+    data = b"\xff\xd8 image bytes"
+    payload = {"messages": [{"text": 'say "hi"', "image_url": "{image}"}]}
+    length, stream = build_json_body(payload, data, "image/jpeg")
+    body = b"".join([chunk async for chunk in stream])
+    assert len(body) == length
+    url = f"data:image/jpeg;base64,{base64.b64encode(data).decode()}"
+    assert json.loads(body) == {"messages": [{"text": 'say "hi"', "image_url": url}]}
+
+
+@pytest.mark.asyncio
+async def test_prepare_image_without_pillow(monkeypatch):
+    """Test that images pass through unchanged when Pillow is missing."""
+    monkeypatch.setattr(images, "Image", None)
+    assert await images.prepare_image(b"raw") == (b"raw", "image/jpeg")
+
+
+@pytest.mark.asyncio
+async def test_image_recognition_posts_streamed_body(monkeypatch):
+    """Test that image recognition sends the image from memory."""
+    monkeypatch.setattr(images, "Image", None)
+    sent = {}
+
+    async def post(url, headers, content):
+        sent["body"] = b"".join([chunk async for chunk in content])
+        sent["headers"] = headers
+        response = MagicMock()
+        response.json.return_value = {"choices": [{"message": {"content": "A cat"}}]}
+        return response
+
+    client = MagicMock()
+    client.post = AsyncMock(side_effect=post)
+    with patch("telegram_ai_bot.generators.get_api_client", return_value=client):
+        assert await image_recognition(b"photo", "What is it?") == "A cat"
+    request = json.loads(sent["body"])
+    assert request["messages"][0]["content"][1]["image_url"] == (
+        "data:image/jpeg;base64," + base64.b64encode(b"photo").decode()
+    )
+    assert sent["headers"]["Content-Length"] == str(len(sent["body"]))
+
+
+def test_downscale_image_limits_longest_side():
+    """Test that large images are shrunk and small ones left alone."""
+    pil = pytest.importorskip("PIL.Image")
+    buffer = io.BytesIO()
+    pil.new("RGB", (2000, 1000), "red").save(buffer, format="PNG")
+    data, mime_type = images.downscale_image(buffer.getvalue(), 500)
+    assert mime_type == "image/jpeg"
+    with pil.open(io.BytesIO(data)) as image:
+        assert image.size == (500, 250)
+    small = buffer.getvalue()
+    assert images.downscale_image(small, 4000) == (small, "image/png")
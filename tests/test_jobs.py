@@ -0,0 +1,91 @@
+"""Unit tests for the background job queue."""
+
+import asyncio
+
+import pytest
+
+from telegram_ai_bot.admission import AdmissionController, Overloaded
+from telegram_ai_bot.jobs import JobQueue
+
+
+def make_queue(**kwargs):
+    """Return a job queue with its own admission controller."""
+    controller = AdmissionController(limits={"image": 1}, user_interval=0)
+    return JobQueue(controller=controller, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_jobs_run_in_background_with_ids():
+    """Test that submitting returns at once and jobs run later in order."""
+    queue = make_queue(workers=2)
+    results = []
+
+    async def job(value):
+        await asyncio.sleep(0.01)
+        results.append(value)
+
+    first = queue.submit(1, "image", lambda: job("a"))
+    second = queue.submit(2, "image", lambda: job("b"))
+    assert (first, second) == (1, 2)
+    assert results == []
+    await queue.close(drain_timeout=1)
+    assert results == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_cancel_user_stops_running_and_queued_jobs():
+    """Test that a user's jobs are cancelled without affecting others."""
+    queue = make_queue(workers=3)
+    started, finished = [], []
+
+    async def job(name):
+        started.append(name)
+        await asyncio.sleep(0.05)
+        finished.append(name)
+
+    queue.submit(1, "image", lambda: job("running"))
+    queue.submit(1, "image", lambda: job("queued"))
+    queue.submit(2, "image", lambda: job("other"))
+    await asyncio.sleep(0.01)
+    assert queue.pending(1) == 2
+
+    assert queue.cancel_user(1) == 2
+    await queue.close(drain_timeout=1)
+    assert started == ["running", "other"]
+    assert finished == ["other"]
+    assert queue.pending(1) == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_and_queue_position():
+    """Test that slow jobs time out and waiting jobs learn their position."""
+    queue = make_queue(workers=2, timeout=0.05)
+    events = []
+
+    async def slow():
+        await asyncio.sleep(1)
+
+    async def on_queued(position):
+        events.append(("queued", position))
+
+    async def on_timeout():
+        events.append("timeout")
+
+    queue.submit(1, "image", slow, on_timeout=on_timeout)
+    queue.submit(2, "image", slow, on_queued=on_queued, on_timeout=on_timeout)
+    await queue.close(drain_timeout=1)
+    assert events == [("queued", 1), "timeout", "timeout"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_is_overloaded():
+    """Test that submitting to a full queue raises Overloaded."""
+    queue = make_queue(workers=1, max_size=1)
+    release = asyncio.Event()
+    queue.submit(1, "image", release.wait)
+    await asyncio.sleep(0.01)
+    queue.submit(2, "image", release.wait)
+    with pytest.raises(Overloaded):
+        queue.submit(3, "image", release.wait)
+    release.set()
+    await queue.close(drain_timeout=1)
@@ -0,0 +1,128 @@
+"""Unit tests for metrics and instrumentation."""
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+from aiohttp.test_utils import TestClient, TestServer
+
+from telegram_ai_bot import admission, cache, metrics  # noqa: F401 (register collectors)
+from telegram_ai_bot.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    create_metrics_app,
+    generated_tokens,
+    instrument,
+    instrument_stream,
+    span,
+    stage_errors,
+    stage_latency,
+    stages_in_flight,
+)
+from telegram_ai_bot.middleware.metrics_middleware import MetricsMiddleware
+
+
+def test_exposition_format():
+    """Test rendering of counters, gauges and histograms."""
+    counter = Counter("requests_total", "Requests.", ["feature"])
+    counter.inc(feature="text")
+    counter.inc(2, feature='co"de')
+    gauge = Gauge("queued", "Queued jobs.")
+    gauge.set(3)
+    histogram = Histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1))
+    histogram.observe(0.05, stage="db")
+    histogram.observe(0.5, stage="db")
+    lines = counter.render() + gauge.render() + histogram.render()
+    assert lines == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{feature="text"} 1',
+        'requests_total{feature="co\\"de"} 2',
+        "# HELP queued Queued jobs.",
+        "# TYPE queued gauge",
+        "queued 3",
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{stage="db",le="0.1"} 1',
+        'latency_seconds_bucket{stage="db",le="1"} 2',
+        'latency_seconds_bucket{stage="db",le="+Inf"} 2',
+        'latency_seconds_sum{stage="db"} 0.55',
+        'latency_seconds_count{stage="db"} 2',
+    ]
+
+
+def test_labels_must_match():
+    """Test that missing labels are rejected."""
+    with pytest.raises(ValueError):
+        Counter("errors_total", "Errors.", ["stage"]).inc()
+
+
+def test_span_records_errors():
+    """Test that a failing stage is timed and counted."""
+    count = stage_latency.count(stage="test.fail")
+    with pytest.raises(KeyError):
+        with span("test.fail"):
+            assert stages_in_flight.value(stage="test.fail") == 1
+            raise KeyError("x")
+    assert stages_in_flight.value(stage="test.fail") == 0
+    assert stage_latency.count(stage="test.fail") == count + 1
+    assert stage_errors.value(stage="test.fail", error="KeyError") >= 1
+
+
+@pytest.mark.asyncio
+async def test_instrument_decorators():
+    """Test that decorated calls and streams are measured with their tokens."""
+    @instrument("test.call", count_tokens=True)
+    async def call():
+        return "a" * 40
+
+    @instrument_stream("test.stream")
+    async def stream():
+        yield "a" * 8
+        yield "b" * 8
+
+    tokens = generated_tokens.value(stage="test.stream")
+    assert await call() == "a" * 40
+    assert [chunk async for chunk in stream()] == ["a" * 8, "b" * 8]
+    assert stage_latency.count(stage="test.call") == 1
+    assert stage_latency.count(stage="test.stream") == 1
+    assert generated_tokens.value(stage="test.call") == 10
+    assert generated_tokens.value(stage="test.stream") == tokens + 4
+
+
+@pytest.mark.asyncio
+async def test_middleware_and_endpoint():
+    """Test that updates are measured and served on /metrics with collectors."""
+    router = Router()
+
+    @router.message()
+    async def handle(message: Message):
+        return None
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(MetricsMiddleware())
+    dp.include_router(router)
+    update = Update.model_validate(
+        {
+            "update_id": 1,
+            "message": {
+                "message_id": 1,
+                "date": 0,
+                "chat": {"id": 1, "type": "private"},
+                "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+                "text": "hello",
+            },
+        }
+    )
+    count = stage_latency.count(stage="update.message")
+    await dp.feed_update(Bot("42:TEST"), update)
+    assert stage_latency.count(stage="update.message") == count + 1
+
+    async with TestClient(TestServer(create_metrics_app())) as client:
+        response = await client.get(metrics.config.METRICS_PATH)
+        assert response.status == 200
+        assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+        body = await response.text()
+    assert 'bot_stage_duration_seconds_count{stage="update.message"}' in body
+    assert "# TYPE bot_cache_hits_total counter" in body
+    assert "# TYPE bot_admission_queued gauge" in body
@@ -0,0 +1,123 @@
+"""Unit tests for provider routing with local stub providers."""
+
+import asyncio
+
+import pytest
+
+from telegram_ai_bot import config
+from telegram_ai_bot.providers import ProviderError, ProviderRouter, parse_providers
+
+
+@pytest.fixture(autouse=True)
+def fast_settings(monkeypatch):
+    """Use short hedge delays and a small circuit breaker threshold."""
+    monkeypatch.setattr(config, "PROVIDER_ERROR_RATE", config.PROVIDER_ERROR_RATE)
+    monkeypatch.setattr(config, "PROVIDER_HEDGE", True)
+    monkeypatch.setattr(config, "PROVIDER_HEDGE_MIN", 0.05)
+    monkeypatch.setattr(config, "PROVIDER_HEDGE_MAX", 0.05)
+    monkeypatch.setattr(config, "PROVIDER_MIN_SAMPLES", 2)
+    monkeypatch.setattr(config, "PROVIDER_CIRCUIT_FAILURES", 2)
+    monkeypatch.setattr(config, "PROVIDER_CIRCUIT_COOLDOWN", 60.0)
+
+
+def stub(result=None, delay=0.0, error=None, calls=None):
+    """Return a stub provider call."""
+    async def call(*args):
+        if calls is not None:
+            calls.append(args)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result
+
+    return call
+
+
+def stub_stream(chunks, delay=0.0, error=None):
+    """Return a stub streaming provider."""
+    async def call(*args):
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        for chunk in chunks:
+            yield chunk
+
+    return call
+
+
+@pytest.mark.asyncio
+async def test_failover_and_circuit_breaker():
+    """Test that failures fall through and open the circuit."""
+    config.PROVIDER_ERROR_RATE = 1.0
+    router = ProviderRouter("text")
+    calls = []
+    router.register("broken", stub(error=RuntimeError("down"), calls=calls), 1.0)
+    router.register("backup", stub("ok"), 2.0)
+
+    assert await router.call("hi") == "ok"
+    assert await router.call("hi") == "ok"
+    assert len(calls) == 2
+    assert router.backends[0].stats.circuit_open
+    assert await router.call("hi") == "ok"
+    assert len(calls) == 2
+    assert [backend.name for backend in router.candidates()] == ["backup"]
+
+
+@pytest.mark.asyncio
+async def test_all_providers_failing_raises():
+    """Test that ProviderError lists every failure."""
+    router = ProviderRouter("image")
+    router.register("a", stub(error=RuntimeError("a")))
+    router.register("b", stub(error=ValueError("b")))
+    with pytest.raises(ProviderError) as error:
+        await router.call("prompt")
+    assert [name for name, _ in error.value.errors] == ["a", "b"]
+
+
+@pytest.mark.asyncio
+async def test_slow_call_is_hedged():
+    """Test that a slow primary is hedged and the faster answer wins."""
+    router = ProviderRouter("vision")
+    router.register("slow", stub("slow", delay=1.0), 0.01)
+    router.register("fast", stub("fast", delay=0.01), 0.02)
+    started = asyncio.get_running_loop().time()
+    assert await router.call() == "fast"
+    assert asyncio.get_running_loop().time() - started < 0.5
+    assert not router.backends[0].stats.outcomes
+
+
+@pytest.mark.asyncio
+async def test_routing_prefers_lower_measured_latency():
+    """Test that measured p50 latency reorders backends."""
+    router = ProviderRouter("text")
+    router.register("first", stub("first"), 1.0)
+    router.register("second", stub("second"), 2.0)
+    for latency in (3.0, 3.0):
+        router.backends[0].stats.record_success(latency)
+    for latency in (0.5, 0.5):
+        router.backends[1].stats.record_success(latency)
+    assert await router.call() == "second"
+
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_before_first_chunk():
+    """Test that a stream failing before its first chunk uses the next backend."""
+    router = ProviderRouter("text")
+    router.register("broken", stub_stream([], error=RuntimeError("down")), 1.0)
+    router.register("backup", stub_stream(["Hel", "lo"]), 2.0)
+    assert [chunk async for chunk in router.stream([])] == ["Hel", "lo"]
+    assert router.backends[0].stats.error_rate == 1.0
+
+
+@pytest.mark.asyncio
+async def test_stream_is_hedged_on_first_chunk():
+    """Test that a stream slow to start is raced against the next backend."""
+    router = ProviderRouter("code")
+    router.register("slow", stub_stream(["slow"], delay=1.0), 0.01)
+    router.register("fast", stub_stream(["fast", "!"]), 0.02)
+    assert [chunk async for chunk in router.stream([])] == ["fast", "!"]
+
+
+def test_parse_providers():
+    """Test parsing of provider lists from the environment."""
+    assert parse_providers(" mistral:a, g4f:flux ,") == [("mistral", "a"), ("g4f", "flux")]
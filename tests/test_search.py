@@ -0,0 +1,137 @@
+"""Unit tests for the web search pipeline."""
+
+import asyncio
+
+import httpx
+import pytest
+
+from telegram_ai_bot import search
+from telegram_ai_bot.search import ParagraphExtractor, fetch_pages
+
+
+def test_paragraph_extractor_skips_scripts():
+    """Test that only paragraph text outside scripts is collected."""
+    parser = ParagraphExtractor(limit=100)
+    parser.feed("<html><script>var p = '<p>no</p>';</script><p>Hello <b>bold</b></p>")
+    parser.feed("<div>skip</div><p>world</p>")
+    assert parser.text == "Hello bold world"
+    assert not parser.done
+
+
+def test_paragraph_extractor_stops_at_limit():
+    """Test that extraction reports completion once the budget is filled."""
+    parser = ParagraphExtractor(limit=10)
+    parser.feed("<p>" + "a" * 20 + "</p><p>more</p>")
+    assert parser.done
+    assert "more" not in parser.text
+
+
+@pytest.fixture(autouse=True)
+async def clear_caches():
+    """Start every test with empty search caches."""
+    await search.search_cache.clear()
+    await search.page_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_fetch_pages_keeps_results_before_deadline():
+    """Test that slow and failing pages do not block the fast ones."""
+    async def handler(request):
+        if request.url.host == "slow.test":
+            await asyncio.sleep(5)
+        if request.url.host == "broken.test":
+            return httpx.Response(500)
+        return httpx.Response(200, text="<p>fast page</p>")
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(search, "get_web_client", lambda: client)
+        results = await fetch_pages(
+            ["http://fast.test/", "http://slow.test/", "http://broken.test/"],
+            limit=550,
+            deadline=0.5,
+        )
+    await client.aclose()
+    assert results == {
+        "http://fast.test/": "fast page",
+        "http://slow.test/": None,
+        "http://broken.test/": None,
+    }
+    assert await search.page_cache.get("http://fast.test/") == "fast page"
+
+
+@pytest.mark.asyncio
+async def test_extract_page_caps_downloaded_bytes():
+    """Test that the page size cap counts bytes, not decoded characters."""
+    body = ("<p>" + "я" * 10000 + "</p>").encode("utf-8")
+    requested = {"bytes": 0}
+
+    async def stream():
+        for start in range(0, len(body), 1000):
+            requested["bytes"] += 1000
+            yield body[start:start + 1000]
+
+    async def handler(request):
+        return httpx.Response(
+            200, headers={"content-type": "text/html; charset=utf-8"}, content=stream()
+        )
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(search, "get_web_client", lambda: client)
+        mp.setattr(search.config, "SEARCH_CHUNK_SIZE", 1000)
+        mp.setattr(search.config, "SEARCH_MAX_PAGE_BYTES", 4000)
+        text = await search.extract_page("http://cyrillic.test/", limit=100000)
+    await client.aclose()
+    assert requested["bytes"] <= 5000
+    assert text == "я" * (4000 // 2 - 2)
+
+
+@pytest.mark.asyncio
+async def test_extract_page_stops_once_paragraphs_fill_the_budget():
+    """Test that the download ends early when enough paragraphs arrived."""
+    requested = {"chunks": 0}
+
+    async def stream():
+        for _ in range(100):
+            requested["chunks"] += 1
+            yield b"<p>" + b"word " * 40 + b"</p>"
+
+    async def handler(request):
+        return httpx.Response(200, content=stream())
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(search, "get_web_client", lambda: client)
+        mp.setattr(search.config, "SEARCH_PROCESSES", 0)
+        mp.setattr(search.config, "SEARCH_CHUNK_SIZE", 207)
+        text = await search.extract_page("http://long.test/", limit=300)
+    await client.aclose()
+    assert len(text) == 300
+    assert requested["chunks"] < 10
+
+
+@pytest.mark.asyncio
+async def test_web_search_does_not_cache_empty_results():
+    """Test that empty DDGS answers are retried instead of cached."""
+    answers = [[], [{"href": "http://fast.test/"}]]
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(search, "_ddgs_text", lambda *args: answers.pop(0))
+        assert await search.web_search("query") == []
+        assert await search.web_search("query") == [{"href": "http://fast.test/"}]
+        assert await search.web_search("Query ") == [{"href": "http://fast.test/"}]
+    assert answers == []
+
+
+@pytest.mark.asyncio
+async def test_start_process_pool_spawns_every_process(monkeypatch):
+    """Test that warming up starts all extraction processes at once."""
+    monkeypatch.setattr(search.config, "SEARCH_PROCESSES", 2)
+    search.shutdown_executor()
+    try:
+        await search.start_process_pool()
+        assert len(search.get_process_pool()._processes) == 2
+        text = await search.run_extractor(b"<p>warm</p>", "utf-8", 10)
+        assert text == "warm"
+    finally:
+        search.shutdown_executor()
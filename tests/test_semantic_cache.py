@@ -0,0 +1,106 @@
+"""Unit tests for the semantic response cache."""
+
+import pytest
+
+from telegram_ai_bot import generators, semantic_cache
+from telegram_ai_bot.semantic_cache import MinHasher, SemanticCache, cached_stream, shingles
+
+
+class FakeTime:
+    """Controllable replacement for the time module."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Patch the semantic cache clock."""
+    fake = FakeTime()
+    monkeypatch.setattr(semantic_cache, "time", fake)
+    return fake
+
+
+def make_cache(**kwargs):
+    """Create a cache with test defaults."""
+    options = {"maxsize": 10, "ttl": 60, "threshold": 0.8, "num_perm": 64}
+    options.update(kwargs)
+    return SemanticCache("test", **options)
+
+
+@pytest.mark.asyncio
+async def test_exact_and_similar_prompts_hit(clock):
+    """Test that normalized and near-identical prompts share an answer."""
+    cache = make_cache()
+    await cache.set("Write hello world in Python", "print('hello world')")
+    assert await cache.get("  write HELLO world in python ") == "print('hello world')"
+    assert await cache.get("write hello world in python please") == "print('hello world')"
+    assert await cache.get("explain quantum entanglement") is None
+    assert (cache.stats.hits, cache.stats.misses) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_entries_expire_and_evict(clock):
+    """Test TTL expiry and LRU eviction."""
+    cache = make_cache(maxsize=2)
+    await cache.set("first prompt", "1")
+    await cache.set("second prompt", "2")
+    assert await cache.get("first prompt") == "1"
+    await cache.set("third prompt", "3")
+    assert await cache.get("second prompt") is None
+    assert len(cache) == 2
+    clock.now += 61
+    assert await cache.get("first prompt") is None
+    assert len(cache) == 1
+
+
+def test_signature_backends_agree(monkeypatch):
+    """Test that the numpy and pure Python signatures are identical."""
+    if semantic_cache.load_numpy() is None:
+        pytest.skip("numpy is not installed")
+    items = shingles("what is artificial intelligence", 3)
+    vectorized = MinHasher(32).signature(items)
+    monkeypatch.setattr(semantic_cache, "np", None)
+    assert MinHasher(32).signature(items) == vectorized
+
+
+@pytest.mark.asyncio
+async def test_cached_stream_stores_complete_answers(clock):
+    """Test that a streamed answer is cached and then served without a call."""
+    cache = make_cache()
+    calls = []
+
+    async def stream():
+        calls.append(1)
+        for chunk in ("Hello", " world"):
+            yield chunk
+
+    first = [chunk async for chunk in cached_stream(cache, "say hi", stream)]
+    second = [chunk async for chunk in cached_stream(cache, "Say hi", stream)]
+    assert first == ["Hello", " world"]
+    assert second == ["Hello world"]
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_only_single_turn_text_is_cached(clock, monkeypatch):
+    """Test that conversations with history bypass the cache."""
+    cache = make_cache()
+    await cache.set("what is ai", "cached")
+    monkeypatch.setattr(generators, "text_answer_cache", cache)
+
+    async def stream(messages):
+        yield "fresh"
+
+    monkeypatch.setattr(generators.get_router("text"), "stream", stream)
+    single = [{"role": "user", "content": "What is AI"}]
+    history = [
+        {"role": "user", "content": "hi"},
+        {"role": "assistant", "content": "hello"},
+        {"role": "user", "content": "What is AI"},
+    ]
+    assert await generators.text_generation(single) == "cached"
+    assert await generators.text_generation(history) == "fresh"
@@ -0,0 +1,106 @@
+"""Unit tests for request coalescing."""
+
+import asyncio
+
+import pytest
+
+from telegram_ai_bot.cache import normalize_text
+from telegram_ai_bot.utils.singleflight import SingleFlight, coalesce, coalesce_stream
+
+
+@pytest.mark.asyncio
+async def test_identical_calls_share_one_run():
+    """Test that concurrent calls with the same key run once."""
+    runs = []
+
+    @coalesce(normalize_text)
+    async def generate(prompt):
+        runs.append(prompt)
+        await asyncio.sleep(0.01)
+        return f"image of {prompt}"
+
+    results = await asyncio.gather(
+        generate("A cat"), generate("a  CAT"), generate("a dog")
+    )
+    assert results == ["image of A cat", "image of A cat", "image of a dog"]
+    assert runs == ["A cat", "a dog"]
+    assert await generate("a cat") == "image of a cat"
+    assert len(runs) == 3
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_leaves_shared_call_running():
+    """Test that one waiter's cancellation does not affect the others."""
+    flight = SingleFlight("test")
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(0.02)
+        return "done"
+
+    first = asyncio.create_task(flight.do("key", work))
+    await started.wait()
+    second = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == "done"
+    assert first.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_shared_call_is_cancelled_when_all_waiters_leave():
+    """Test that the shared call stops once nobody waits for it."""
+    flight = SingleFlight("test")
+    cancelled = asyncio.Event()
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    waiter = asyncio.create_task(flight.do("key", work))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert not flight._calls
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_waiter():
+    """Test that a failure is raised to all callers."""
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("key", work), flight.do("key", work), return_exceptions=True
+    )
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+
+
+@pytest.mark.asyncio
+async def test_stream_is_shared_and_replayed():
+    """Test that late subscribers get earlier chunks and leaving is isolated."""
+    runs = []
+
+    @coalesce_stream(normalize_text)
+    async def answer(query):
+        runs.append(query)
+        for chunk in ("a", "b", "c"):
+            await asyncio.sleep(0.01)
+            yield chunk
+
+    first = answer("news")
+    assert await first.__anext__() == "a"
+    leaving = answer("News")
+    assert await leaving.__anext__() == "a"
+    await leaving.aclose()
+    late = answer("news ")
+    assert [chunk async for chunk in late] == ["a", "b", "c"]
+    assert [chunk async for chunk in first] == ["b", "c"]
+    assert runs == ["news"]
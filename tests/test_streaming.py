@@ -0,0 +1,136 @@
+"""Unit tests for progressive answer streaming."""
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from telegram_ai_bot.utils.streaming import StreamingReply, split_point, stream_reply
+
+
+class MockMessage:
+    """Message stub recording edits and follow-up messages."""
+
+    def __init__(self, sent, fail_markdown=False, retry_after=0):
+        self.sent = sent
+        self.edits = []
+        self.fail_markdown = fail_markdown
+        self.retry_after = retry_after
+        self.sent.append(self)
+
+    async def edit_text(self, text, parse_mode="default"):
+        if self.retry_after:
+            retry_after, self.retry_after = self.retry_after, 0
+            raise TelegramRetryAfter(None, "Flood control", retry_after)
+        if self.fail_markdown and parse_mode == "default":
+            raise TelegramBadRequest(None, "can't parse entities")
+        self.edits.append((text, parse_mode))
+
+    async def answer(self, text, parse_mode="default"):
+        message = MockMessage(self.sent)
+        message.edits.append((text, parse_mode))
+        return message
+
+
+async def chunks(*parts):
+    """Yield the given chunks as an async stream."""
+    for part in parts:
+        yield part
+
+
+def test_split_point():
+    """Test that long text is split on a line boundary."""
+    text = "a" * 3000 + "\n" + "b" * 2000
+    assert split_point(text) == 3001
+    assert split_point("short") == 5
+    assert split_point("x" * 5000) == 4096
+
+
+@pytest.mark.asyncio
+async def test_stream_reply_coalesces_edits():
+    """Test that edits are coalesced and the final text is formatted."""
+    sent = []
+    placeholder = MockMessage(sent)
+    answer = await stream_reply(placeholder, chunks("Hello", ", ", "world"))
+    assert answer == "Hello, world"
+    assert placeholder.edits == [("Hello, world", "default")]
+
+
+@pytest.mark.asyncio
+async def test_partial_edits_back_off_on_retry_after():
+    """Test that RetryAfter widens the edit interval."""
+    placeholder = MockMessage([], retry_after=3)
+    reply = StreamingReply(placeholder, min_interval=0, max_interval=5)
+    await reply.feed("Hello")
+    assert reply.interval == 3
+    assert placeholder.edits == []
+    await reply.finish()
+    assert placeholder.edits == [("Hello", "default")]
+
+
+@pytest.mark.asyncio
+async def test_final_edit_falls_back_to_plain_text():
+    """Test that unparsable Markdown is sent as plain text."""
+    placeholder = MockMessage([], fail_markdown=True)
+    reply = StreamingReply(placeholder)
+    await reply.feed("*unbalanced")
+    await reply.finish()
+    assert placeholder.edits == [("*unbalanced", None)]
+
+
+@pytest.mark.asyncio
+async def test_long_answer_is_split_into_follow_ups():
+    """Test that answers over the message limit continue in new messages."""
+    sent = []
+    placeholder = MockMessage(sent)
+    reply = StreamingReply(placeholder, limit=12)
+    for word in ["alpha ", "beta ", "gamma ", "delta"]:
+        await reply.feed(word)
+    answer = await reply.finish()
+    assert answer == "alpha beta gamma delta"
+    assert [message.edits[-1][0] for message in sent] == ["alpha beta ", "gamma delta"]
+
+
+@pytest.mark.asyncio
+async def test_empty_stream_returns_empty_text():
+    """Test that an empty stream shows and returns the fallback text."""
+    placeholder = MockMessage([])
+    answer = await stream_reply(placeholder, chunks())
+    assert answer == "Error: Empty response from AI"
+    assert placeholder.edits == [("Error: Empty response from AI", "default")]
+
+
+@pytest.mark.asyncio
+async def test_follow_up_retries_and_skips_whitespace_tail(monkeypatch):
+    """Test that follow-ups back off on RetryAfter and whitespace tails are not sent."""
+    sleeps = []
+
+    async def fake_sleep(delay):
+        sleeps.append(delay)
+
+    monkeypatch.setattr("telegram_ai_bot.utils.streaming.asyncio.sleep", fake_sleep)
+    sent = []
+    placeholder = MockMessage(sent)
+    calls = {"count": 0}
+    original_answer = placeholder.answer
+
+    async def flaky_answer(text, parse_mode="default"):
+        calls["count"] += 1
+        if calls["count"] == 1:
+            raise TelegramRetryAfter(None, "Flood control", 2)
+        return await original_answer(text, parse_mode)
+
+    placeholder.answer = flaky_answer
+    reply = StreamingReply(placeholder, limit=12)
+    await reply.feed("alpha beta ")
+    await reply.feed("  ")
+    await reply.feed("gamma")
+    answer = await reply.finish()
+    assert answer == "alpha beta   gamma"
+    assert sleeps == [2]
+    assert len(sent) == 2
+
+    sent = []
+    placeholder = MockMessage(sent)
+    reply = StreamingReply(placeholder, limit=12)
+    await reply.feed("alpha beta g" + " " * 5)
+    await reply.finish()
+    assert len(sent) == 2
@@ -0,0 +1,145 @@
+"""Unit tests for the subscription check middleware."""
+
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiogram.enums import ChatMemberStatus
+from aiogram.types import CallbackQuery
+
+from telegram_ai_bot.bots import BotSettings, reset_bot, use_bot
+from telegram_ai_bot.middleware import subscribe_middleware
+from telegram_ai_bot.middleware.subscribe_middleware import CheckSubscribeMiddleware
+
+
+@pytest.fixture(autouse=True)
+async def clear_cache():
+    """Start every test with an empty subscription cache."""
+    await subscribe_middleware.subscription_cache.clear()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def channel_bot():
+    """Handle events as a bot requiring a channel subscription."""
+    token = use_bot(BotSettings("42:TEST", group="@channel"))
+    yield
+    reset_bot(token)
+
+
+def make_bot(status=ChatMemberStatus.MEMBER, delay=0.0):
+    """Return a bot whose get_chat_member reports the given status."""
+    bot = MagicMock()
+
+    async def get_chat_member(chat_id, user_id):
+        await asyncio.sleep(delay)
+        return MagicMock(status=status)
+
+    bot.get_chat_member = AsyncMock(side_effect=get_chat_member)
+    return bot
+
+
+def make_message(bot, user_id=1):
+    """Return a message event from the given user."""
+    message = MagicMock()
+    message.bot = bot
+    message.from_user.id = user_id
+    message.answer = AsyncMock()
+    return message
+
+
+@pytest.mark.asyncio
+async def test_subscribed_user_is_cached():
+    """Test that repeated events reuse the cached status."""
+    bot = make_bot()
+    handler = AsyncMock(return_value="ok")
+    middleware = CheckSubscribeMiddleware()
+    stats = subscribe_middleware.subscription_cache.stats
+    hits = stats.hits
+
+    assert await middleware(handler, make_message(bot), {}) == "ok"
+    assert await middleware(handler, make_message(bot), {}) == "ok"
+
+    assert bot.get_chat_member.await_count == 1
+    assert stats.hits == hits + 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_lookups_are_coalesced():
+    """Test that concurrent events for one user share a single lookup."""
+    bot = make_bot(delay=0.05)
+    handler = AsyncMock()
+    middleware = CheckSubscribeMiddleware()
+
+    await asyncio.gather(*(middleware(handler, make_message(bot), {}) for _ in range(5)))
+
+    assert bot.get_chat_member.await_count == 1
+    assert handler.await_count == 5
+
+
+@pytest.mark.asyncio
+async def test_unsubscribed_user_is_prompted_and_rechecked_on_callback():
+    """Test that the subscribe button bypasses a cached negative status."""
+    bot = make_bot(status=ChatMemberStatus.LEFT)
+    handler = AsyncMock()
+    middleware = CheckSubscribeMiddleware()
+    message = make_message(bot)
+
+    await middleware(handler, message, {})
+    handler.assert_not_awaited()
+    message.answer.assert_awaited_once()
+
+    bot.get_chat_member.side_effect = None
+    bot.get_chat_member.return_value = MagicMock(status=ChatMemberStatus.MEMBER)
+    callback = MagicMock(spec=CallbackQuery)
+    callback.bot = bot
+    callback.from_user = message.from_user
+    callback.data = "subscribe"
+    await middleware(handler, callback, {})
+
+    handler.assert_awaited_once()
+    assert bot.get_chat_member.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_lookup_error_is_not_cached():
+    """Test that a failed lookup answers with an error and is retried next time."""
+    bot = make_bot()
+    bot.get_chat_member.side_effect = RuntimeError("network")
+    handler = AsyncMock()
+    middleware = CheckSubscribeMiddleware()
+    message = make_message(bot)
+
+    await middleware(handler, message, {})
+    message.answer.assert_awaited_once_with("An error occurred! Please try again.")
+
+    bot.get_chat_member.side_effect = None
+    bot.get_chat_member.return_value = MagicMock(status=ChatMemberStatus.MEMBER)
+    await middleware(handler, make_message(bot), {})
+    handler.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_each_bot_checks_its_own_channel():
+    """Test that statuses are cached per channel and bots without one skip the check."""
+    bot = make_bot()
+    handler = AsyncMock()
+    middleware = CheckSubscribeMiddleware()
+
+    await middleware(handler, make_message(bot), {})
+    token = use_bot(BotSettings("43:TEST", group="@other"))
+    try:
+        await middleware(handler, make_message(bot), {})
+    finally:
+        reset_bot(token)
+    token = use_bot(BotSettings("44:TEST"))
+    try:
+        await middleware(handler, make_message(bot), {})
+    finally:
+        reset_bot(token)
+
+    assert [call.kwargs["chat_id"] for call in bot.get_chat_member.await_args_list] == [
+        "@channel",
+        "@other",
+    ]
+    assert handler.await_count == 3
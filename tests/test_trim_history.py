@@ -0,0 +1,80 @@
+"""Unit tests for conversation history trimming."""
+
+import pytest
+
+from telegram_ai_bot.utils.trim_history import (
+    ConversationBuffer,
+    estimate_tokens,
+    trim_history,
+)
+
+
+def test_estimate_tokens():
+    """Test the byte-based token estimate."""
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("привет") == 3
+
+
+def test_buffer_evicts_oldest_over_budget():
+    """Test that running token totals drive eviction."""
+    buffer = ConversationBuffer(max_tokens=24, max_messages=10, estimator=len)
+    buffer.append({"role": "user", "content": "a" * 8})
+    buffer.append({"role": "assistant", "content": "b" * 8})
+    assert buffer.tokens == 24
+    buffer.append({"role": "user", "content": "c" * 4})
+    assert [m["content"] for m in buffer.messages()] == ["b" * 8, "c" * 4]
+    assert buffer.tokens == 20
+
+
+def test_buffer_preserves_system_messages():
+    """Test that system messages are kept and returned first."""
+    buffer = ConversationBuffer(max_tokens=100, max_messages=2, estimator=len)
+    buffer.append({"role": "user", "content": "one"})
+    buffer.append({"role": "system", "content": "rules"})
+    buffer.append({"role": "user", "content": "two"})
+    buffer.append({"role": "user", "content": "three"})
+    assert buffer.messages() == [
+        {"role": "system", "content": "rules"},
+        {"role": "user", "content": "two"},
+        {"role": "user", "content": "three"},
+    ]
+    assert len(buffer) == 3
+
+
+def test_buffer_truncates_single_oversized_message():
+    """Test that a lone message over the budget is truncated to fit."""
+    buffer = ConversationBuffer(max_tokens=50, max_messages=5, estimator=len)
+    buffer.append({"role": "user", "content": "x" * 500})
+    content = buffer.messages()[0]["content"]
+    assert content.endswith("...")
+    assert buffer.tokens <= 50
+    assert buffer.tokens == len(content) + 4
+
+
+@pytest.mark.parametrize("content", ["a" * 16400, "a" * 39999, "привет " * 20000])
+def test_buffer_truncates_with_default_estimator(content):
+    """Test truncation of long Latin and Cyrillic messages with estimate_tokens."""
+    buffer = ConversationBuffer(max_tokens=4096, max_messages=5)
+    buffer.append({"role": "assistant", "content": content})
+    assert buffer.messages()[0]["content"].endswith("...")
+    assert buffer.tokens <= 4096
+
+
+def test_buffer_with_system_prompt_over_budget():
+    """Test that a system prompt using up the budget does not block appends."""
+    buffer = ConversationBuffer(max_tokens=20, max_messages=5)
+    buffer.append({"role": "system", "content": "s" * 100})
+    buffer.append({"role": "user", "content": "hello there"})
+    assert [m["role"] for m in buffer.messages()] == ["system", "user"]
+    content = buffer.messages()[1]["content"]
+    assert content.endswith("...")
+    assert len(content) < len("hello there")
+
+
+@pytest.mark.asyncio
+async def test_trim_history_limits():
+    """Test the list-based trimming helper."""
+    history = [{"role": "user", "content": "a" * 10} for _ in range(7)]
+    trimmed = await trim_history(history, max_length=25, max_messages=5)
+    assert len(trimmed) == 2
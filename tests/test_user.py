@@ -3,7 +3,11 @@
 import pytest
 from unittest.mock import AsyncMock
 
-from telegram_ai_bot.user import user_router, start_command, start_text_generation
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.methods import SendPhoto
+from aiogram.types import BufferedInputFile
+
+from telegram_ai_bot.user import send_image, user_router, start_command, start_text_generation
 from telegram_ai_bot.states import TextGeneration
 
 
@@ -19,6 +23,10 @@ async def test_start_command():
         def from_user(self):
             return type("User", (), {"id": 123})()
 
+        @property
+        def bot(self):
+            return type("Bot", (), {"id": 42})()
+
     class MockState:
         async def clear(self):
             self.cleared = True
@@ -26,8 +34,10 @@ async def test_start_command():
     message = MockMessage()
     state = MockState()
     with pytest.MonkeyPatch.context() as mp:
-        mp.setattr("telegram_ai_bot.user.set_user", AsyncMock())
+        queue_user = AsyncMock()
+        mp.setattr("telegram_ai_bot.user.queue_user", queue_user)
         await user_router.message(lambda m: True)(start_command)(message, state)
+    queue_user.assert_awaited_once_with(123, 42)
     assert message.text == "Welcome!"
     assert state.cleared is True
 
@@ -51,3 +61,26 @@ async def test_start_text_generation():
     )(message, state)
     assert message.text == "Enter your prompt..."
     assert state.state == TextGeneration.text
+
+
+@pytest.mark.asyncio
+async def test_send_image_reuses_file_id():
+    """Test that an image sent before is re-sent by file_id without upload."""
+    photo = type("Photo", (), {"file_id": "FILE-1"})()
+    bot = AsyncMock()
+    bot.id = 42
+    bot.send_photo.return_value = type("Sent", (), {"photo": [photo]})()
+    message = type("Message", (), {"bot": bot, "chat": type("Chat", (), {"id": 7})()})()
+
+    await send_image(message, b"same image")
+    await send_image(message, b"same image")
+    uploads = [call.kwargs["photo"] for call in bot.send_photo.call_args_list]
+    assert isinstance(uploads[0], BufferedInputFile)
+    assert uploads[1] == "FILE-1"
+
+    bot.send_photo.side_effect = [
+        TelegramBadRequest(SendPhoto(chat_id=7, photo="FILE-1"), "wrong file identifier"),
+        bot.send_photo.return_value,
+    ]
+    await send_image(message, b"same image")
+    assert isinstance(bot.send_photo.call_args.kwargs["photo"], BufferedInputFile)
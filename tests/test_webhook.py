@@ -0,0 +1,71 @@
+"""Unit tests for webhook delivery."""
+
+import asyncio
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp.test_utils import TestClient, TestServer
+
+from telegram_ai_bot import config
+from telegram_ai_bot.middleware.dedup_middleware import UpdateDeduplicationMiddleware
+from telegram_ai_bot.webhook import WEBHOOK_HANDLERS, create_app
+
+
+def make_update(update_id):
+    """Return a raw text message update."""
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 1, "type": "private"},
+            "from": {"id": 1, "is_bot": False, "first_name": "Test"},
+            "text": "hello",
+        },
+    }
+
+
+@pytest.fixture
+def handled():
+    """Collect ids of handled updates."""
+    return []
+
+
+@pytest.fixture
+def dispatcher(handled):
+    """Return a dispatcher whose handler takes a while to finish."""
+    router = Router()
+
+    @router.message()
+    async def slow_handler(message: Message):
+        await asyncio.sleep(0.1)
+        handled.append(message.message_id)
+
+    dp = Dispatcher()
+    dp.update.outer_middleware(UpdateDeduplicationMiddleware(max_size=100))
+    dp.include_router(router)
+    return dp
+
+
+@pytest.mark.asyncio
+async def test_webhook_deduplicates_and_drains(dispatcher, handled, monkeypatch):
+    """Test that repeated updates run once and shutdown waits for running ones."""
+    monkeypatch.setattr(config, "WEBHOOK_SECRET", "secret")
+    app = create_app(dispatcher, Bot(token="42:TEST"))
+    client = TestClient(TestServer(app))
+    await client.start_server()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": "secret"}
+    for update_id in (1, 2, 1):
+        response = await client.post(
+            config.WEBHOOK_PATH, json=make_update(update_id), headers=headers
+        )
+        assert response.status == 200
+    forged = await client.post(config.WEBHOOK_PATH, json=make_update(3))
+    assert forged.status == 401
+    assert handled == []
+
+    await client.close()
+
+    assert sorted(handled) == [1, 2]
+    assert app[WEBHOOK_HANDLERS][0].in_flight == 0